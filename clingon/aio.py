@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncio support for clized coroutine functions and async generator functions.
+This module is only imported when the decorated function is asynchronous.
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import collections
+import inspect
+
+# concurrent calls of a coroutine function over varargs, when --jobs is 0
+DEFAULT_LIMIT = 100
+
+
+def new_loop(loop_factory=None):
+    loop = (loop_factory or asyncio.new_event_loop)()
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def close_loop(loop):
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run(func, args, loop_factory=None):
+    """ Calls coroutine function or async generator function func with args on a new event loop
+    :return: the result of the coroutine, or an iterator over the items of the async generator
+    """
+    loop = new_loop(loop_factory)
+    if inspect.isasyncgenfunction(func):
+        return _iterate(func(*args), loop)
+    try:
+        return loop.run_until_complete(func(*args))
+    finally:
+        close_loop(loop)
+
+
+def _iterate(agen, loop):
+    """ Drives an async generator from synchronous code, the loop is closed when iteration ends
+    """
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        try:
+            loop.run_until_complete(agen.aclose())
+        finally:
+            close_loop(loop)
+
+
+def map_bounded(func, args, items, limit=DEFAULT_LIMIT, ordered=True, loop_factory=None):
+    """ Calls coroutine function func with args followed by each item, with at most limit
+        calls running concurrently, on a new event loop.
+    :return: an iterator of (item, done task), in items order if ordered, else in completion order
+    """
+    loop = new_loop(loop_factory)
+    items = iter(items)
+    pending = collections.OrderedDict()
+
+    def submit():
+        for item in items:
+            pending[loop.create_task(func(*(args + [item])))] = item
+            if len(pending) >= limit:
+                break
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                done = [next(iter(pending))]
+                loop.run_until_complete(asyncio.wait(done))
+            else:
+                done = loop.run_until_complete(asyncio.wait(list(pending),
+                                                            return_when=asyncio.FIRST_COMPLETED))[0]
+            for task in done:
+                yield pending.pop(task), task
+            submit()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.wait(list(pending)))
+        close_loop(loop)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per user persistent cache helpers.
+Cache entries are pickles stored under CACHE_DIR, each one holding the key it was
+computed for, so that a hash collision or a stale entry is never returned.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import pickle
+
+CACHE_DIR = os.environ.get('CLINGON_CACHE_DIR') or \
+    os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'clingon')
+
+
+def file_stamp(path):
+    """ Returns a tuple that changes whenever the file is modified or replaced
+    """
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime, st.st_size
+
+
+def cache_path(section, key, cache_dir=None):
+    """ Returns the path of the cache entry of key (any repr-able object) in section
+    """
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, section, digest + '.pickle')
+
+
+def load(path, key):
+    """ Returns the value cached in path for key, or None if missing, stale or unreadable
+    """
+    try:
+        with open(path, 'rb') as f:
+            cached_key, value = pickle.load(f)
+    except Exception:
+        return
+    if cached_key == key:
+        return value
+
+
+def save(path, key, value):
+    """ Atomically writes value for key into path.
+        Returns False if value could not be cached (unpicklable value, read only cache...)
+    """
+    tmp_path = '%s.%d' % (path, os.getpid())
+    try:
+        data = pickle.dumps((key, value), pickle.HIGHEST_PROTOCOL)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
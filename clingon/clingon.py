@@ -13,25 +13,34 @@ from future.utils import listitems, iteritems
 from past.builtins import basestring
 
 try:
-    from collections.abc import Sequence
+    from collections.abc import Iterator, Sequence
 except ImportError:
-    from collections import Sequence
+    from collections import Iterator, Sequence
 
 try:
     from collections import OrderedDict
 except ImportError:
     from ordereddict import OrderedDict
+import array
 import inspect
+import marshal
 import os
 import sys
 import textwrap
 
-from clingon.utils import read_configuration
+from clingon import converters, timings
+from clingon.utils import read_configuration, resolve_configuration
 
 __version__ = '0.3.2'
 DEBUG = False
 DELAY_EXECUTION = False
+SCHEMA_CACHE = True
 SYSTEM_EXIT_ERROR_CODE = 1
+# typecodes of the arrays of numeric list options, see setting 'arrays'
+try:
+    ARRAY_TYPECODES = {int: array.array('q').typecode, float: 'd'}
+except ValueError:
+    ARRAY_TYPECODES = {int: 'l', float: 'd'}
 
 
 class ClingonError(RuntimeError):
@@ -46,14 +55,79 @@ class RunnerErrorWithUsage(ClingonError):
     pass
 
 
+# decorated function called by forked workers of parallel varargs
+_parallel_function = None
+
+
+class _ResponseFile(str):
+    """ A @file parameter whose parameters are only read when streamed varargs are iterated
+    """
+
+
+def _parallel_call(args):
+    return _parallel_function(*args)
+
+
 class Clizer(object):
     """
     This virtual class extracts args off the run() method of any derived subclass
     Then it extracts cmd line arguments and launches run() with matched args
     """
     SYSTEM_EXIT = True
+    # name of the command in usage, defaults to the script file name
+    prog = None
+    # options from environment and options file kept between runs, see watch mode
+    _external_options = None
+    # profiler of the runs, see flags --clingon-profile and --clingon-trace-malloc
+    _profiler = None
+    # timings of the phases of the last run, see timings.RunStats
+    last_run_stats = None
+    _setup_phase = None
+    # decorator keywords that are settings, not options aliases, with their default values
+    _deco_settings = {
+        'parallel': None,
+        'parallel_pool': 'process',
+        'parallel_ordered': True,
+        'loop_factory': None,
+        'arrays': False,
+        'response_files': False,
+        'stream_varargs': False,
+        'output': None,
+        'output_flush': None,
+        'cache': False,
+        'journal': False,
+        'end_of_options': False,
+    }
+    # settings that change the schema derived from the signature
+    _schema_settings = ('parallel', 'arrays', 'cache', 'journal', 'end_of_options')
+    parallel = None
+    parallel_pool = 'process'
+    parallel_ordered = True
+    loop_factory = None
+    arrays = False
+    response_files = False
+    stream_varargs = False
+    output = None
+    output_flush = None
+    cache = False
+    journal = False
+    end_of_options = False
     _help_options = ('--help', '-?')
     _version_options = ('--version', '-V')
+    # hidden reserved flags, with the number of values they take ('*' for values up to the next option)
+    _clingon_flags = {
+        '--clingon-batch': 1,
+        '--clingon-batch-report': 1,
+        '--clingon-watch': '*',
+        '--clingon-timings': 1,
+        '--clingon-timings-output': 1,
+        '--clingon-profile': 1,
+        '--clingon-trace-malloc': 0,
+        '--clingon-profile-top': 1,
+    }
+    # environment variable giving reserved flags, and the flags it can give
+    _flags_variable = 'CLINGON_FLAGS'
+    _environ_flags = ('--clingon-profile', '--clingon-trace-malloc', '--clingon-profile-top')
 
     @classmethod
     def _write_error(cls, *args, **kwargs):
@@ -87,12 +161,122 @@ class Clizer(object):
                     raise ValueError(
                         "Decorator's keyword '%s' value must be a string or a tuple of strings, found: %s" % (k, v))
 
+    @classmethod
+    def pop_deco_settings(cls, kwargs):
+        """ Extracts and checks settings from decorator keywords
+        :return: a dict of settings
+        """
+        settings = dict((k, kwargs.pop(k)) for k in list(kwargs) if k in cls._deco_settings)
+        if settings.get('parallel') not in (None, 'varargs'):
+            raise ValueError("Decorator's keyword 'parallel' value must be 'varargs', found: %s" % settings['parallel'])
+        if settings.get('parallel_pool', 'process') not in ('process', 'thread'):
+            raise ValueError("Decorator's keyword 'parallel_pool' value must be 'process' or 'thread', found: %s" %
+                             settings['parallel_pool'])
+        loop_factory = settings.get('loop_factory')
+        if loop_factory is not None and not hasattr(loop_factory, '__call__'):
+            raise ValueError("Decorator's keyword 'loop_factory' value must be callable, found: %s" %
+                             settings['loop_factory'])
+        if not isinstance(settings.get('arrays', False), bool):
+            raise ValueError("Decorator's keyword 'arrays' value must be a boolean, found: %s" % settings['arrays'])
+        response_files = settings.get('response_files', False)
+        if not isinstance(response_files, bool) and response_files != 'nul':
+            raise ValueError("Decorator's keyword 'response_files' value must be a boolean or 'nul', found: %s" %
+                             settings['response_files'])
+        if not isinstance(settings.get('stream_varargs', False), bool):
+            raise ValueError("Decorator's keyword 'stream_varargs' value must be a boolean, found: %s" %
+                             settings['stream_varargs'])
+        if settings.get('output') not in (None, 'lines', 'jsonl', 'nul'):
+            raise ValueError("Decorator's keyword 'output' value must be 'lines', 'jsonl' or 'nul', found: %s" %
+                             settings['output'])
+        output_flush = settings.get('output_flush')
+        if output_flush not in (None, 'record') and (isinstance(output_flush, bool) or
+                                                     not isinstance(output_flush, (int, float))):
+            raise ValueError("Decorator's keyword 'output_flush' value must be 'record' or a number of seconds, "
+                             "found: %s" % settings['output_flush'])
+        cache = settings.get('cache', False)
+        if not isinstance(cache, (bool, dict)) or \
+                isinstance(cache, dict) and set(cache) - set(('inputs', 'hash', 'max_age', 'max_size')):
+            raise ValueError("Decorator's keyword 'cache' value must be a boolean or a dict of inputs, hash, "
+                             "max_age and max_size, found: %s" % settings['cache'])
+        if cache and settings.get('stream_varargs'):
+            raise ValueError("Decorator's keyword 'cache' does not apply to streamed varargs")
+        # the output of worker processes does not go through the parent's sys.stdout, so it can't be captured
+        if cache and settings.get('parallel') and settings.get('parallel_pool', 'process') == 'process':
+            raise ValueError("Decorator's keyword 'cache' does not apply to parallel varargs in processes, "
+                             "set keyword 'parallel_pool' to 'thread'")
+        journal = settings.get('journal', False)
+        if not isinstance(journal, (bool, basestring)):
+            raise ValueError("Decorator's keyword 'journal' value must be a boolean or a file path, found: %s" %
+                             settings['journal'])
+        if journal and not settings.get('parallel'):
+            raise ValueError("Decorator's keyword 'journal' requires keyword 'parallel'")
+        if not isinstance(settings.get('end_of_options', False), bool):
+            raise ValueError("Decorator's keyword 'end_of_options' value must be a boolean, found: %s" %
+                             settings['end_of_options'])
+        return settings
+
     def __init__(self, func):
+        start = timings.clock()
         self.func = func
         self.docstring = func.__doc__
         self.file = inspect.getfile(func)
         self._variables = getattr(func, '_variables', {})
-        argspec = inspect.getargspec(func)
+        # coroutine functions and async generator functions are run on an event loop
+        self._is_async = any(getattr(inspect, f, lambda x: False)(func)
+                             for f in ('iscoroutinefunction', 'isasyncgenfunction'))
+        if self.parallel and getattr(inspect, 'isasyncgenfunction', lambda x: False)(func):
+            raise ValueError("Decorator's keyword 'parallel' does not apply to async generator functions")
+        # the schema derived from the signature is cached per user, keyed by script file stamp
+        schema = cache_key = None
+        if SCHEMA_CACHE:
+            from clingon import cache
+            cache_key = self._schema_cache_key()
+            schema = cache.load(cache.cache_path('schema', cache_key), cache_key) if cache_key else None
+            # defaults may be computed at import time (from environment, date, other modules...)
+            if schema is not None and ('_func_defaults' not in schema or
+                                       not self._same_defaults(schema['_func_defaults'])):
+                schema = None
+        if schema is None:
+            schema = self._make_schema()
+            if cache_key:
+                cache.save(cache.cache_path('schema', cache_key), cache_key, schema)
+        self.__dict__.update(schema)
+        if self.stream_varargs and not self.varargs:
+            raise ValueError("Decorator's keyword 'stream_varargs' requires a *varargs parameter")
+        self._parser = self._compile_parser()
+        self._setup_phase = ('setup', start, timings.clock() - start)
+        if DEBUG:
+            print('clize default parameters:', self.reqargs + list(self.python_options.values()) +
+                  (['*' + self.varargs] if self.varargs else []))
+
+    _schema_attributes = ('reqargs', 'varargs', 'python_options', 'options_equ', 'options', '_options',
+                          'options_aliases', '_injected_options', '_option_converters', '_array_options',
+                          '_parser_code', '_parser_converters', '_func_defaults')
+
+    def _same_defaults(self, defaults):
+        try:
+            return bool(defaults == self.func.__defaults__)
+        except Exception:
+            return False
+
+    def _schema_cache_key(self):
+        from clingon import cache
+
+        try:
+            stamp = cache.file_stamp(self.file)
+        except OSError:
+            return
+        return (__version__, sys.version, os.path.abspath(self.file), stamp,
+                self.func.__name__, self.func.__code__.co_firstlineno,
+                sorted(getattr(type(self), 'options_aliases', {}).items()), self._help_options, self._version_options,
+                [(k, getattr(self, k)) for k in self._schema_settings],
+                sorted((k, converters.converter_name(v)) for k, v in iteritems(getattr(self.func, '_converters', {}))))
+
+    def _make_schema(self):
+        """ Derives options, aliases and parser from the decorated function signature
+        :return: a dict of the attributes listed in _schema_attributes
+        """
+        argspec = inspect.getargspec(self.func)
         # do not allow keywords
         if argspec.keywords:
             raise TypeError("Keywords parameter '**%s' is not allowed" % argspec.keywords)
@@ -106,6 +290,48 @@ class Clizer(object):
         self._check_booleans(options)
         # make a copy of options for later call of user's decorated function
         self.python_options = OrderedDict(options)
+        # converters of options of extra types, string defaults are converted once here
+        self._option_converters = {}
+        for x, converter in iteritems(getattr(self.func, '_converters', {})):
+            if x not in options:
+                raise ValueError("This option does not exists so can't be given a converter: " + x)
+            if type(options[x]) is bool:
+                raise ValueError("Boolean option '%s' can't be given a converter" % x)
+            self._option_converters[x] = convert = converters.get_converter(converter)
+            default = options[x]
+            self.python_options[x] = [convert(v) for v in default] if isinstance(default, (list, tuple)) else \
+                convert(default)
+        # numeric list options parsed into arrays, by typecode
+        self._array_options = {}
+        for x, default in iteritems(options):
+            if isinstance(default, array.array):
+                if default.typecode in 'cu':
+                    raise ValueError("Array option '%s' must be an array of numbers, found typecode: %s" %
+                                     (x, default.typecode))
+                self._array_options[x] = default.typecode
+            elif self.arrays and x not in self._option_converters and isinstance(default, list) and default and \
+                    all(type(v) in ARRAY_TYPECODES for v in default):
+                self._array_options[x] = ARRAY_TYPECODES[float if float in map(type, default) else int]
+                self.python_options[x] = array.array(self._array_options[x], default)
+        # inject options that are handled by clingon itself, and not passed to user's decorated function
+        self._injected_options = OrderedDict()
+        if self.parallel:
+            if not self.varargs:
+                raise ValueError("Decorator's keyword 'parallel' requires a *varargs parameter")
+            self._injected_options['jobs'] = 0
+        if self.journal:
+            self._injected_options['resume'] = False
+        if self.cache:
+            inputs = self.cache.get('inputs', ()) if isinstance(self.cache, dict) else ()
+            for x in (inputs,) if isinstance(inputs, basestring) else inputs:
+                if x not in argspec.args and x != self.varargs:
+                    raise ValueError("This parameter does not exists so can't be a cache input: " + x)
+            self._injected_options['no_cache'] = False
+            self._injected_options['refresh_cache'] = False
+        for x in self._injected_options:
+            if x in options:
+                raise ValueError("Option '%s' is reserved by clingon" % x)
+            options[x] = self._injected_options[x]
         # make an equivalence dict from line cmd style (--file-name) to python style (file_name) args
         self.options_equ = dict([('-' + x if len(x) == 1 else '--' + '-'.join(x.split('_')), x) for x in options])
         # make a dict of cmd line style arg names to their types
@@ -114,7 +340,7 @@ class Clizer(object):
         # take a copy of original (no aliases yet) optional args for print_help()
         self._options = OrderedDict(self.options)
         # create automatic short options aliases from long options
-        self.options_aliases = getattr(self, 'options_aliases', {})
+        self.options_aliases = dict(getattr(self, 'options_aliases', {}))
         mismatch = set(self.options_aliases) - set(options)
         if mismatch:
             raise ValueError("This option does not exists so can't be given an alias: " + mismatch.pop())
@@ -137,9 +363,178 @@ class Clizer(object):
                     self.options_equ[k] = x
                     new_alias.append(a)
                 self.options_aliases[x] = new_alias
-        if DEBUG:
-            print('clize default parameters:',
-                  self.reqargs + list(options.values()) + (['*' + self.varargs] if self.varargs else []))
+        self._make_parser_source()
+        # the parser is cached compiled, as compiling its source costs more than deriving the schema
+        self._parser_code = marshal.dumps(compile(self._parser_source, '<clingon parser of %s>' % self.func.__name__,
+                                                  'exec'))
+        self._func_defaults = self.func.__defaults__
+        return dict((k, getattr(self, k)) for k in self._schema_attributes)
+
+    _parser_header = """\
+def parse(argv, check_version):
+    reqargs, optargs, varargs = [], {}, []
+    n = len(argv)
+    i = 0
+    while i < n:
+        x = argv[i]
+        if x in help_options:
+            return 'help'
+        if check_version and x in version_options:
+            return 'version'
+        handler = handlers.get(x)
+        if handler is not None:
+            i = handler(argv, i, n, x, optargs)
+            continue
+        if x.startswith('-'):
+            raise RunnerErrorWithUsage("Unrecognized option '%s'" % x)
+"""
+
+    # with setting end_of_options, parameters after '--' are positional only
+    _parser_header_end_of_options = """\
+def parse(argv, check_version):
+    reqargs, optargs, varargs = [], {}, []
+    n = len(argv)
+    i = 0
+    positional = False
+    while i < n:
+        x = argv[i]
+        if not positional:
+            if x == '--':
+                positional = True
+                i += 1
+                continue
+            if x in help_options:
+                return 'help'
+            if check_version and x in version_options:
+                return 'version'
+            handler = handlers.get(x)
+            if handler is not None:
+                i = handler(argv, i, n, x, optargs)
+                continue
+            if x.startswith('-'):
+                raise RunnerErrorWithUsage("Unrecognized option '%s'" % x)
+"""
+
+    def _make_parser_source(self):
+        """ Generates the source of a parser of the command line specialised for the decorated
+            function: options, aliases, types and defaults are resolved once here, instead of
+            being looked up for each parameter. The parser returns (reqargs, optargs, varargs),
+            or 'help' or 'version' if it finds such an option.
+        """
+        self._parser_converters = {}
+        source = [self._parser_header_end_of_options if self.end_of_options else self._parser_header]
+        nb_reqargs = len(self.reqargs)
+        unrecognized = 'raise RunnerErrorWithUsage("Unrecognized parameter \'%s\'" % x)'
+        extra = 'varargs.append(x)' if self.varargs else unrecognized
+        if nb_reqargs:
+            source.append('        if len(reqargs) < %d:\n'
+                          '            reqargs.append(x)\n'
+                          '        else:\n'
+                          '            %s\n' % (nb_reqargs, extra))
+        else:
+            source.append('        %s\n' % extra)
+        source.append('        i += 1\n')
+        if nb_reqargs:
+            source.append('    if len(reqargs) < %d:\n'
+                          '        raise RunnerErrorWithUsage(%r)\n' %
+                          (nb_reqargs, "Too few parameters (%d required)" % nb_reqargs))
+        source.append('    return reqargs, optargs, varargs\n')
+        handlers = {}
+        for k, (name, default) in enumerate(listitems(self.python_options) + listitems(self._injected_options)):
+            handler = '_option_%d' % k
+            source.append(self._make_option_handler(handler, name, default))
+            handlers[name] = handler
+        source.append('handlers = {%s}\n' % ', '.join('%r: %s' % (x, handlers[self.options_equ[x]])
+                                                      for x in self.options))
+        self._parser_source = ''.join(source)
+
+    def _compile_parser(self):
+        namespace = dict(RunnerError=RunnerError, RunnerErrorWithUsage=RunnerErrorWithUsage, array=array.array,
+                         options=frozenset(self.options) | frozenset(['--'] if self.end_of_options else []),
+                         help_options=frozenset(self._help_options),
+                         version_options=frozenset(self._version_options))
+        namespace.update(self._parser_converters)
+        exec(marshal.loads(self._parser_code), namespace)
+        return namespace['parse']
+
+    def _make_option_handler(self, handler, name, default):
+        """ Returns the source of the parser of one option, registers its converter
+        """
+        source = ['def %s(argv, i, n, x, optargs):\n' % handler,
+                  '    if %r in optargs:\n' % name,
+                  '        raise RunnerError("Option \'%s\' found twice" % x)\n']
+        converter = self._option_converters.get(name)
+        if name in self._array_options:
+            typecode = self._array_options[name]
+            convert = self._parser_converters['convert' + handler] = float if typecode in 'fd' else int
+            type_name = '<%s>' % convert.__name__
+            # values are converted in one batch, and only looked through again to report an error
+            source.append('    i += 1\n'
+                          '    start = i\n'
+                          '    while i < n and argv[i] not in options:\n'
+                          '        i += 1\n'
+                          '    try:\n'
+                          '        values = optargs[%r] = array(%r, map(convert%s, argv[start:i]))\n'
+                          '    except (ValueError, OverflowError):\n'
+                          '        for k, value in enumerate(argv[start:i]):\n'
+                          '            try:\n'
+                          '                array(%r, [convert%s(value)])\n'
+                          '            except (ValueError, OverflowError):\n'
+                          '                raise RunnerErrorWithUsage(%r %% (k + 1, x))\n' %
+                          (name, typecode, handler, typecode, handler,
+                           "Argument %%d of option %%s has wrong type (%s expected)" % type_name))
+        elif isinstance(default, (list, tuple)):
+            type_name = self._format_type(default[0] if default else '', name=name)
+            source.append('    values = optargs[%r] = []\n' % name)
+            converter = converter or (default and type(default[0]))
+            if converter:
+                self._parser_converters['convert' + handler] = converter
+                source.append('    argpos = i\n'
+                              '    i += 1\n'
+                              '    while i < n and argv[i] not in options:\n'
+                              '        try:\n'
+                              '            values.append(convert%s(argv[i]))\n'
+                              '        except ValueError:\n'
+                              '            raise RunnerErrorWithUsage(%r %% (i - argpos, x))\n'
+                              '        i += 1\n' %
+                              (handler, "Argument %%d of option %%s has wrong type (%s expected)" %
+                               type_name))
+            else:
+                source.append('    i += 1\n'
+                              '    while i < n and argv[i] not in options:\n'
+                              '        values.append(argv[i])\n'
+                              '        i += 1\n')
+        if isinstance(default, (list, tuple, array.array)):
+            if default:
+                source.append('    if len(values) != %d:\n'
+                              '        raise RunnerErrorWithUsage(%r %% (x, len(values)))\n' %
+                              (len(default), "Option '%%s' should be followed by a list of %d %s, found %%d" %
+                               (len(default), type_name)))
+            else:
+                source.append('    if not values:\n'
+                              '        raise RunnerErrorWithUsage("Option \'%s\' should be followed by a list '
+                              'of values" % x)\n')
+            source.append('    return i\n')
+        elif type(default) is bool:
+            source.append('    optargs[%r] = True\n'
+                          '    return i + 1\n' % name)
+        else:
+            type_name = self._format_type(default, name=name)
+            source.append('    i += 1\n'
+                          '    if i >= n or argv[i] in options:\n'
+                          '        raise RunnerErrorWithUsage(%r %% x)\n' %
+                          ("Option '%%s' should be followed by a %s" % type_name))
+            if type(default) is str and not converter:
+                source.append('    optargs[%r] = argv[i]\n' % name)
+            else:
+                self._parser_converters['convert' + handler] = converter or type(default)
+                source.append('    try:\n'
+                              '        optargs[%r] = convert%s(argv[i])\n'
+                              '    except ValueError:\n'
+                              '        raise RunnerErrorWithUsage(%r %% x)\n' %
+                              (name, handler, "Argument of option %%s has wrong type (%s expected)" % type_name))
+            source.append('    return i + 1\n')
+        return ''.join(source)
 
     @classmethod
     def _check_booleans(cls, options):
@@ -147,31 +542,61 @@ class Clizer(object):
             if v is True:
                 cls._write_error("Default value for boolean option %r must be 'False'" % k)
 
-    def eval_option_value(self, option):
+    def eval_option_value(self, option, name=None):
         """ Evaluates an option
         :param option: a string
-        :return: an object of type str, bool, int, float or list
+        :param name: the name of the option, whose converter applies if it has one
+        :return: an object of type str, bool, int, float or list, or the converted value,
+                 or an array for array options
         """
+        converter = self._option_converters.get(name)
         try:
-            value = eval(option, {}, {})
-        except (SyntaxError, NameError, TypeError):
-            return option
-        if type(value) in (str, bool, int, float):
-            return value
-        elif type(value) in (list, tuple):
-            for v in value:
-                if type(v) not in (str, bool, int, float):
-                    self._write_error("Value of element of list object has wrong type %s" % v)
-            return value
+            if name in self._array_options:
+                value = converters.parse_literal(option)
+                try:
+                    return array.array(self._array_options[name], value) if isinstance(value, (list, tuple)) else value
+                except (TypeError, OverflowError) as e:
+                    raise ValueError("Value of option %s: %s" % (name, e))
+            if converter is None:
+                return converters.parse_literal(option)
+            # a list option is given as a python list literal, whose elements are converted
+            if isinstance(self.python_options.get(name), list):
+                option = converters.parse_literal(option)
+            if isinstance(option, (list, tuple)):
+                return [converter(v) for v in option]
+            return converter(option)
+        except ValueError as e:
+            self._write_error(str(e) if converter is None else "Value of option %s: %s" % (name, e))
         return option
 
-    def get_options_from_environ(self, options):
+    def _get_environ(self):
+        """ Returns the dict of raw values of options found in environment
+        """
         prefix = self._variables.get('CLINGON_PREFIX')
-        if prefix:
-            for k in list(self.python_options):
-                env_option = os.environ.get(prefix + '_' + k.upper(), None)
-                if env_option is not None:
-                    options[k] = self.eval_option_value(env_option)
+        if not prefix:
+            return {}
+        return dict((k, os.environ[prefix + '_' + k.upper()]) for k in self.python_options
+                    if prefix + '_' + k.upper() in os.environ)
+
+    def get_options_from_environ(self, options, evaluated=None):
+        """ evaluated is a dict of option: (raw value, evaluated value) that saves evaluation of known values
+        """
+        evaluated = evaluated or {}
+        for k, env_option in iteritems(self._get_environ()):
+            raw, value = evaluated.get(k, (None, None))
+            options[k] = value if raw == env_option else self.eval_option_value(env_option, k)
+
+    def _get_options_file_paths(self):
+        """ Returns the options file name and the list of paths it is searched in (None for no path),
+            see get_options_from_file
+        """
+        options_file = self.python_options.get('options_file') or self._variables.get('OPTIONS_FILE')
+        if not options_file:
+            return None, []
+        options_path = self._variables.get('OPTIONS_PATH')
+        if options_path or os.path.isabs(options_file):
+            return options_file, [options_path]
+        return options_file, [os.getcwd(), os.path.expanduser('~/.clingon'), '/etc/clingon/']
 
     def get_options_from_file(self, options):
         """
@@ -190,33 +615,118 @@ class Clizer(object):
         If a configuration file is found, sets the variable
         options_file_path to effective_path/effective_file.
         """
-        options_file = self.python_options.get('options_file') or self._variables.get('OPTIONS_FILE')
+        options_file, paths = self._get_options_file_paths()
         if not options_file:
             self._variables['options_file_path'] = None
             return
-        options_path = self._variables.get('OPTIONS_PATH')
         options_dict, options_file_path = None, None
+        # only the options of the function are decoded from yaml and json files
+        keys = list(self.python_options)
         try:
-            if options_path or os.path.isabs(options_file):
-                options_file_path, options_dict = read_configuration(options_file, options_path)
+            if len(paths) == 1:
+                options_file_path, options_dict = read_configuration(options_file, paths[0], keys)
             else:
-                for path in (os.getcwd(), os.path.expanduser('~/.clingon'), '/etc/clingon/'):
+                for path in paths:
                     try:
-                        options_file_path, options_dict = read_configuration(options_file, path)
+                        options_file_path, options_dict = read_configuration(options_file, path, keys)
                         break
                     except RuntimeError as e:
                         error = e
         except (RuntimeError, TypeError) as e:
             self._write_error(str(e))
         self._variables['options_file_path'] = options_file_path
-        if options_dict:
+        if options_file_path:
             for k in list(self.python_options):
-                default = options_dict.get(k)
+                default = (options_dict or {}).get(k)
                 if default is not None:
-                    options[k] = self.eval_option_value(default)
+                    options[k] = self.eval_option_value(default, k)
         else:
             self._write_error(str(error))
 
+    def get_options_snapshot_path(self):
+        """ The options snapshot written by 'clingon compile-config' lies next to the script
+        """
+        return self.file + '.clingon-config'
+
+    def _options_snapshot_key(self):
+        return ('options', self._schema_cache_key(),
+                [repr(self._variables.get(k)) for k in ('OPTIONS_FILE', 'OPTIONS_PATH', 'CLINGON_PREFIX')])
+
+    def make_options_snapshot(self):
+        """ Searches, reads and evaluates options from the environment and the options file once.
+        :return: a snapshot of the evaluated values, with the stamps that tell whether it is still valid
+        """
+        environ, options = {}, {}
+        self.get_options_from_environ(environ)
+        snapshot = dict(environ=dict((k, (v, environ[k])) for k, v in iteritems(self._get_environ())), file=None)
+        options_file, paths = self._get_options_file_paths()
+        if options_file:
+            self.get_options_from_file(options)
+            resolved = self._variables['options_file_path']
+            found = [resolve_configuration(os.path.join(path, options_file) if path else options_file)
+                     for path in paths].index(resolved)
+            from clingon import cache
+            snapshot['file'] = dict(found=found, resolved=resolved, stamp=cache.file_stamp(resolved), options=options)
+        return snapshot
+
+    def write_options_snapshot(self):
+        """ Writes the options snapshot of the script next to it
+        :return: the path of the snapshot
+        """
+        if self._schema_cache_key() is None:
+            raise RunnerError("Cannot snapshot options of '%s'" % self.file)
+        from clingon import cache
+
+        path = self.get_options_snapshot_path()
+        if not cache.save(path, self._options_snapshot_key(), self.make_options_snapshot()):
+            raise RunnerError("Could not write options snapshot '%s'" % path)
+        return path
+
+    def _load_options_snapshot(self):
+        if not (self.python_options.get('options_file') or self._variables.get('OPTIONS_FILE') or
+                self._variables.get('CLINGON_PREFIX')):
+            return
+        from clingon import cache
+
+        key = self._options_snapshot_key()
+        return cache.load(self.get_options_snapshot_path(), key) if key[1] else None
+
+    def _check_file_snapshot(self, snapshot):
+        """ The file part of the snapshot is valid if the search for the options file still ends on
+            the same unmodified file
+        """
+        from clingon import cache
+
+        options_file, paths = self._get_options_file_paths()
+        found = [os.path.join(path, options_file) if path else options_file for path in paths[:snapshot['found'] + 1]]
+        if any(resolve_configuration(file) is not None for file in found[:-1]):
+            return False
+        try:
+            return resolve_configuration(found[-1]) == snapshot['resolved'] and \
+                cache.file_stamp(snapshot['resolved']) == snapshot['stamp']
+        except OSError:
+            return False
+
+    def get_external_options(self, stats=None):
+        """ Returns options from environment and options file, from the options snapshot if it is valid.
+            Phases are recorded into stats if given.
+        """
+        external_opt = {}
+        start = timings.clock()
+        snapshot = self._load_options_snapshot() or {}
+        self.get_options_from_environ(external_opt, snapshot.get('environ'))
+        if stats is not None:
+            stats.add('environ', start)
+            start = timings.clock()
+        if snapshot.get('file') and self._check_file_snapshot(snapshot['file']):
+            self._variables['options_file_path'] = snapshot['file']['resolved']
+            external_opt.update(snapshot['file']['options'])
+        else:
+            self.get_options_from_file(external_opt)
+        if stats is not None:
+            stats.add('options_file', start)
+        return external_opt
+
     def _eval_variables(self):
         """evaluates callable _variables
         """
@@ -232,127 +742,464 @@ class Clizer(object):
         self._write_error('version %s%s (Python %s)' %
                             (self._get_variable('VERSION'), source, sys.version.split()[0]), exit=False)
 
-    def start(self, param_string=None):
-        """ Parses command line parameters
-            A string can be passed to simulate a cli for test purpose
+    def _get_argv(self, param_string=None):
+        """ Returns parameters from command line, or from parameter string or list
+            (latter essentially for tests and batches)
         """
-        external_opt = {}
-        self.get_options_from_environ(external_opt)
-        self.get_options_from_file(external_opt)
-        # construct optional args, required args and variable args as we find then in the command line
-        optargs = {}
-        reqargs, varargs = [], []
-
-        # get parameters from command line, or from parameter string (latter essentially for tests)
         if param_string is None:
-            argv = sys.argv[1:]
-        else:
+            return sys.argv[1:]
+        if isinstance(param_string, basestring):
             import shlex
-            argv = shlex.split(param_string)
+            return shlex.split(param_string)
+        return list(param_string)
 
-        self._eval_variables()
-        i = 0
+    def _expand_response_files(self, argv):
+        """ Replaces each @file parameter by the parameters read from file, or from stdin for @-,
+            a leading @@ stands for a literal @.
+            If varargs are streamed, @file parameters are kept, to be read when varargs are iterated.
+        """
+        if not any(x[:1] == '@' for x in argv):
+            return argv
+        from clingon.utils import iter_response_file
+
+        expanded = []
+        for x in argv:
+            if x[:2] == '@@':
+                expanded.append(x[1:])
+            elif x[:1] == '@' and len(x) > 1 and self.stream_varargs:
+                expanded.append(_ResponseFile(x))
+            elif x[:1] == '@' and len(x) > 1:
+                try:
+                    expanded.extend(iter_response_file(x[1:], self.response_files == 'nul'))
+                except (IOError, OSError) as e:
+                    raise RunnerError("Could not read response file '%s': %s" % (x[1:], e.strerror or e))
+            else:
+                expanded.append(x)
+        return expanded
+
+    def _stream_varargs(self, reqargs, optargs, varargs):
+        """ Checks that response files only give varargs
+        :return: an iterator over varargs, that reads response files as it goes
+        """
+        for value in reqargs + list(optargs.values()):
+            for x in value if isinstance(value, list) else [value]:
+                if isinstance(x, _ResponseFile):
+                    raise RunnerErrorWithUsage("Response file '%s' can only give varargs" % x[1:])
+        for x in varargs:
+            if isinstance(x, _ResponseFile) and x != '@-' and not os.path.exists(x[1:]):
+                raise RunnerError("Could not read response file '%s': No such file or directory" % x[1:])
+        return self._iter_streamed_varargs(varargs)
+
+    def _iter_streamed_varargs(self, varargs):
+        from clingon.utils import iter_response_file
+
+        for x in varargs:
+            if isinstance(x, _ResponseFile):
+                for y in iter_response_file(x[1:], self.response_files == 'nul'):
+                    yield y
+            else:
+                yield x
+
+    def _pop_clingon_flags(self, argv):
+        """ Extracts reserved --clingon-xxx flags, unless the decorated function has an option of the same name
+        :return: argv without reserved flags, dict of reserved flags to their value (True if flag has no value)
+        """
+        flags = {}
+        if not any(x.startswith('--clingon-') for x in argv):
+            return argv, flags
+        remaining, i = [], 0
         while i < len(argv):
-            # get next parameter
             x = argv[i]
-            # check for help
-            if x in self._help_options:
-                self._print_help()
-                return
-            # check for version
-            if x in self._version_options and self._get_variable('VERSION'):
-                self._print_version()
-                return
-            # parameter is an option
-            if x in self.options:
-                o_x = self.options[x]
-                oe_x = self.options_equ[x]
-                # check for duplicates
-                if oe_x in optargs:
-                    raise RunnerError("Option '%s' found twice" % x)
-                # proceed with lists or tuples
-                if isinstance(o_x, (list, tuple)):
-                    argpos = i
-                    optargs[oe_x] = []
-                    i += 1
-                    # iterate till end of parameters list, or to next option occurrence
-                    while i < len(argv) and argv[i] not in self.options:
-                        # try to convert element to expected type, then store it
-                        try:
-                            optargs[oe_x].append(type(o_x[0])(argv[i]))
-                        except ValueError:
-                            raise RunnerErrorWithUsage("Argument %d of option %s has wrong type (%s expected)" %
-                                                       (i - argpos, x, self._format_type(o_x[0])))
-                        # if no expected type, just store element
-                        except IndexError:
-                            optargs[oe_x].append(argv[i])
+            if x in self._clingon_flags and x not in self.options:
+                if self._clingon_flags[x] == '*':
+                    values = flags.setdefault(x, [])
+                    while i + 1 < len(argv) and not argv[i + 1].startswith('-'):
                         i += 1
-                    # check that list option is not empty
-                    if not len(optargs[oe_x]) and not len(o_x):
+                        values.append(argv[i])
+                    if not values:
                         raise RunnerErrorWithUsage("Option '%s' should be followed by a list of values" % x)
-                    # check number of element if default list/tuple is not empty
-                    if len(o_x) and len(optargs[oe_x]) != len(o_x):
-                        raise RunnerErrorWithUsage("Option '%s' should be followed by a list of %d %s, found %d" %
-                                                   (x, len(o_x), self._format_type(o_x[0]), len(optargs[oe_x])))
-                # proceed boolean
-                elif type(o_x) is bool:
-                    optargs[oe_x] = True
+                elif self._clingon_flags[x]:
                     i += 1
-                # proceed other types (string, integer, float)
+                    if i >= len(argv):
+                        raise RunnerErrorWithUsage("Option '%s' should be followed by a <str>" % x)
+                    flags[x] = argv[i]
                 else:
-                    i += 1
-                    # check that option is given a value
-                    if i >= len(argv) or argv[i] in self.options:
-                        raise RunnerErrorWithUsage("Option '%s' should be followed by a %s" %
-                                                   (x, self._format_type(o_x)))
-                    # try to convert element to expected type, then store it
-                    try:
-                        optargs[oe_x] = type(o_x)(argv[i])
-                    except ValueError:
-                        raise RunnerErrorWithUsage("Argument of option %s has wrong type (%s expected)" %
-                                                   (x, self._format_type(o_x)))
-                    i += 1
-            # parameter may be a required or a variable parameter, or unrecognized
+                    flags[x] = True
             else:
-                if x.startswith('-'):
-                    raise RunnerErrorWithUsage("Unrecognized option '%s'" % argv[i])
-                elif len(reqargs) < len(self.reqargs):
-                    reqargs.append(argv[i])
-                elif self.varargs:
-                    varargs.append(argv[i])
-                else:
-                    raise RunnerErrorWithUsage("Unrecognized parameter '%s'" % argv[i])
-                i += 1
-        # check number of required parameters
-        if self.reqargs and len(reqargs) < len(self.reqargs):
-            raise RunnerErrorWithUsage("Too few parameters (%d required)" % len(self.reqargs))
+                remaining.append(x)
+            i += 1
+        return remaining, flags
+
+    def start(self, param_string=None):
+        """ Parses command line parameters and calls the decorated function,
+            the iterator it may return is written to stdout according to setting 'output'.
+            A string or a list can be passed to simulate a cli for test purpose
+        """
+        prepared = self._prepare(param_string)
+        if prepared is None:
+            return
+        run = self._run
+        if self._profiler is not None:
+            # the function and the output of the iterator it may return are profiled, replayed results are not
+            import functools
+            run = functools.partial(self._profiler.runcall, self._run)
+        if self.cache:
+            from clingon import memo
+            return memo.cached_run(self, prepared, run)
+        return run(prepared)
+
+    def _run(self, prepared):
+        start = timings.clock()
+        result = self._invoke(prepared)
+        self.last_run_stats.add('call', start)
+        if self.output and isinstance(result, Iterator):
+            from clingon import output
+            start = timings.clock()
+            try:
+                return output.write_records(result, self.output, self.output_flush)
+            finally:
+                self.last_run_stats.add('output', start)
+        return result
+
+    def call(self, param_string=None, input=None):
+        """ Parses command line parameters and calls the decorated function, see start().
+            The items of iterable input, if given, are appended to varargs, lazily if varargs are
+            streamed or parallel.
+        :return: the result of the decorated function, None if help or version was printed
+        """
+        prepared = self._prepare(param_string, input)
+        if prepared is not None:
+            start = timings.clock()
+            try:
+                return self._invoke(prepared)
+            finally:
+                self.last_run_stats.add('call', start)
+
+    def _prepare(self, param_string=None, input=None):
+        """ Parses command line parameters and merges them with options from environment and file
+            (or with _external_options if set, see watch mode)
+        :return: (allargs, varargs, injected options), None if help or version was printed
+        """
+        stats = self.last_run_stats = timings.RunStats()
+        if self._setup_phase:
+            stats.phases.append(self._setup_phase)
+        if self._external_options is None:
+            external_opt = self.get_external_options(stats)
+        else:
+            external_opt = dict(self._external_options)
+        start = timings.clock()
+        self._eval_variables()
+        stats.add('eval_variables', start)
+        start = timings.clock()
+        argv = self._get_argv(param_string)
+        if self.response_files:
+            argv = self._expand_response_files(argv)
+        # parse parameters with the parser generated for the decorated function
+        parsed = self._parser(argv, bool(self._get_variable('VERSION')))
+        stats.add('parse', start)
+        if parsed == 'help':
+            self._print_help()
+            return
+        if parsed == 'version':
+            self._print_version()
+            return
+        reqargs, optargs, varargs = parsed
+        injected = dict((k, optargs.pop(k, v)) for k, v in iteritems(self._injected_options))
+        if self.stream_varargs:
+            varargs = self._stream_varargs(reqargs, optargs, varargs)
+        if input is not None:
+            if not self.varargs:
+                raise RunnerError("Function '%s' has no varargs to receive an input" % self.func.__name__)
+            if self.stream_varargs or self.parallel:
+                import itertools
+                varargs = itertools.chain(varargs, input)
+            else:
+                varargs.extend(input)
         # merge required, optional args and options in allargs
         options = OrderedDict(self.python_options)
         options.update(external_opt)
         options.update(optargs)
         allargs = reqargs
         allargs.extend(options.values())
-        allargs.extend(varargs)
         if DEBUG:
-            print('clize call parameters:', allargs)
-        # all parameters are filled, call wrapped function
-        return self.func(*allargs)
+            print('clize call parameters:', allargs + (varargs if isinstance(varargs, list) else [varargs]))
+        return allargs, varargs, injected
 
-    def __call__(self, param_string=None):
+    def _invoke(self, prepared):
+        """ Calls the decorated function with prepared parameters, see _prepare()
+        """
+        allargs, varargs, injected = prepared
+        if self.parallel:
+            return self._map_varargs(allargs, varargs, injected['jobs'], injected.get('resume', False))
+        # streamed varargs are given as a single iterator
+        if self.stream_varargs:
+            allargs = allargs + [varargs]
+        else:
+            allargs = allargs + varargs
+        return self._call(allargs)
+
+    def _call(self, args):
+        """ Calls the decorated function, on an event loop if it is asynchronous
+        """
+        if self._is_async:
+            from clingon import aio
+            return aio.run(self.func, args, self.loop_factory)
+        return self.func(*args)
+
+    def _iter_varargs_results(self, args, varargs, jobs):
+        """ Calls the decorated function once per varargs item, with args followed by the item,
+            in a pool of jobs workers (all cpus if jobs is 0).
+            Exceptions are written to stderr and result in SYSTEM_EXIT_ERROR_CODE.
+        :return: an iterator of (item, result), in varargs order if parallel_ordered, else in completion order
+        """
+        global _parallel_function
+
+        def result(call, *call_args):
+            try:
+                return call(*call_args)
+            except Exception as e:
+                self._write_error(str(e), exit=False)
+                if DEBUG:
+                    raise
+                return SYSTEM_EXIT_ERROR_CODE
+
+        if self._is_async:
+            # coroutines run concurrently on one event loop, at most jobs at a time
+            from clingon import aio
+            for item, task in aio.map_bounded(self.func, args, varargs, jobs or aio.DEFAULT_LIMIT,
+                                              self.parallel_ordered, self.loop_factory):
+                yield item, result(task.result)
+            return
+        if jobs == 1:
+            for item in varargs:
+                yield item, result(self._call, args + [item])
+            return
+        import collections
+        import concurrent.futures
+
+        if self.parallel_pool == 'thread':
+            executor = concurrent.futures.ThreadPoolExecutor(jobs or None)
+        else:
+            # workers are forked, so they inherit the decorated function instead of unpickling it
+            _parallel_function = self.func
+            try:
+                import multiprocessing
+                executor = concurrent.futures.ProcessPoolExecutor(jobs or None,
+                                                                  mp_context=multiprocessing.get_context('fork'))
+            except (TypeError, AttributeError, ValueError):
+                executor = concurrent.futures.ProcessPoolExecutor(jobs or None)
+        # keep a bounded number of items in flight, so that huge varargs are not all submitted at once
+        window = 4 * (jobs or executor._max_workers)
+        items = iter(varargs)
+        pending = collections.OrderedDict()
+
+        def submit():
+            for item in items:
+                if self.parallel_pool == 'thread':
+                    pending[executor.submit(self.func, *(args + [item]))] = item
+                else:
+                    pending[executor.submit(_parallel_call, args + [item])] = item
+                if len(pending) >= window:
+                    break
+
+        with executor:
+            submit()
+            while pending:
+                if self.parallel_ordered:
+                    done = [next(iter(pending))]
+                else:
+                    done = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)[0]
+                for future in done:
+                    yield pending.pop(future), result(future.result)
+                submit()
+
+    def _map_varargs(self, args, varargs, jobs, resume=False):
+        """ Calls the decorated function once per varargs item.
+            With setting 'journal', succeeded items are recorded, and skipped if resume.
+        :return: the highest exit code of all calls
+        """
+        if not self.journal:
+            code = 0
+            for _, result in self._iter_varargs_results(args, varargs, jobs):
+                code = max(code, result if type(result) is int else 0)
+            return code
+        from clingon import journal
+
+        code, completed = 0, False
+        with journal.open_journal(self, args, resume) as record:
+            try:
+                for item, result in self._iter_varargs_results(args, record.skip_done(varargs), jobs):
+                    result = result if type(result) is int else 0
+                    if result == 0:
+                        record.add(item)
+                    code = max(code, result)
+                completed = True
+            finally:
+                # a journal is only needed to resume an incomplete run
+                record.remove = completed and code == 0
+        return code
+
+    def _execute(self, argv):
+        """ Runs start() and translates its outcome into an exit code, errors are written to stderr
+        """
         try:
-            self._sys_exit(self.start(param_string))
+            code = self.start(argv)
+            return code if type(code) is int else 0
         except RunnerErrorWithUsage as e:
             self._print_usage(file=sys.stderr)
-            return self._write_error(str(e))
+            self._write_error(str(e), exit=False)
         except RunnerError as e:
-            return self._write_error(str(e))
+            self._write_error(str(e), exit=False)
         except Exception as e:
             self._write_error(str(e), exit=False)
             if DEBUG:
                 raise
-            return self._sys_exit()
+        return SYSTEM_EXIT_ERROR_CODE
+
+    def _run_batch(self, source, argv, report=None):
+        """ Runs start() for each command line read from source (a file name, or '-' for stdin),
+            appended to argv, without exiting between records.
+            If report is given (a file name, or '-' for stdout), the output of each record is captured
+            and written to report as a json line with the record index and exit code.
+        :return: 0 if all records succeeded, else SYSTEM_EXIT_ERROR_CODE
+        """
+        import shlex
+        try:
+            from StringIO import StringIO
+        except ImportError:
+            from io import StringIO
+
+        if report:
+            import json
+            report_file = sys.stdout if report == '-' else open(report, 'w')
+        batch_file = sys.stdin if source == '-' else open(source)
+        failed = False
+        try:
+            index = 0
+            for line in batch_file:
+                if not line.strip():
+                    continue
+                record = argv + shlex.split(line)
+                if report:
+                    stdout, stderr = sys.stdout, sys.stderr
+                    sys.stdout, sys.stderr = StringIO(), StringIO()
+                    try:
+                        code = self._execute_record(record)
+                        out, err = sys.stdout.getvalue(), sys.stderr.getvalue()
+                    finally:
+                        sys.stdout, sys.stderr = stdout, stderr
+                    report_file.write(json.dumps(dict(record=index, exit_code=code, stdout=out, stderr=err)) + '\n')
+                else:
+                    code = self._execute_record(record)
+                failed = failed or code != 0
+                index += 1
+        finally:
+            if batch_file is not sys.stdin:
+                batch_file.close()
+            if report and report_file is not sys.stdout:
+                report_file.close()
+        return SYSTEM_EXIT_ERROR_CODE if failed else 0
+
+    def _execute_record(self, argv):
+        """ Runs _execute(), an exit of the function or of an error only ends the current record
+        """
+        try:
+            return self._execute(argv)
+        except SystemExit as e:
+            return self._exit_code(e)
+
+    @staticmethod
+    def _exit_code(e):
+        """ Returns the exit code of SystemExit e, writing its message to stderr as the interpreter would
+        """
+        if e.code is None or type(e.code) is int:
+            return e.code or 0
+        sys.stderr.write('%s\n' % (e.code,))
+        return SYSTEM_EXIT_ERROR_CODE
+
+    def __call__(self, param_string=None):
+        try:
+            argv, flags = self._pop_clingon_flags(self._get_argv(param_string))
+            environ_flags = self._get_environ_flags()
+            environ_flags.update(flags)
+            flags = environ_flags
+            profiler = self._make_profiler(flags)
+        except RunnerErrorWithUsage as e:
+            self._print_usage(file=sys.stderr)
+            return self._write_error(str(e))
+        except RunnerError as e:
+            return self._write_error(str(e))
+        if profiler is None:
+            return self._sys_exit(self._execute_with_flags(argv, flags))
+        self._profiler = profiler
+        try:
+            code = self._execute_with_flags(argv, flags)
+        finally:
+            self._profiler = None
+        profiler.write_summary(sys.stderr)
+        return self._sys_exit(code)
+
+    def _execute_with_flags(self, argv, flags):
+        if '--clingon-batch' in flags:
+            return self._run_batch(flags['--clingon-batch'], argv, flags.get('--clingon-batch-report'))
+        if '--clingon-watch' in flags:
+            from clingon import watch
+            return watch.run(self, argv, flags['--clingon-watch'])
+        if '--clingon-timings' in flags:
+            return self._execute_with_timings(argv, flags['--clingon-timings'], flags.get('--clingon-timings-output'))
+        return self._execute(argv)
+
+    def _get_environ_flags(self):
+        """ Returns the reserved flags given by environment variable CLINGON_FLAGS, so that a program
+            can be profiled without changing its command line
+        """
+        if self._flags_variable not in os.environ:
+            return {}
+        import shlex
+        argv, flags = self._pop_clingon_flags(shlex.split(os.environ[self._flags_variable]))
+        unexpected = argv + sorted(x for x in flags if x not in self._environ_flags)
+        if unexpected:
+            raise RunnerError("Environment variable %s can only give %s, found: %s" %
+                              (self._flags_variable, ', '.join(self._environ_flags), ' '.join(unexpected)))
+        return flags
+
+    @staticmethod
+    def _make_profiler(flags):
+        """ Returns the profiler asked by flags --clingon-profile or --clingon-trace-malloc, or None
+        """
+        if '--clingon-profile' not in flags and '--clingon-trace-malloc' not in flags:
+            return
+        if '--clingon-profile' in flags and '--clingon-trace-malloc' in flags:
+            raise RunnerErrorWithUsage("Options '--clingon-profile' and '--clingon-trace-malloc' are exclusive")
+        from clingon import profiling
+        try:
+            top = int(flags.get('--clingon-profile-top', profiling.TOP))
+        except ValueError:
+            raise RunnerErrorWithUsage("Argument of option --clingon-profile-top has wrong type (<int> expected)")
+        if '--clingon-profile' in flags:
+            return profiling.CallProfiler(flags['--clingon-profile'], top)
+        return profiling.MallocTracer(top)
 
-    def _format_type(self, arg, post=''):
+    def _execute_with_timings(self, argv, fmt, output=None):
+        """ Runs _execute() then writes the timings of the run in format fmt, to output or stderr
+        """
+        if fmt not in timings.FORMATS:
+            self._print_usage(file=sys.stderr)
+            self._write_error("Option '--clingon-timings' value must be one of %s, found: %s" %
+                              (', '.join(timings.FORMATS), fmt), exit=False)
+            return SYSTEM_EXIT_ERROR_CODE
+        self.last_run_stats = None
+        code = self._execute(argv)
+        if self.last_run_stats is not None:
+            timings.write(self.last_run_stats, fmt, output)
+        return code
+
+    def _format_type(self, arg, post='', name=None):
+        if name in self._option_converters:
+            converter = '<%s>' % converters.converter_name(self._option_converters[name])
+            return (converter.replace('<', '<list of ') if isinstance(arg, list) else converter) + post
+        if isinstance(arg, array.array):
+            return '<list of %s>' % ('float' if arg.typecode in 'fd' else 'int') + post
         if isinstance(arg, list):
             try:
                 return '<list of %s>' % self._get_type(arg[0]) + post
@@ -375,7 +1222,7 @@ class Clizer(object):
             option=option,
             width=width,
             shorts=self._format_aliases(option),
-            opt_type=self._format_type(opt_type, ' '),
+            opt_type=self._format_type(opt_type, ' ', self.options_equ[option]),
             default='(default=%r)' % opt_type
         )
         return option_format.format(**option_dict)
@@ -384,7 +1231,7 @@ class Clizer(object):
         usage_format = "{prepend}{basename} {reqargs}{varargs}{options}{version}{help}"
         usage_dict = dict(
             prepend=prepend,
-            basename=(os.path.basename(self.file)),
+            basename=self.prog or os.path.basename(self.file),
             reqargs=' '.join(self.reqargs) + ' ',
             varargs='[varargs] ' if self.varargs else '',
             version='[' + ' | '.join(self._version_options) + '] ' if self._get_variable('VERSION') else '',
@@ -460,10 +1307,13 @@ def clize(*args, **kwargs):
     """
 
     kwargs = dict((k.lower(), v) for k, v in iteritems(kwargs))
+    settings = Clizer.pop_deco_settings(kwargs)
 
     class mycli(Clizer):
         options_aliases = kwargs
 
+    for k, v in iteritems(settings):
+        setattr(mycli, k, v)
     mycli.check_deco_parameters(*args, **kwargs)
 
     def runner(function):
@@ -475,6 +1325,22 @@ def clize(*args, **kwargs):
         return runner
 
 
+def set_converters(**kwargs):
+    """
+    Decorator selecting the converters of options of extra types, by name
+    (bytesize, duration, path, or registered with clingon.converters.register_converter)
+    or as callables:
+    @set_converters(size='bytesize', timeout='duration')
+    """
+    def f(x):
+        if not hasattr(x, '_converters'):
+            x._converters = {}
+        x._converters.update(kwargs)
+        return x
+
+    return f
+
+
 def set_variables(**kwargs):
     def f(x):
         if not hasattr(x, '_variables'):
@@ -485,8 +1351,98 @@ def set_variables(**kwargs):
     return f
 
 
+def _executable_perms():
+    import stat
+
+    perms = stat.S_IXUSR | stat.S_IXGRP
+    if os.getuid() == 0:
+        perms |= stat.S_IXOTH
+    return perms
+
+
+_multi_call_main = """\
+from clingon.registry import Registry
+
+registry = Registry(%(prog)r)
+%(commands)s
+registry.multi_call()
+"""
+
+
+def _make_multi_call(sources, dest_dir, launcher, force, remove, perms):
+    """ Installs launcher in dest_dir, an executable zip holding the precompiled modules of the
+        sources and dispatching on its invocation name, and a symlink to it per source.
+    """
+    names = [os.path.splitext(os.path.basename(source))[0] for source in sources]
+    if len(set(names + [launcher])) != len(names) + 1:
+        raise RunnerError("Scripts and launcher names must all be different, aborting")
+    targets = [os.path.join(dest_dir, name) for name in [launcher] + names]
+    if remove:
+        for target in targets:
+            if os.path.lexists(target):
+                os.unlink(target)
+                print("Script '%s' removed" % target)
+            else:
+                print("Script '%s' not found, nothing to do" % target)
+        return
+    for source in sources:
+        if not os.path.exists(source):
+            raise RunnerError("Could not find source '%s', aborting" % source)
+    for target in targets:
+        if os.path.lexists(target) and not force:
+            raise RunnerError("Target '%s' already exists, aborting" % target)
+    if not os.path.isdir(dest_dir):
+        try:
+            os.makedirs(dest_dir)
+        except OSError:
+            raise RunnerError("Target folder '%s' does not exist, and cannot create it, aborting" % dest_dir)
+
+    import py_compile
+    import shutil
+    import tempfile
+    import zipfile
+    from clingon import static
+
+    # scripts are stored under private module names, so that a tool named as an already imported
+    # (or standard) module, such as time or json, still imports its own script
+    modules = ['_clingon_tool_%d' % k for k in range(len(sources))]
+    commands = []
+    for name, module, source in zip(names, modules, sources):
+        definition = static.find_clized(source)
+        summary = textwrap.dedent(definition.docstring or '').strip().split('\n')[0] if definition else ''
+        commands.append('registry.add(%r, %r, summary=%r)' % (name, module, summary))
+    tmp_dir = tempfile.mkdtemp()
+    tmp_launcher = os.path.join(dest_dir, '.%s.%d' % (launcher, os.getpid()))
+    try:
+        with open(tmp_launcher, 'wb') as f:
+            f.write(('#!%s\n' % sys.executable).encode('utf-8'))
+            with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as bundle:
+                for module, source in zip(modules, sources):
+                    compiled = os.path.join(tmp_dir, module + '.pyc')
+                    try:
+                        py_compile.compile(source, compiled, source, doraise=True)
+                    except py_compile.PyCompileError as e:
+                        raise RunnerError("Could not compile '%s': %s" % (source, e.msg))
+                    bundle.write(compiled, module + '.pyc')
+                bundle.writestr('__main__.py', _multi_call_main % dict(prog=launcher, commands='\n'.join(commands)))
+        os.chmod(tmp_launcher, os.stat(tmp_launcher).st_mode | perms)
+        os.rename(tmp_launcher, targets[0])
+    finally:
+        shutil.rmtree(tmp_dir)
+        if os.path.exists(tmp_launcher):
+            os.unlink(tmp_launcher)
+    print('Scripts %s have been bundled into %s' % (', '.join(sources), targets[0]))
+    for target in targets[1:]:
+        if os.path.lexists(target):
+            os.unlink(target)
+        os.symlink(launcher, target)
+        print('Script %s has been symlinked to %s' % (targets[0], target))
+
+
+@set_variables(VERSION=__version__)
 def make_script(python_script, target_path='', target_name='', user=False, make_link=False,
-                force=False, remove=False, no_check_shebang=False, no_check_path=False):
+                force=False, remove=False, no_check_shebang=False, no_check_path=False,
+                multi_call='', completion='', compile_config=False, *python_scripts):
     """v{VERSION}
     This script makes a command line script out of a python script.
     For example, 'clingon script.py' will copy or symlink script.py
@@ -495,20 +1451,49 @@ def make_script(python_script, target_path='', target_name='', user=False, make_
     - <target-path>/script if --target-path is specfied,
     - ~/bin/script if --user is specified,
     and then set the copy / symlink as executable.
+    With --multi-call launcher, all the given scripts are precompiled
+    into a single executable named launcher, and each script name is
+    symlinked to it: 'clingon a.py b.py --multi-call tools'.
+    With --completion bash|zsh|fish, a static completion script
+    is also installed for the current user.
+    With --compile-config, the options file of the installed script is
+    compiled next to it (see 'clingon compile-config --help').
     See https://github.com/francois-vincent/clingon
     """
     if user and target_path:
         raise RunnerErrorWithUsage("You cannot specify --path and --user at the same time")
+    if python_scripts and not multi_call:
+        raise RunnerErrorWithUsage("You must specify --multi-call to install several scripts")
+    if multi_call and (target_name or make_link or compile_config):
+        raise RunnerErrorWithUsage(
+            "You cannot specify --target-name, --make-link or --compile-config with --multi-call")
     source = os.path.abspath(python_script)
     dest_dir = os.path.normpath(os.path.expanduser('~/bin' if user else target_path or os.path.dirname(sys.executable)))
+    if completion:
+        from clingon.completion import install as install_completion
+    if multi_call:
+        sources = [os.path.abspath(x) for x in (python_script,) + python_scripts]
+        _make_multi_call(sources, dest_dir, multi_call, force, remove, _executable_perms())
+        if completion:
+            for x in sources:
+                install_completion(completion, x, os.path.splitext(os.path.basename(x))[0], remove)
+        if not remove:
+            path_env = os.environ.get('PATH')
+            if not no_check_path and (not path_env or dest_dir not in path_env):
+                print("Please add your local bin path [%s] to your environment PATH" % dest_dir)
+        return
     target = os.path.join(dest_dir, target_name if target_name else os.path.splitext(os.path.basename(source))[0])
     target_exists = os.path.exists(target)
     if remove:
+        if os.path.isfile(target + '.clingon-config'):
+            os.unlink(target + '.clingon-config')
         if target_exists:
             os.unlink(target)
             print("Script '%s' removed" % target)
         else:
             print("Script '%s' not found, nothing to do" % target)
+        if completion:
+            install_completion(completion, source, os.path.basename(target), remove)
         return
     if not os.path.exists(source):
         raise RunnerError("Could not find source '%s', aborting" % source)
@@ -524,6 +1509,8 @@ def make_script(python_script, target_path='', target_name='', user=False, make_
 
         if same_file_same_type(source, target):
             print("Target '%s' already created, nothing to do" % target)
+            if completion:
+                install_completion(completion, source, os.path.basename(target))
             return
         elif not force:
             raise RunnerError("Target '%s' already exists, aborting" % target)
@@ -544,11 +1531,7 @@ def make_script(python_script, target_path='', target_name='', user=False, make_
     # Now it's time to copy or symlink file
     if target_exists:
         os.unlink(target)
-    import stat
-
-    perms = stat.S_IXUSR | stat.S_IXGRP
-    if os.getuid() == 0:
-        perms |= stat.S_IXOTH
+    perms = _executable_perms()
     if make_link:
         st = os.stat(source)
         if st.st_mode & perms != perms:
@@ -564,15 +1547,47 @@ def make_script(python_script, target_path='', target_name='', user=False, make_
         st = os.stat(target)
         os.chmod(target, st.st_mode | perms)
         print('Script %s has been copied to %s' % (source, target))
-        # check PATH and advise user to update it if relevant
+    if compile_config:
+        from clingon.registry import load_clizer
+        print('Options have been compiled to %s' % load_clizer(target).write_options_snapshot())
+    if completion:
+        install_completion(completion, source, os.path.basename(target))
+    # check PATH and advise user to update it if relevant
     path_env = os.environ.get('PATH')
     if not no_check_path and (not path_env or dest_dir not in path_env):
         print("Please add your local bin path [%s] to your environment PATH" % dest_dir)
 
 
+@set_variables(VERSION=__version__)
+def compile_config(python_script):
+    """v{VERSION}
+    Searches, reads and evaluates once the options file and environment
+    options of a clized script, and writes them into a snapshot next to
+    the script (script.clingon-config). At startup, the script then only
+    checks that the snapshot is still valid (same script, same options
+    file found, unmodified) instead of searching, parsing and evaluating.
+    """
+    from clingon.registry import load_clizer
+
+    source = os.path.abspath(python_script)
+    if not os.path.exists(source):
+        raise RunnerError("Could not find source '%s', aborting" % source)
+    path = load_clizer(source).write_options_snapshot()
+    print('Options of %s have been compiled to %s' % (source, path))
+
+
 def clingon_script():
-    return clize(make_link=('m', 's', 'l'), force=('f', 'o'), target_path='p', target_name='n')(
-        set_variables(VERSION=__version__)(make_script))
+    from clingon.registry import Registry
+
+    registry = Registry('clingon', default='install')
+    registry.add('install', 'clingon.clingon', 'make_script', summary='Installs a clized script', aliases=dict(
+        make_link=('m', 's', 'l'), force=('f', 'o'), target_path='p', target_name='n', multi_call='c'))
+    registry.add('compile-config', 'clingon.clingon', 'compile_config',
+                 summary='Snapshots the evaluated options of a clized script')
+    registry.add('pipe', 'clingon.pipeline', 'pipe', summary='Runs clized scripts as a pipeline in one process')
+    registry.add('profile', 'clingon.profiling', 'profile', summary='Profiles the imports and startup of a script',
+                 aliases=dict(top='t', json='j', end_of_options=True))
+    return registry if DELAY_EXECUTION else registry()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+"""
+Static shell completion scripts for clized scripts.
+Completion scripts are generated once from the Clizer schema and then run entirely
+in the shell, so that a keypress never starts python nor imports the script.
+A generated script checks the modification time of its source and regenerates
+itself when the source changes.
+
+usage: python -m clingon.completion bash|zsh|fish script.py [--name <str>] [--output <str>]
+"""
+
+from __future__ import print_function, absolute_import
+
+import array
+import os
+import re
+import sys
+
+SHELLS = ('bash', 'zsh', 'fish')
+
+
+def load_clizer(file):
+    """ Returns the Clizer of script file, built statically if possible, else by importing it
+    """
+    from clingon import static, registry
+
+    return static.load_clizer(file) or registry.load_clizer(file)
+
+
+def completion_path(shell, name):
+    """ Returns the path where shell loads the completion of command name from, for the current user
+    """
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    if shell == 'bash':
+        return os.path.join(os.environ.get('BASH_COMPLETION_USER_DIR') or os.path.join(data_home, 'bash-completion'),
+                            'completions', name)
+    if shell == 'zsh':
+        return os.path.join(os.environ.get('ZDOTDIR') or os.path.expanduser('~'), '.zfunc', '_' + name)
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'fish', 'completions', name + '.fish')
+
+
+def get_options(clizer):
+    """ Returns a list of (long option, short options, arity, description) for all options of clizer,
+        arity is 0 for booleans, 1 for single values and '*' for lists
+    """
+    result = []
+    for option, default in clizer._options.items():
+        python_name = clizer.options_equ[option]
+        shorts = ['-' + x for x in clizer.options_aliases.get(python_name, ())]
+        arity = 0 if isinstance(default, bool) else '*' if isinstance(default, (list, array.array)) else 1
+        result.append((option, shorts, arity, 'default=%r' % (default,)))
+    if clizer._get_variable('VERSION'):
+        result.append((clizer._version_options[0], list(clizer._version_options[1:]), 0, 'print version'))
+    result.append((clizer._help_options[0], list(clizer._help_options[1:]), 0, 'print help'))
+    return result
+
+
+def _function_name(name):
+    return '_clingon_' + re.sub(r'\W', '_', name)
+
+
+def _quote(s):
+    return "'" + s.replace("'", "'\\''") + "'"
+
+
+def _regenerate_command(shell, source, name, output):
+    return ' '.join(_quote(x) for x in (sys.executable, '-m', 'clingon.completion', shell, source,
+                                        '--name', name, '--output', output))
+
+
+def bash(clizer, name, source, output=None):
+    function = _function_name(name)
+    options = get_options(clizer)
+    words = ' '.join(o for option, shorts, _, _ in options for o in [option] + shorts)
+    with_value = '|'.join(_quote(o) for option, shorts, arity, _ in options if arity for o in [option] + shorts)
+    lines = [
+        '# bash completion of %s, generated by clingon from %s' % (name, source),
+        '%s() {' % function,
+    ]
+    if output:
+        lines += [
+            '    if [[ %s -nt %s ]]; then' % (_quote(source), _quote(output)),
+            '        %s && . %s && %s && return' % (_regenerate_command('bash', source, name, output),
+                                                    _quote(output), function),
+            '    fi',
+        ]
+    lines += [
+        '    local cur=${COMP_WORDS[COMP_CWORD]} prev=${COMP_WORDS[COMP_CWORD-1]} word',
+        '    COMPREPLY=()',
+    ]
+    if with_value:
+        lines += [
+            '    case "$prev" in',
+            '        %s)' % with_value,
+            '            while IFS= read -r word; do COMPREPLY+=("$word"); done < <(compgen -f -- "$cur")',
+            '            return;;',
+            '    esac',
+        ]
+    lines += [
+        '    if [[ "$cur" == -* ]]; then',
+        '        while IFS= read -r word; do COMPREPLY+=("$word"); done < <(compgen -W %s -- "$cur")' % _quote(words),
+        '    else',
+        '        while IFS= read -r word; do COMPREPLY+=("$word"); done < <(compgen -f -- "$cur")',
+        '    fi',
+        '}',
+        'complete -o filenames -F %s %s' % (function, _quote(name)),
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def zsh(clizer, name, source, output=None):
+    function = _function_name(name)
+    specs = []
+    for option, shorts, arity, description in get_options(clizer):
+        flags = [option] + shorts
+        description = re.sub(r'([\[\]:\\])', r'\\\1', description)
+        value = ':value:_files' if arity else ''
+        if len(flags) == 1:
+            specs.append(_quote('%s[%s]%s' % (option, description, value)))
+        else:
+            specs.append(_quote('(%s)' % ' '.join(flags)) + '{%s}' % ','.join(flags) +
+                         _quote('[%s]%s' % (description, value)))
+    specs.append(_quote('*:argument:_files'))
+    lines = [
+        '#compdef %s' % name,
+        '# zsh completion of %s, generated by clingon from %s' % (name, source),
+        '%s() {' % function,
+    ]
+    if output:
+        lines += [
+            '    if [[ %s -nt %s ]]; then' % (_quote(source), _quote(output)),
+            '        %s && . %s && %s && return' % (_regenerate_command('zsh', source, name, output),
+                                                    _quote(output), function),
+            '    fi',
+        ]
+    lines += [
+        '    _arguments -s \\',
+        '\n'.join('        %s \\' % spec for spec in specs[:-1]),
+        '        %s' % specs[-1],
+        '}',
+        # autoloaded from fpath, or sourced
+        'if [[ "$funcstack[1]" == %s ]]; then' % _quote('_' + name),
+        '    %s "$@"' % function,
+        'else',
+        '    compdef %s %s' % (function, _quote(name)),
+        'fi',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def fish(clizer, name, source, output=None):
+    lines = ['# fish completion of %s, generated by clingon from %s' % (name, source)]
+    if output:
+        # fish has no completion hook: a condition that never matches checks the source once per completion
+        function = _function_name(name)
+        lines += [
+            'function %s' % function,
+            '    if test (command stat -c %%Y %s 2>/dev/null; or command stat -f %%m %s) != %d' %
+            (_quote(source), _quote(source), int(os.stat(source).st_mtime)),
+            '        complete -c %s -e' % _quote(name),
+            '        %s; and source %s' % (_regenerate_command('fish', source, name, output), _quote(output)),
+            '    end',
+            '    return 1',
+            'end',
+            'complete -c %s -n %s' % (_quote(name), function),
+        ]
+    for option, shorts, arity, description in get_options(clizer):
+        spec = 'complete -c %s' % _quote(name)
+        for flag in [option] + shorts:
+            spec += (' -l %s' if flag.startswith('--') else ' -s %s') % _quote(flag.lstrip('-'))
+        if arity:
+            spec += ' -r -F'
+        lines.append(spec + ' -d %s' % _quote(description))
+    return '\n'.join(lines) + '\n'
+
+
+GENERATORS = dict(bash=bash, zsh=zsh, fish=fish)
+
+
+def generate(shell, python_script, name='', output=''):
+    """ Generates the completion script of python_script for shell, written to output if given
+    """
+    from clingon import clingon
+
+    if shell not in GENERATORS:
+        raise clingon.RunnerErrorWithUsage("Unknown shell '%s', choose from %s" % (shell, ', '.join(SHELLS)))
+    source = os.path.abspath(python_script)
+    if not os.path.exists(source):
+        raise clingon.RunnerError("Could not find source '%s', aborting" % source)
+    name = name or os.path.splitext(os.path.basename(source))[0]
+    output = output and os.path.abspath(output)
+    script = GENERATORS[shell](load_clizer(source), name, source, output)
+    if not output:
+        sys.stdout.write(script)
+        return
+    if not os.path.isdir(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+    tmp_output = '%s.%d' % (output, os.getpid())
+    with open(tmp_output, 'w') as f:
+        f.write(script)
+    os.rename(tmp_output, output)
+
+
+def install(shell, python_script, name, remove=False):
+    """ Installs (or removes) the completion script of command name for shell, in the user's completion directory
+    """
+    from clingon import clingon
+
+    if shell not in GENERATORS:
+        raise clingon.RunnerErrorWithUsage("Unknown shell '%s', choose from %s" % (shell, ', '.join(SHELLS)))
+    output = completion_path(shell, name)
+    if remove:
+        if os.path.exists(output):
+            os.unlink(output)
+            print("Completion '%s' removed" % output)
+        return
+    generate(shell, python_script, name, output)
+    print('Completion of %s has been written to %s' % (name, output))
+    if shell == 'zsh':
+        print("Please add [%s] to your fpath if not done yet" % os.path.dirname(output))
+
+
+def completion_script():
+    from clingon import clingon
+
+    return clingon.clize(generate)
+
+
+if __name__ == '__main__':
+    completion_script()
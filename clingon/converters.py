@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+Conversion of option values.
+parse_literal replaces eval for values found in environment and configuration files,
+and the converters of extra option types are selected per option with the
+set_converters decorator, by name (see CONVERTERS) or as callables.
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+
+from past.builtins import basestring
+
+SCALAR_TYPES = (str, bool, int, float)
+
+_int = re.compile(r'[-+]?(?:0|[1-9]\d*)$')
+_float = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][-+]?\d+)?$')
+_string = re.compile(r'''(?:'[^'\\\n]*'|"[^"\\\n]*")$''')
+_number_list = re.compile(r'\[([-+.\deE, \t]*[\d.])\s*,?\s*\]$')
+# first characters of literals that need ast.literal_eval
+_complex_literal = frozenset('\'"[(-+.0123456789bruBRU')
+
+# parsed values, by string
+_literals = {}
+MAX_LITERALS = 4096
+
+
+def _parse_number(s):
+    if _int.match(s):
+        return int(s)
+    if _float.match(s):
+        return float(s)
+
+
+def _parse_literal(value):
+    s = value.strip()
+    if s in ('True', 'False'):
+        return s == 'True'
+    number = _parse_number(s)
+    if number is not None:
+        return number
+    if _string.match(s):
+        return s[1:-1]
+    m = _number_list.match(s)
+    if m:
+        numbers = [_parse_number(x.strip()) for x in m.group(1).split(',')]
+        if None not in numbers:
+            return numbers
+    if not s or s[0] not in _complex_literal:
+        return value
+    import ast
+
+    try:
+        result = ast.literal_eval(s)
+    except (SyntaxError, ValueError, TypeError):
+        return value
+    if type(result) in SCALAR_TYPES:
+        return result
+    if type(result) in (list, tuple):
+        for v in result:
+            if type(v) not in SCALAR_TYPES:
+                raise ValueError("Value of element of list object has wrong type %s" % (v,))
+        return result
+    return value
+
+
+def parse_literal(value):
+    """ Parses a python literal of type str, bool, int or float, or a list or tuple of such literals.
+        Results are cached by string.
+    :return: the parsed value, or value itself if it is not a string or not such a literal
+    :raises ValueError: if a list or tuple holds other values
+    """
+    if not isinstance(value, basestring):
+        return value
+    try:
+        result = _literals[value]
+    except KeyError:
+        if len(_literals) >= MAX_LITERALS:
+            _literals.clear()
+        result = _literals[value] = _parse_literal(value)
+    # lists are mutable, do not share them
+    return list(result) if type(result) is list else result
+
+
+_bytesize = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*(?:([kmgtpe])(i?))?(b?)\s*$', re.I)
+_duration = re.compile(r'(\d+(?:\.\d*)?|\.\d+)\s*(ms|s|m|h|d|w)', re.I)
+_durations = dict(ms=0.001, s=1, m=60, h=3600, d=86400, w=604800)
+
+
+def bytesize(value):
+    """ Converts a size in bytes, such as '512', '10k', '1.5M', '2GiB' or '2GB', to an int.
+        Suffixes alone and with 'iB' are powers of 1024, suffixes with 'B' are powers of 1000.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    m = _bytesize.match(value)
+    if not m:
+        raise ValueError("Invalid size %r" % value)
+    number, unit, binary, byte = m.groups()
+    if unit:
+        base = 1000 if byte and not binary else 1024
+        number = float(number) * base ** ('kmgtpe'.index(unit.lower()) + 1)
+    return int(float(number))
+
+
+def duration(value):
+    """ Converts a duration, such as '30', '500ms', '5m' or '1h30m', to seconds (a float).
+        Units are ms, s, m, h, d and w, numbers without unit are seconds.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _duration.findall(value)
+    if not parts or ''.join(n + u for n, u in parts) != re.sub(r'\s', '', value):
+        raise ValueError("Invalid duration %r" % value)
+    return sum(float(n) * _durations[u.lower()] for n, u in parts)
+
+
+def path(value):
+    """ Converts a path to an absolute path, expanding '~'
+    """
+    return os.path.abspath(os.path.expanduser(value))
+
+
+CONVERTERS = dict(bytesize=bytesize, duration=duration, path=path)
+
+
+def register_converter(name, function):
+    """ Makes function available to set_converters as name.
+        function takes a string and returns the converted value, or raises ValueError.
+    """
+    CONVERTERS[name] = function
+
+
+def get_converter(converter):
+    """ Returns the converter function of converter, a registered name or a callable
+    """
+    if hasattr(converter, '__call__'):
+        return converter
+    try:
+        return CONVERTERS[converter]
+    except KeyError:
+        raise ValueError("Unknown converter '%s', choose from %s" % (converter, ', '.join(sorted(CONVERTERS))))
+
+
+def converter_name(converter):
+    return getattr(converter, '__name__', converter)
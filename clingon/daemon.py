@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+"""
+Warm process daemon for clized scripts.
+The daemon imports a clized script once, then forks a child for each request,
+so that heavy imports are paid once per daemon, not once per invocation.
+The thin client forwards argv, environment, cwd and its stdin/stdout/stderr
+file descriptors over a unix socket, and exits with the child's exit code.
+
+usage: python -m clingon.daemon script.py [script args]
+       python -m clingon.daemon --stop script.py
+"""
+
+from __future__ import print_function, absolute_import
+
+import array
+import errno
+import hashlib
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import time
+
+# seconds without any request before the daemon exits
+IDLE_TIMEOUT = int(os.environ.get('CLINGON_DAEMON_IDLE', 600))
+# seconds the client waits for a freshly spawned daemon
+START_TIMEOUT = 10.
+# status sent back by a daemon that saw its script change and is going to exit
+RESTART_STATUS = -1
+
+_header_format = '!I'
+_status_format = '!i'
+
+
+def runtime_dir():
+    """ Returns the directory of daemon sockets: $CLINGON_RUNTIME_DIR, $XDG_RUNTIME_DIR, or else
+        a clingon-<uid> directory of the temp directory, private to the user.
+        Returns None if the latter exists and is not private, as another user may have created it.
+    """
+    directory = os.environ.get('CLINGON_RUNTIME_DIR') or os.environ.get('XDG_RUNTIME_DIR')
+    if directory:
+        return directory
+    directory = os.path.join(tempfile.gettempdir(), 'clingon-%d' % os.getuid())
+    try:
+        os.mkdir(directory, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return
+    st = os.lstat(directory)
+    if stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077:
+        return directory
+
+
+def socket_path(script):
+    """ Returns the path of the unix socket of the daemon serving this script, None if there is
+        no private directory for it, see runtime_dir()
+    """
+    directory = runtime_dir()
+    if directory is None:
+        return
+    key = hashlib.sha1(os.path.abspath(script).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, 'clingon-%d-%s.sock' % (os.getuid(), key))
+
+
+def peer_uid(sock):
+    """ Returns the uid of the process at the other end of unix socket sock, None if the platform can't tell
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    pid, uid, gid = struct.unpack('3i', credentials)
+    return uid
+
+
+def _is_own_socket(sock, path):
+    """ Tells whether the daemon listening on path runs as the current user, so that the environment
+        and the standard streams of the client can be sent to it
+    """
+    uid = peer_uid(sock)
+    if uid is None:
+        try:
+            uid = os.stat(path).st_uid
+        except OSError:
+            return False
+    return uid == os.getuid()
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime, st.st_size
+
+
+def _recv_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed by peer")
+        data += chunk
+    return data
+
+
+def send_request(sock, request, fds=()):
+    """ Sends a json request, the standard streams file descriptors go along with the header
+    """
+    payload = json.dumps(request).encode('utf-8')
+    header = struct.pack(_header_format, len(payload))
+    if fds:
+        sock.sendmsg([header], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+    else:
+        sock.sendall(header)
+    sock.sendall(payload)
+
+
+def recv_request(sock, max_fds=3):
+    fds = array.array('i')
+    header, ancdata, _, _ = sock.recvmsg(struct.calcsize(_header_format),
+                                         socket.CMSG_SPACE(max_fds * fds.itemsize))
+    for level, type_, data in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    if len(header) < struct.calcsize(_header_format):
+        header += _recv_exactly(sock, struct.calcsize(_header_format) - len(header))
+    size, = struct.unpack(_header_format, header)
+    return json.loads(_recv_exactly(sock, size).decode('utf-8')), list(fds)
+
+
+def send_status(sock, status):
+    sock.sendall(struct.pack(_status_format, status))
+
+
+def recv_status(sock):
+    return struct.unpack(_status_format, _recv_exactly(sock, struct.calcsize(_status_format)))[0]
+
+
+class Daemon(object):
+    """
+    Serves one clized script on a unix socket.
+    Each request is run in a forked child that inherits the warm imported module,
+    so the Clizer behaves exactly as if the script was started from the shell.
+    """
+
+    def __init__(self, script, idle_timeout=IDLE_TIMEOUT):
+        self.script = os.path.abspath(script)
+        self.idle_timeout = idle_timeout
+        self.path = socket_path(self.script)
+        if self.path is None:
+            from clingon import clingon
+            raise clingon.RunnerError("No private runtime directory for the socket of '%s'" % self.script)
+        self.stamp = _file_stamp(self.script)
+        from clingon.registry import load_clizer
+        # the script imports its neighbour modules, as when run directly
+        sys.path.insert(0, os.path.dirname(self.script))
+        self.clizer = load_clizer(self.script)
+        self.listener = None
+
+    def bind(self):
+        # bind to a private path and rename it, so clients never see a half-initialized socket
+        tmp_path = '%s.%d' % (self.path, os.getpid())
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(tmp_path)
+        self.listener.listen(64)
+        os.rename(tmp_path, self.path)
+        self.inode = os.stat(self.path).st_ino
+        self.listener.settimeout(self.idle_timeout)
+
+    def close(self):
+        """ Stops listening, and removes the socket unless another daemon replaced it
+        """
+        if self.listener is None:
+            return
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                os.unlink(self.path)
+        except OSError:
+            pass
+        self.listener.close()
+        self.listener = None
+
+    def serve(self):
+        self.bind()
+        try:
+            while True:
+                self._reap_children()
+                try:
+                    conn, _ = self.listener.accept()
+                except socket.timeout:
+                    return
+                # requests are only accepted from the user of the daemon
+                if peer_uid(conn) not in (None, os.getuid()):
+                    conn.close()
+                    continue
+                conn.settimeout(None)
+                try:
+                    if not self._handle(conn):
+                        return
+                finally:
+                    conn.close()
+        finally:
+            self.close()
+
+    @staticmethod
+    def _reap_children():
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0]:
+                pass
+        except OSError as e:
+            if e.errno != errno.ECHILD:
+                raise
+
+    def _handle(self, conn):
+        """ Returns False when the daemon must exit
+        """
+        request, fds = recv_request(conn)
+        try:
+            if request.get('stop'):
+                send_status(conn, 0)
+                return False
+            try:
+                changed = _file_stamp(self.script) != self.stamp
+            except OSError:
+                changed = True
+            if changed:
+                # stop listening before answering, so that the client cannot reach this daemon again
+                self.close()
+                send_status(conn, RESTART_STATUS)
+                return False
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if not os.fork():
+                self.listener.close()
+                self._run_child(conn, request, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        return True
+
+    def _run_child(self, conn, request, fds):
+        code = 1
+        try:
+            for target, fd in zip((0, 1, 2), fds):
+                os.dup2(fd, target)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            send_status(conn, os.getpid())
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            sys.argv = [self.script] + request['argv']
+            try:
+                self.clizer()
+                code = 0
+            except SystemExit as e:
+                code = self.clizer._exit_code(e)
+        except KeyboardInterrupt:
+            code = 128 + signal.SIGINT
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                send_status(conn, code)
+            finally:
+                os._exit(0)
+
+
+def spawn_daemon(script):
+    import subprocess
+
+    with open(os.devnull, 'r+b') as devnull:
+        subprocess.Popen([sys.executable, '-m', 'clingon.daemon', '--serve', script],
+                         stdin=devnull, stdout=devnull, stderr=devnull,
+                         close_fds=True, start_new_session=True)
+
+
+def connect(script, spawn=True):
+    """ Connects to the daemon serving script, spawning it if needed.
+        Returns None if no daemon could be reached.
+    """
+    path = socket_path(script)
+    if path is None:
+        return
+    deadline = None
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except (OSError, socket.error):
+            sock.close()
+        else:
+            if _is_own_socket(sock, path):
+                return sock
+            sock.close()
+            return
+        if not spawn:
+            return
+        if deadline is None:
+            if os.path.exists(path):
+                # stale socket left by a killed daemon
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            spawn_daemon(script)
+            deadline = time.time() + START_TIMEOUT
+        elif time.time() > deadline:
+            return
+        time.sleep(0.01)
+
+
+def call(script, args):
+    """ Runs clized script with args through its daemon and returns the exit code.
+        Returns None if the daemon could not be reached.
+    """
+    script = os.path.abspath(script)
+    for _ in range(3):
+        sock = connect(script)
+        if sock is None:
+            return
+        try:
+            try:
+                send_request(sock, dict(argv=list(args), env=dict(os.environ), cwd=os.getcwd()), (0, 1, 2))
+                pid = recv_status(sock)
+            except (EOFError, socket.error):
+                # daemon exited before handling the request, nothing was run yet
+                continue
+            if pid == RESTART_STATUS:
+                continue
+
+            def forward(signum, frame):
+                os.kill(pid, signum)
+
+            handlers = [(s, signal.signal(s, forward)) for s in (signal.SIGINT, signal.SIGTERM)]
+            try:
+                return recv_status(sock)
+            finally:
+                for s, handler in handlers:
+                    signal.signal(s, handler)
+        except EOFError:
+            return 1
+        finally:
+            sock.close()
+
+
+def stop(script):
+    sock = connect(os.path.abspath(script), spawn=False)
+    if sock:
+        try:
+            send_request(sock, dict(stop=True))
+            recv_status(sock)
+        finally:
+            sock.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('--serve', '--stop') and len(argv) < 2:
+        sys.stderr.write("usage: python -m clingon.daemon [--serve | --stop] script.py [args]\n")
+        return 1
+    if argv[0] == '--serve':
+        Daemon(argv[1]).serve()
+        return 0
+    if argv[0] == '--stop':
+        stop(argv[1])
+        return 0
+    script, args = argv[0], argv[1:]
+    from clingon import static
+
+    if static.handle(script, args):
+        return 0
+    code = call(script, args) if hasattr(socket, 'AF_UNIX') and hasattr(socket.socket, 'sendmsg') else None
+    if code is None:
+        # no daemon available: run the script the usual way
+        os.execv(sys.executable, [sys.executable, script] + args)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Journal of the varargs items completed by a parallel clized function, see setting 'journal'.
+Items are appended to the journal, one repr per line, as they succeed, and the journal is
+synced by batches. A run with --resume skips the items found in the journal of the same
+function called with the same other parameters.
+This module is only imported by functions with this setting.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import sys
+import time
+
+# the journal is synced to disk every SYNC_ITEMS items or SYNC_INTERVAL seconds
+SYNC_ITEMS = 1000
+SYNC_INTERVAL = 1.0
+
+
+class Journal(object):
+    """ Append-only record of completed items, usable as a context manager
+    """
+    def __init__(self, path, resume=False, sync_items=SYNC_ITEMS, sync_interval=SYNC_INTERVAL):
+        self.path = path
+        self.done = set()
+        partial = False
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    # a last line without newline was not completely written
+                    partial = not line.endswith('\n')
+                    if not partial:
+                        self.done.add(line[:-1])
+        if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        self.file = open(path, 'a' if resume else 'w')
+        if partial:
+            self.file.write('\n')
+        self.sync_items, self.sync_interval = sync_items, sync_interval
+        self.pending, self.synced = 0, time.time()
+        # whether the journal is removed when closed
+        self.remove = False
+
+    def skip_done(self, items):
+        """ Iterates over the items not done according to the journal
+        """
+        if not self.done:
+            for item in items:
+                yield item
+            return
+        skipped = 0
+        for item in items:
+            if repr(item) in self.done:
+                skipped += 1
+            else:
+                yield item
+        sys.stderr.write('%d items already done according to %s\n' % (skipped, self.path))
+
+    def add(self, item):
+        self.file.write(repr(item) + '\n')
+        self.pending += 1
+        if self.pending >= self.sync_items or time.time() - self.synced >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending, self.synced = 0, time.time()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+        if self.remove:
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def journal_path(clizer, args):
+    """ Returns the journal path of clizer called with args (all parameters but varargs).
+        Journals are kept in the clingon cache directory, unless setting 'journal' is a path.
+    """
+    from clingon import cache
+
+    if not isinstance(clizer.journal, bool):
+        return clizer.journal
+    key = (os.path.abspath(clizer.file), clizer.func.__name__, repr(args))
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(cache.CACHE_DIR, 'journals', digest + '.journal')
+
+
+def open_journal(clizer, args, resume=False):
+    return Journal(journal_path(clizer, args), resume)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memoisation of the runs of clized functions, see setting 'cache'.
+The output (stdout and stderr) and the exit code of a run are cached per user, keyed
+by the resolved parameters of the function and the fingerprints of its input files,
+and replayed when the same run is asked again.
+This module is only imported by functions with this setting.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import sys
+import time
+
+from past.builtins import basestring
+
+from clingon import cache
+
+SECTION = 'results'
+DEFAULT_MAX_AGE = 24 * 3600
+DEFAULT_MAX_SIZE = 100 << 20
+
+
+class _Tee(object):
+    """ Writes to stream and keeps a copy of what was written
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.parts = []
+
+    def write(self, s):
+        self.parts.append(s)
+        return self.stream.write(s)
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def fingerprint(path, content_hash=False):
+    """ Returns a tuple that changes whenever file path is modified, by stat or by content hash
+    """
+    path = os.path.abspath(path)
+    try:
+        if not content_hash:
+            return (path,) + cache.file_stamp(path)
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return path, digest.hexdigest()
+    except (IOError, OSError):
+        return path, None
+
+
+def prune(directory, max_age=DEFAULT_MAX_AGE, max_size=DEFAULT_MAX_SIZE):
+    """ Removes the entries of directory unused for max_age seconds, then the least recently
+        used ones until the entries total at most max_size bytes
+    """
+    now, entries = time.time(), []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+            if now - st.st_mtime > max_age:
+                os.unlink(path)
+                continue
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def _get_settings(clizer):
+    settings = clizer.cache if isinstance(clizer.cache, dict) else {}
+    inputs = settings.get('inputs', ())
+    return ((inputs,) if isinstance(inputs, basestring) else tuple(inputs), settings.get('hash', False),
+            settings.get('max_age', DEFAULT_MAX_AGE), settings.get('max_size', DEFAULT_MAX_SIZE))
+
+
+def result_key(clizer, allargs, varargs, inputs=(), content_hash=False):
+    """ Returns the cache key of a run of clizer with resolved parameters, or None if it can't be cached
+    """
+    schema_key = clizer._schema_cache_key()
+    if schema_key is None:
+        return
+    parameters = dict(zip(clizer.reqargs + list(clizer.python_options), allargs))
+    parameters[clizer.varargs] = varargs
+    fingerprints = []
+    for name in inputs:
+        value = parameters.get(name)
+        for path in value if isinstance(value, (list, tuple)) else [value]:
+            if path:
+                fingerprints.append(fingerprint(path, content_hash))
+    return 'result', schema_key, repr(allargs), repr(varargs), fingerprints
+
+
+def cached_run(clizer, prepared, run):
+    """ Replays the output and exit code of run(prepared) if cached, else runs it and caches them.
+        Runs that raise, or whose output was cut by a broken pipe, are not cached.
+    """
+    allargs, varargs, injected = prepared
+    inputs, content_hash, max_age, max_size = _get_settings(clizer)
+    key = None if injected['no_cache'] else result_key(clizer, allargs, list(varargs), inputs, content_hash)
+    if key is None:
+        return run(prepared)
+    path = cache.cache_path(SECTION, key)
+    if not injected['refresh_cache']:
+        entry = cache.load(path, key)
+        if entry is not None and time.time() - entry[0] <= max_age:
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            created, out, err, code = entry
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            return code
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _Tee(stdout), _Tee(stderr)
+    try:
+        result = run(prepared)
+        out, err = sys.stdout.getvalue(), sys.stderr.getvalue()
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    from clingon import output
+
+    code = result if type(result) is int else 0
+    if code != output.BROKEN_PIPE_EXIT_CODE and cache.save(path, key, (time.time(), out, err, code)):
+        prune(os.path.dirname(path), max_age, max_size)
+    return result
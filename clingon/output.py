@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming of the items of iterators returned by clized functions, see setting 'output'.
+This module is only imported when such an iterator is returned.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import os
+import sys
+import time
+
+FORMATS = ('lines', 'jsonl', 'nul')
+# records are joined and written by batches of at most BATCH_RECORDS records or BATCH_SIZE characters
+BATCH_RECORDS = 1024
+BATCH_SIZE = 1 << 16
+# exit code of a process killed by SIGPIPE
+BROKEN_PIPE_EXIT_CODE = 128 + 13
+
+
+def _line(item):
+    if isinstance(item, (tuple, list)):
+        return '\t'.join(str(x) for x in item) + '\n'
+    return '%s\n' % (item,)
+
+
+def _nul(item):
+    return '%s\0' % (item,)
+
+
+def _formatter(fmt):
+    if fmt == 'jsonl':
+        import json
+
+        encode = json.JSONEncoder(default=str).encode
+        return lambda item: encode(item) + '\n'
+    return _line if fmt == 'lines' else _nul
+
+
+def _is_broken_pipe(e):
+    return isinstance(e, (IOError, OSError)) and e.errno == errno.EPIPE
+
+
+def _silence_stdout():
+    """ Points stdout to devnull, so that the interpreter does not fail flushing it at exit
+    """
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except (AttributeError, ValueError, IOError, OSError):
+        pass
+
+
+def write_records(items, fmt='lines', flush=None, stream=None):
+    """ Writes the items of iterator items to stream (stdout by default), one record per item,
+        as text lines (tuples and lists as tab separated fields), json lines, or NUL terminated records.
+        Records are written by batches, flushed at the end and:
+        - after each record if flush is 'record',
+        - at least every flush seconds if flush is a number,
+        - after each record if stream is a terminal and flush is None.
+        A broken pipe (as with '| head') stops the iteration quietly.
+    :return: 0, or BROKEN_PIPE_EXIT_CODE if the pipe was broken
+    """
+    stream = stream or sys.stdout
+    format_record = _formatter(fmt)
+    if flush is None:
+        isatty = getattr(stream, 'isatty', None)
+        flush = 'record' if isatty and isatty() else None
+    interval = flush if isinstance(flush, (int, float)) and not isinstance(flush, bool) else None
+    batch_records = 1 if flush == 'record' else BATCH_RECORDS
+    batch, size, flushed = [], 0, time.time()
+    try:
+        try:
+            for item in items:
+                record = format_record(item)
+                batch.append(record)
+                size += len(record)
+                if len(batch) >= batch_records or size >= BATCH_SIZE:
+                    stream.write(''.join(batch))
+                    batch, size = [], 0
+                    if flush == 'record':
+                        stream.flush()
+                if interval is not None and time.time() - flushed >= interval:
+                    stream.write(''.join(batch))
+                    batch, size = [], 0
+                    stream.flush()
+                    flushed = time.time()
+        finally:
+            if batch:
+                stream.write(''.join(batch))
+            stream.flush()
+    except (IOError, OSError) as e:
+        if not _is_broken_pipe(e):
+            raise
+        if stream is sys.stdout:
+            _silence_stdout()
+        return BROKEN_PIPE_EXIT_CODE
+    finally:
+        close = getattr(items, 'close', None)
+        if close is not None:
+            close()
+    return 0
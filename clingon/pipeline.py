@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-process pipelines of clized functions.
+The iterator returned by each stage is given as input to the varargs of the next
+stage, so that items are neither serialised to text nor parsed back, and no
+interpreter is started per stage. With a queue size, each stage but the last is
+iterated in its own thread (or forked process), through a bounded queue.
+
+usage: clingon pipe [--queue-size <int>] [--processes] 'script.py x' '|' 'module:function -f y'
+"""
+
+from __future__ import print_function, absolute_import
+
+import os
+import sys
+
+SEPARATOR = '|'
+# items are passed through queues by batches
+BATCH_SIZE = 100
+
+
+def _feed(items, queue, batch_size):
+    """ Puts the items of iterator items into queue by batches, then None, or the error met
+    """
+    from clingon import clingon
+
+    try:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                queue.put(batch)
+                batch = []
+        if batch:
+            queue.put(batch)
+        queue.put(None)
+    except Exception as e:
+        queue.put(clingon.RunnerError(str(e)))
+
+
+def _iter_queue(queue, worker, parent):
+    try:
+        while True:
+            batch = queue.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            for item in batch:
+                yield item
+    finally:
+        # the reader stopped early: a process feeding the queue would block forever.
+        # The next stage may itself run in a process, that cannot manage its siblings.
+        if hasattr(worker, 'terminate') and os.getpid() == parent and worker.is_alive():
+            worker.terminate()
+
+
+def queued(items, queue_size, processes=False):
+    """ Iterates items in a thread, or a forked process if processes, through a queue of at most
+        queue_size batches
+    :return: an iterator over the items
+    """
+    if processes:
+        import multiprocessing
+        try:
+            context = multiprocessing.get_context('fork')
+        except (AttributeError, ValueError):
+            context = multiprocessing
+        queue = context.Queue(queue_size)
+        worker = context.Process(target=_feed, args=(items, queue, BATCH_SIZE))
+    else:
+        import threading
+        try:
+            import queue as queue_module
+        except ImportError:
+            import Queue as queue_module
+        queue = queue_module.Queue(queue_size)
+        worker = threading.Thread(target=_feed, args=(items, queue, BATCH_SIZE))
+    worker.daemon = True
+    worker.start()
+    return _iter_queue(queue, worker, os.getpid())
+
+
+def run(stages, queue_size=0, processes=False):
+    """ Runs stages, a list of (Clizer, parameters), as a pipeline: the result of each stage but the last
+        must be iterable, and its items are appended to the varargs of the next stage.
+        A stage with streamed or parallel varargs consumes its input lazily.
+    :return: the result of the last stage
+    """
+    from clingon import clingon
+
+    items = None
+    for k, (clizer, parameters) in enumerate(stages):
+        try:
+            result = clizer.call(parameters, items)
+        except clingon.RunnerErrorWithUsage as e:
+            clizer._print_usage(file=sys.stderr)
+            raise clingon.RunnerError(str(e))
+        if k == len(stages) - 1:
+            return result
+        if not hasattr(result, '__iter__') or isinstance(result, (str, bytes)):
+            raise clingon.RunnerError("Stage %d (%s) did not return an iterable" % (k + 1, clizer.func.__name__))
+        items = queued(iter(result), queue_size, processes) if queue_size else result
+
+
+def parse_stages(parameters):
+    """ Splits parameters on '|' into stages, each made of a target, script path or module name
+        (optionally followed by ':function'), and its parameters
+    :return: a list of (target, function, parameters)
+    """
+    import shlex
+
+    stages, words = [], []
+    for parameter in list(parameters) + [SEPARATOR]:
+        if parameter != SEPARATOR:
+            words.extend(shlex.split(parameter))
+            continue
+        if not words:
+            from clingon import clingon
+            raise clingon.RunnerErrorWithUsage("Empty stage %d in pipeline" % (len(stages) + 1))
+        target, function = words[0], None
+        if ':' in os.path.basename(target):
+            target, function = target.rsplit(':', 1)
+        stages.append((target, function, words[1:]))
+        words = []
+    return stages
+
+
+def pipe(queue_size=0, processes=False, *stages):
+    """
+    Runs clized scripts or functions as a pipeline in one process: the iterator returned by
+    each stage is given to the varargs of the next one. Stages are separated by '|' and made of
+    a script or module (module:function to select a function) and its parameters, quoted.
+    With a queue size, stages run in threads (or processes) with queues of this many batches.
+    The items returned by the last stage are written as lines.
+    """
+    from clingon import clingon, output, registry
+
+    loaded = []
+    for target, function, parameters in parse_stages(stages):
+        clizer = registry.load_clizer(target, function)
+        clizer.prog = target
+        loaded.append((clizer, parameters))
+    result = run(loaded, queue_size, processes)
+    last = loaded[-1][0]
+    if isinstance(result, clingon.Iterator):
+        return output.write_records(result, last.output or 'lines', last.output_flush)
+    return result
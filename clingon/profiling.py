@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""
+Startup profiler of clized scripts: runs a script under 'python -X importtime' and the
+hidden --clingon-timings flag, and reports the import time per module, the heaviest
+import chains, the time of the decorator setup versus the function body, and the
+top level imports that are not used at import time, and so could be deferred.
+
+usage: clingon profile [--top <int>] [--json] script.py [-- script parameters]
+
+Also the profilers of the runs of clized functions, used by the hidden flags
+--clingon-profile (cProfile) and --clingon-trace-malloc (tracemalloc).
+This module is only imported by the profile command and by these flags.
+"""
+
+from __future__ import print_function, absolute_import
+
+import os
+import sys
+
+IMPORTTIME_PREFIX = 'import time:'
+# roots of the import tree up to this module are imported by the interpreter, before the script runs
+STARTUP_LAST_MODULE = 'site'
+# number of functions or allocation sites in the summaries of profilers
+TOP = 20
+# traced memory is sampled every PEAK_INTERVAL seconds, and a snapshot is taken whenever it grew
+# by PEAK_GROWTH since the last one, so that allocation sites are reported near the peak
+PEAK_INTERVAL = 0.01
+PEAK_GROWTH = 1.1
+
+
+class Module(object):
+    """ Node of the import tree, times in seconds
+    """
+    def __init__(self, name, self_time, cumulative, children=()):
+        self.name = name
+        self.self_time = self_time
+        self.cumulative = cumulative
+        self.children = list(children)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            for module in child.walk():
+                yield module
+
+    def heaviest_chain(self):
+        """ Returns the list of modules from self following the heaviest child at each level
+        """
+        chain, module = [self], self
+        while module.children:
+            module = max(module.children, key=lambda m: m.cumulative)
+            chain.append(module)
+        return chain
+
+
+def parse_importtime(lines):
+    """ Parses the output of 'python -X importtime', where a module is written after the modules
+        it imports, with one more level of indentation
+    :return: the list of root modules of the import tree
+    """
+    pending = {}
+    for line in lines:
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        try:
+            self_time, cumulative, name = line[len(IMPORTTIME_PREFIX):].split('|', 2)
+            self_time, cumulative = int(self_time) * 1e-6, int(cumulative) * 1e-6
+        except ValueError:
+            # header line
+            continue
+        name = name.rstrip()[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        module = Module(name.strip(), self_time, cumulative, pending.pop(depth + 1, ()))
+        pending.setdefault(depth, []).append(module)
+    return pending.get(0, [])
+
+
+def split_startup(roots):
+    """ Splits root modules into those imported by the interpreter at startup and those imported by the script
+    """
+    for i, module in enumerate(roots):
+        if module.name == STARTUP_LAST_MODULE:
+            return roots[:i + 1], roots[i + 1:]
+    return [], roots
+
+
+def _bound_names(node):
+    """ Returns the list of (module, bound names) of an import statement, module being None if relative
+    """
+    import ast
+
+    if isinstance(node, ast.Import):
+        return [(alias.name, [alias.asname or alias.name.split('.')[0]]) for alias in node.names]
+    if node.level:
+        return [(None, [])]
+    return [(node.module, [alias.asname or alias.name for alias in node.names if alias.name != '*'])]
+
+
+def _import_time_names(tree):
+    """ Returns the set of names loaded when the module of tree is imported: in module level code,
+        class bodies, decorators, default values and annotations, but not in function bodies
+    """
+    import ast
+
+    names, nodes = set(), [tree]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        if isinstance(node, (ast.FunctionDef, getattr(ast, 'AsyncFunctionDef', ast.FunctionDef))):
+            nodes.extend(node.decorator_list)
+            nodes.append(node.args)
+            if getattr(node, 'returns', None) is not None:
+                nodes.append(node.returns)
+        elif isinstance(node, ast.Lambda):
+            nodes.append(node.args)
+        else:
+            nodes.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def deferrable_imports(source):
+    """ Returns the top level imports of source whose names are not used at import time,
+        as a list of (line, module, names)
+    """
+    import ast
+
+    tree = ast.parse(source)
+    used = _import_time_names(tree)
+    result, nodes = [], list(tree.body)
+    while nodes:
+        node = nodes.pop(0)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for module, names in _bound_names(node):
+                if module and module != '__future__' and names and not used.intersection(names):
+                    result.append((node.lineno, module, names))
+        elif isinstance(node, (ast.If, getattr(ast, 'Try', getattr(ast, 'TryExcept', None)))):
+            # imports guarded by a condition or by a fallback are still top level
+            nodes[:0] = list(node.body) + [n for h in getattr(node, 'handlers', []) for n in h.body] + \
+                list(node.orelse) + list(getattr(node, 'finalbody', []))
+    return result
+
+
+def _import_costs(roots):
+    """ Returns a dict of module name to its cumulative import time in the import trees of roots
+    """
+    costs = {}
+    for root in roots:
+        for m in root.walk():
+            costs[m.name] = max(costs.get(m.name, 0), m.cumulative)
+    return costs
+
+
+def run_script(script, parameters=()):
+    """ Runs script with parameters under import time tracing and clingon timings
+    :return: a tuple (exit code, wall time, importtime output lines, timings as a dict or None)
+    """
+    import json
+    import subprocess
+    import tempfile
+    from clingon import timings
+
+    fd, timings_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        # flags are appended, so that the first parameter of a script with subcommands is still the command
+        command = [sys.executable, '-X', 'importtime', script] + list(parameters) + \
+            ['--clingon-timings', 'json', '--clingon-timings-output', timings_path]
+        with open(os.devnull, 'w') as devnull:
+            start = timings.clock()
+            process = subprocess.Popen(command, stdout=devnull, stderr=subprocess.PIPE, universal_newlines=True)
+            _, err = process.communicate()
+            wall = timings.clock() - start
+        try:
+            with open(timings_path) as f:
+                phases = json.load(f)
+        except ValueError:
+            # the script is not clized, or exited before the end of its run
+            phases = None
+    finally:
+        os.unlink(timings_path)
+    return process.returncode, wall, err.splitlines(), phases
+
+
+def make_report(script, parameters=(), top=10):
+    """ Profiles the startup of script run with parameters
+    :return: the report as a dict, times in seconds
+    """
+    from clingon import clingon
+
+    if sys.version_info < (3, 7):
+        raise clingon.RunnerError("Import time profiling needs python 3.7 or later")
+    if not os.path.isfile(script):
+        raise clingon.RunnerError("Could not find script '%s'" % script)
+    code, wall, lines, phases = run_script(script, parameters)
+    startup, roots = split_startup(parse_importtime(lines))
+    modules = sorted((m for root in roots for m in root.walk()), key=lambda m: (-m.cumulative, -m.self_time))
+    with open(script) as f:
+        source = f.read()
+    costs, deferrable = _import_costs(roots), []
+    for line, module, names in deferrable_imports(source):
+        cost = costs.get(module)
+        if cost:
+            deferrable.append(dict(line=line, module=module, names=names, cumulative=cost))
+    durations = {}
+    for phase in (phases or {}).get('phases', ()):
+        durations[phase['name']] = durations.get(phase['name'], 0) + phase['duration']
+    return dict(
+        script=script,
+        exit_code=code,
+        wall=wall,
+        startup_imports=sum(m.cumulative for m in startup),
+        script_imports=sum(m.cumulative for m in roots),
+        phases=durations if phases is not None else None,
+        modules=[dict(name=m.name, self=m.self_time, cumulative=m.cumulative) for m in modules[:top]],
+        chains=[dict(cumulative=root.cumulative, chain=[m.name for m in root.heaviest_chain()])
+                for root in sorted(roots, key=lambda m: -m.cumulative)[:top]],
+        deferrable=sorted(deferrable, key=lambda d: -d['cumulative'])[:top],
+    )
+
+
+def _ms(t):
+    return '%10.3f ms' % (t * 1e3)
+
+
+def format_report(report):
+    """ Returns report as text, times in milliseconds
+    """
+    lines = ['%s: exit code %d, %.3f ms wall' % (report['script'], report['exit_code'], report['wall'] * 1e3), '',
+             '%-16s %s' % ('startup imports', _ms(report['startup_imports'])),
+             '%-16s %s' % ('script imports', _ms(report['script_imports']))]
+    phases = report['phases']
+    if phases is None:
+        lines.append('(no clingon timings, the script is not clized or did not complete)')
+    else:
+        parsing = sum(phases.get(name, 0) for name in ('environ', 'options_file', 'eval_variables', 'parse'))
+        lines.extend(['%-16s %s' % ('clingon setup', _ms(phases.get('setup', 0))),
+                      '%-16s %s' % ('clingon parsing', _ms(parsing)),
+                      '%-16s %s' % ('function body', _ms(phases.get('call', 0) + phases.get('output', 0)))])
+    if report['modules']:
+        lines.extend(['', 'Modules by cumulative import time:', '%13s %13s  %s' % ('cumulative', 'self', 'module')])
+        lines.extend('%s %s  %s' % (_ms(m['cumulative']), _ms(m['self']), m['name']) for m in report['modules'])
+    if report['chains']:
+        lines.extend(['', 'Heaviest import chains:'])
+        lines.extend('%s  %s' % (_ms(c['cumulative']), ' > '.join(c['chain'])) for c in report['chains'])
+    if report['deferrable']:
+        lines.extend(['', 'Imports not used at import time, that could be deferred into functions:'])
+        lines.extend('%s  line %d: %s (%s)' % (_ms(d['cumulative']), d['line'], d['module'], ', '.join(d['names']))
+                     for d in report['deferrable'])
+    return '\n'.join(lines) + '\n'
+
+
+def profile(python_script, top=10, json=False, *parameters):
+    """
+    Profiles the startup of a python script: runs it with the given parameters under
+    import time tracing, and reports the import time of modules, the heaviest import
+    chains, the time of clingon setup versus the function body, and the imports that
+    could be deferred. Give script parameters starting with '-' after '--'.
+    """
+    report = make_report(python_script, parameters, top)
+    if json:
+        import json as json_module
+        sys.stdout.write(json_module.dumps(report, indent=2) + '\n')
+    else:
+        sys.stdout.write(format_report(report))
+
+
+class CallProfiler(object):
+    """ Profiles calls with cProfile, then writes the stats to path and the top functions by cumulative time
+    """
+    def __init__(self, path, top=TOP):
+        import cProfile
+
+        self.path = path
+        self.top = top
+        self.profile = cProfile.Profile()
+
+    def runcall(self, func, *args):
+        return self.profile.runcall(func, *args)
+
+    def write_summary(self, stream):
+        import pstats
+
+        try:
+            self.profile.dump_stats(self.path)
+            stream.write('clingon: profile written to %s\n' % self.path)
+        except (IOError, OSError) as e:
+            stream.write("clingon: could not write profile to '%s': %s\n" % (self.path, e))
+        pstats.Stats(self.profile, stream=stream).sort_stats('cumulative').print_stats(self.top)
+
+
+def _format_size(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return '%.1f %s' % (size, unit) if unit != 'B' else '%d B' % size
+        size /= 1024.
+    return '%.1f GiB' % size
+
+
+class MallocTracer(object):
+    """ Traces the memory allocations of calls with tracemalloc, then writes the peak traced memory
+        and the top allocation sites of the largest snapshot, taken near the peak
+    """
+    def __init__(self, top=TOP):
+        try:
+            import tracemalloc  # noqa: F401, only checks that it is available
+        except ImportError:
+            from clingon import clingon
+            raise clingon.RunnerError("Option '--clingon-trace-malloc' needs python 3.4 or later")
+        self.top = top
+        self.peak = 0
+        self.snapshot, self.snapshot_size = None, 0
+
+    def _take_snapshot(self, size):
+        import tracemalloc
+
+        self.snapshot, self.snapshot_size = tracemalloc.take_snapshot(), size
+
+    def _sample(self, stop):
+        import tracemalloc
+
+        while not stop.wait(PEAK_INTERVAL):
+            size = tracemalloc.get_traced_memory()[0]
+            if size > self.snapshot_size * PEAK_GROWTH:
+                self._take_snapshot(size)
+
+    def runcall(self, func, *args):
+        import threading
+        import tracemalloc
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(stop,))
+        sampler.daemon = True
+        sampler.start()
+        try:
+            return func(*args)
+        finally:
+            stop.set()
+            sampler.join()
+            size, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            if self.snapshot is None or size > self.snapshot_size:
+                self._take_snapshot(size)
+            if started:
+                tracemalloc.stop()
+
+    def write_summary(self, stream):
+        import threading
+        import tracemalloc
+
+        stream.write('clingon: peak traced memory %s\n' % _format_size(self.peak))
+        if self.snapshot is None:
+            return
+        # allocations of the tracer and of its sampling thread are not reported
+        excluded = (__file__, tracemalloc.__file__, threading.__file__, '*_weakrefset.py')
+        snapshot = self.snapshot.filter_traces([tracemalloc.Filter(False, path) for path in excluded])
+        stream.write('clingon: top allocation sites, with %s traced:\n' % _format_size(self.snapshot_size))
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            stream.write('%12s %8d blocks  %s:%d\n' % (_format_size(stat.size), stat.count, frame.filename,
+                                                       frame.lineno))
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lazy loading registry of subcommands, for git style command line interfaces:
+    tool <command> [command args]
+Each command is recorded as a module (or script path) and a function name,
+its module is only imported when the command is invoked, so that startup time
+does not depend on the number of commands.
+"""
+
+from __future__ import print_function, absolute_import
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+import os
+import sys
+import textwrap
+
+
+def load_clizer(target, function=None, aliases=None):
+    """ Imports a module (dotted name) or a script (path) without running its clized function
+        and returns the Clizer of function (default the first one found).
+        aliases are the decorator keywords of a plain function.
+    """
+    from clingon import clingon
+
+    delay, clingon.DELAY_EXECUTION = clingon.DELAY_EXECUTION, True
+    try:
+        if target.endswith('.py') or os.sep in target:
+            import runpy
+            namespace = runpy.run_path(target, run_name='__clingon_command__')
+        else:
+            import importlib
+            namespace = vars(importlib.import_module(target))
+        if function:
+            try:
+                value = namespace[function]
+            except KeyError:
+                raise clingon.RunnerError("No function '%s' found in '%s'" % (function, target))
+            # a plain function is clized on the fly
+            return value if isinstance(value, clingon.Clizer) else clingon.clize(**aliases or {})(value)
+        for value in namespace.values():
+            if isinstance(value, clingon.Clizer):
+                return value
+        raise clingon.RunnerError("No clized function found in '%s'" % target)
+    finally:
+        clingon.DELAY_EXECUTION = delay
+
+
+def source_file(target):
+    """ Returns the source file of a module or script, without importing it (but its parent packages)
+    """
+    if target.endswith('.py') or os.sep in target:
+        return target
+    try:
+        import importlib.util
+        return importlib.util.find_spec(target).origin
+    except (ImportError, AttributeError, ValueError):
+        return
+
+
+class Registry(object):
+    """
+    Records commands as (module or script, function name, summary) and builds
+    a Clizer only for the command that is invoked.
+    """
+    _help_options = ('--help', '-?')
+
+    def __init__(self, prog=None, docstring=None, default=None):
+        """ default is the command run when the first argument is not a command (help included)
+        """
+        self.prog = prog
+        self.docstring = docstring
+        self.default = default
+        self.commands = OrderedDict()
+
+    def add(self, name, target, function=None, summary=None, aliases=None):
+        """ Records command name, found in target (a dotted module name or a script path).
+            function is the name of the function in target (default the first clized function),
+            summary is the one line description of the command in help (default the first line
+            of the function's docstring, read statically), aliases are the decorator keywords
+            used if function is not clized.
+        """
+        self.commands[name] = (target, function, summary, aliases)
+        return self
+
+    def get_clizer(self, name, prog=None):
+        target, function, _, aliases = self.commands[name]
+        clizer = load_clizer(target, function, aliases)
+        clizer.prog = prog or '%s %s' % (self._get_prog(), name)
+        return clizer
+
+    def get_summary(self, name):
+        target, function, summary, _ = self.commands[name]
+        if summary is None:
+            from clingon import static
+            file = source_file(target)
+            definition = static.find_clized(file) if file and os.path.exists(file) else None
+            summary = ''
+            if definition is not None and definition.docstring:
+                summary = textwrap.dedent(definition.docstring).strip().split('\n')[0]
+        return summary
+
+    def _get_prog(self):
+        return self.prog or os.path.basename(sys.argv[0])
+
+    def _print_usage(self, prepend='usage: ', file=sys.stdout):
+        print('%s%s <command> [args] [%s]' % (prepend, self._get_prog(), ' | '.join(self._help_options)), file=file)
+
+    def _print_help(self):
+        self._print_usage('\n  ', file=sys.stdout)
+        if self.docstring:
+            print()
+            for doc in self.docstring.split('\n'):
+                doc = doc.strip()
+                if doc:
+                    print(textwrap.fill(doc, width=80, initial_indent='  ', subsequent_indent='   '))
+        print()
+        if self.commands:
+            print('Commands:')
+            width = max(len(k) for k in self.commands)
+            for name in self.commands:
+                summary = self.get_summary(name) + (' (default)' if name == self.default else '')
+                print('{0:{1}} {2}'.format(name, width, summary).rstrip())
+            print()
+
+    def __call__(self, param_string=None):
+        from clingon import clingon
+
+        if param_string is None:
+            argv = sys.argv[1:]
+        elif isinstance(param_string, list):
+            argv = param_string
+        else:
+            import shlex
+            argv = shlex.split(param_string)
+        # help lists the commands, the default one included
+        if argv and argv[0] in self._help_options:
+            self._print_help()
+            return clingon.Clizer._sys_exit(0)
+        if self.default and (not argv or argv[0] not in self.commands):
+            target, function, _, aliases = self.commands[self.default]
+            return load_clizer(target, function, aliases)(argv)
+        if not argv:
+            self._print_usage(file=sys.stderr)
+            return clingon.Clizer._write_error("Missing command")
+        if argv[0] not in self.commands:
+            self._print_usage(file=sys.stderr)
+            return clingon.Clizer._write_error("Unknown command '%s'" % argv[0])
+        return self.get_clizer(argv[0])(argv[1:])
+
+    def multi_call(self, param_string=None):
+        """ Busybox style dispatch: if the program is invoked through a link named after
+            a command, runs this command, else behaves as __call__
+        """
+        from clingon import clingon
+
+        name = os.path.basename(sys.argv[0])
+        try:
+            if name in self.commands:
+                return self.get_clizer(name, name)(sys.argv[1:] if param_string is None else param_string)
+            return self(param_string)
+        except clingon.RunnerError as e:
+            return clingon.Clizer._write_error(str(e))
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""
+Static help and version of clized scripts.
+The script is parsed with ast instead of being imported, so that printing help,
+usage or version does not pay for the script's imports.
+Scripts whose help depends on dynamic values (such as a callable VERSION) are
+reported as not static, and must be imported the usual way.
+
+usage: python -m clingon.static script.py [script args]
+"""
+
+from __future__ import print_function, absolute_import
+
+import ast
+import os
+import re
+import sys
+
+
+def _name(node):
+    """ Returns the name of a Name or Attribute node (clize for both clize and clingon.clize)
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+
+
+def _literal_kwargs(call):
+    """ Returns the dict of literal keywords of a call node, and the set of non literal ones
+    """
+    kwargs, dynamic = {}, set()
+    for keyword in call.keywords:
+        if keyword.arg is None:
+            raise ValueError("Cannot resolve **kwargs statically")
+        try:
+            kwargs[keyword.arg] = ast.literal_eval(keyword.value)
+        except ValueError:
+            dynamic.add(keyword.arg)
+    return kwargs, dynamic
+
+
+class ClizedDefinition(object):
+    """
+    What is statically known of a clized function: its signature with literal defaults,
+    its decorator keywords, its literal variables and its converters names.
+    """
+
+    def __init__(self, node, file):
+        self.name = node.name
+        self.file = file
+        self.lineno = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        self.docstring = ast.get_docstring(node, clean=False)
+        self.aliases, self.variables, self.dynamic_variables, self.converters = {}, {}, set(), {}
+        for decorator in node.decorator_list:
+            name = _name(decorator.func if isinstance(decorator, ast.Call) else decorator)
+            if isinstance(decorator, ast.Call) and name == 'clize':
+                if decorator.args:
+                    raise ValueError("Cannot resolve clize positional arguments statically")
+                self.aliases, dynamic = _literal_kwargs(decorator)
+                if dynamic:
+                    raise ValueError("Cannot resolve clize keywords statically: " + ', '.join(dynamic))
+            elif isinstance(decorator, ast.Call) and name == 'set_variables':
+                variables, dynamic = _literal_kwargs(decorator)
+                self.variables.update(variables)
+                self.dynamic_variables.update(dynamic)
+            elif isinstance(decorator, ast.Call) and name == 'set_converters':
+                self.converters, dynamic = _literal_kwargs(decorator)
+                if dynamic:
+                    raise ValueError("Cannot resolve converters statically: " + ', '.join(dynamic))
+        args = node.args
+        if getattr(args, 'kwonlyargs', None) or getattr(args, 'posonlyargs', None):
+            raise ValueError("Cannot resolve keyword only or positional only parameters")
+        self.args = [getattr(a, 'arg', None) or a.id for a in args.args]
+        self.defaults = [ast.literal_eval(d) for d in args.defaults]
+        self.varargs = getattr(args.vararg, 'arg', args.vararg)
+        self.keywords = getattr(args.kwarg, 'arg', args.kwarg)
+
+    def is_static(self):
+        """ Help can be produced statically if it uses no dynamic variable, nor converters registered by the script.
+            Docstring fields other than literal variables are set at runtime (such as options_file_path).
+        """
+        from clingon.converters import CONVERTERS
+        import string
+
+        if 'VERSION' in self.dynamic_variables or any(c not in CONVERTERS for c in self.converters.values()):
+            return False
+        try:
+            fields = [f for _, f, _, _ in string.Formatter().parse(self.docstring or '') if f is not None]
+        except ValueError:
+            return False
+        return all(re.split(r'[.\[]', f)[0] in self.variables for f in fields)
+
+    def make_function(self):
+        """ Returns a stub function with the same signature, file and first line as the clized function,
+            so that the Clizer built on it shares the schema cache of the real one
+        """
+        params = self.args[:len(self.args) - len(self.defaults)]
+        params += ['%s=defaults[%d]' % (a, k) for k, a in enumerate(self.args[len(params):])]
+        if self.varargs:
+            params.append('*' + self.varargs)
+        if self.keywords:
+            params.append('**' + self.keywords)
+        source = '\n' * (self.lineno - 1) + 'def %s(%s):\n    pass\n' % (self.name, ', '.join(params))
+        namespace = dict(defaults=self.defaults)
+        exec(compile(source, self.file, 'exec'), namespace)
+        function = namespace[self.name]
+        function.__doc__ = self.docstring
+        if self.variables:
+            function._variables = dict(self.variables)
+        if self.converters:
+            function._converters = dict(self.converters)
+        return function
+
+    def make_clizer(self):
+        from clingon import clingon
+
+        kwargs = dict((k.lower(), v) for k, v in self.aliases.items())
+        settings = clingon.Clizer.pop_deco_settings(kwargs)
+        clingon.Clizer.check_deco_parameters(**kwargs)
+        settings.update(options_aliases=kwargs)
+        mycli = type('mycli', (clingon.Clizer,), settings)
+        return mycli(self.make_function())
+
+
+def find_clized(file, source=None):
+    """ Returns the ClizedDefinition of the first function decorated with clize in file,
+        or None if there is none, or if it cannot be resolved statically
+    """
+    if source is None:
+        with open(file, 'rb') as f:
+            source = f.read()
+    try:
+        tree = ast.parse(source, file)
+    except SyntaxError:
+        return
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and \
+                any(_name(d.func if isinstance(d, ast.Call) else d) == 'clize' for d in node.decorator_list):
+            try:
+                return ClizedDefinition(node, os.path.abspath(file))
+            except ValueError:
+                return
+
+
+def load_clizer(file):
+    """ Returns a Clizer built from the static definition of the clized function of file,
+        or None if its help cannot be produced statically
+    """
+    definition = find_clized(file)
+    if definition is not None and definition.is_static():
+        return definition.make_clizer()
+
+
+def handle(file, argv):
+    """ Prints help or version of clized script file without importing it, if argv asks for it.
+        Returns True if argv was handled.
+    """
+    if not any(x in argv for x in ('--help', '-?', '--version', '-V')):
+        return False
+    clizer = load_clizer(file)
+    if clizer is None:
+        return False
+    try:
+        parsed = clizer._parser(argv, bool(clizer._get_variable('VERSION')))
+    except Exception:
+        # errors are reported by the real script
+        return False
+    if parsed == 'help':
+        clizer._print_help()
+    elif parsed == 'version':
+        clizer._print_version()
+    else:
+        return False
+    return True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.stderr.write("usage: python -m clingon.static script.py [args]\n")
+        return 1
+    script, args = argv[0], argv[1:]
+    if not handle(script, args):
+        os.execv(sys.executable, [sys.executable, script] + args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
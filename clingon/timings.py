@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timings of the phases of a run of a clized function, see Clizer.last_run_stats and
+the hidden --clingon-timings flag.
+Recording a phase costs one clock read and one list append, so it is always on.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+
+clock = getattr(time, 'perf_counter', time.time)
+
+FORMATS = ('text', 'json', 'trace')
+
+
+class RunStats(object):
+    """ Phases of a run, as a list of (name, start, duration), start being a clock value and durations in seconds
+    """
+    def __init__(self):
+        self.phases = []
+
+    def add(self, name, start):
+        """ Records phase name, started at clock value start and ending now
+        """
+        self.phases.append((name, start, clock() - start))
+
+    @property
+    def total(self):
+        return sum(duration for name, _, duration in self.phases if name != 'setup')
+
+    def get(self, name):
+        """ Returns the total duration of phase name
+        """
+        return sum(duration for n, _, duration in self.phases if n == name)
+
+    def as_dict(self):
+        return dict(phases=[dict(name=name, start=start, duration=duration) for name, start, duration in self.phases],
+                    total=self.total)
+
+    def as_trace(self):
+        """ Returns the phases as Chrome trace events, to be loaded in chrome://tracing or Perfetto
+        """
+        pid = os.getpid()
+        return dict(traceEvents=[dict(name=name, cat='clingon', ph='X', ts=start * 1e6, dur=duration * 1e6,
+                                      pid=pid, tid=0) for name, start, duration in self.phases],
+                    displayTimeUnit='ms')
+
+    def format(self):
+        total = self.total or 1
+        width = max([len(name) for name, _, _ in self.phases] + [5])
+        lines = ['%-*s %10.3f ms %5.1f%%' % (width, name, duration * 1e3, 100 * duration / total)
+                 for name, _, duration in self.phases if name != 'setup']
+        lines.append('%-*s %10.3f ms' % (width, 'total', self.total * 1e3))
+        if any(name == 'setup' for name, _, _ in self.phases):
+            lines.append('%-*s %10.3f ms (once, at decoration)' % (width, 'setup', self.get('setup') * 1e3))
+        return '\n'.join(lines) + '\n'
+
+
+def write(stats, fmt='text', file=None):
+    """ Writes stats in format fmt (text, json or trace) to file, a path, or stderr if None
+    """
+    import sys
+
+    if fmt == 'text':
+        content = stats.format()
+    else:
+        import json
+        content = json.dumps(stats.as_trace() if fmt == 'trace' else stats.as_dict()) + '\n'
+    if file is None:
+        sys.stderr.write(content)
+        return
+    with open(file, 'w') as f:
+        f.write(content)
@@ -3,7 +3,9 @@
 from builtins import input as user_input
 import glob
 import inspect
+import marshal
 import os.path
+import re
 import sys
 
 
@@ -86,26 +88,303 @@ class AreYouSure(object):
             return True
 
 
-def read_configuration(file, path=None):
-    if path:
-        file = os.path.join(path, file)
+# set to False to parse configuration files on every start
+CONFIG_CACHE = True
+
+
+def resolve_configuration(file):
+    """ Returns the first file matching file (a path or a glob pattern), or None.
+        Glob results are cached, and validated by the modification time of their directory,
+        so that a warm resolution costs one stat.
+    """
+    if not glob.has_magic(file):
+        return file if os.path.exists(file) else None
+    directory = os.path.dirname(file) or os.curdir
+    if glob.has_magic(directory) or not CONFIG_CACHE:
+        return (glob.glob(file) or [None])[0]
+    from clingon import cache
+
     try:
-        file = glob.glob(file)[0]
-    except IndexError:
-        raise RuntimeError("File %s not found" % file)
-    _, ext = os.path.splitext(file)
+        key = ('glob', os.path.abspath(file), cache.file_stamp(directory))
+    except OSError:
+        return
+    # the entry path ignores the stamp, so that a stale entry is overwritten instead of piling up
+    path = cache.cache_path('config', key[:2])
+    files = cache.load(path, key)
+    if files is None:
+        files = glob.glob(file)
+        cache.save(path, key, files)
+    return (files or [None])[0]
+
+
+# regexes are compiled on first use, as configuration files are seldom split
+_regexes = {}
+
+
+def _get_regexes(kind):
+    """ Returns the regexes scanning configuration files of kind 'json' or 'yaml'
+    """
+    if kind in _regexes:
+        return _regexes[kind]
+    if kind == 'json':
+        # special characters, string, scalar and blanks
+        regexes = (re.compile(br'["{}\[\]]'), re.compile(br'"(?:[^"\\]|\\.)*"', re.S),
+                   re.compile(br'[^,}\]\s]*'), re.compile(br'\s*'))
+    else:
+        # yaml documents that cannot be split on their top level keys: anchors, aliases, tags,
+        # directives, multiple documents, complex keys, flow style top level, and quoted scalars
+        # and flow collections continued on next lines; and top level keys
+        regexes = (re.compile(br'(?:^|[\s\[{,])[&*!][^\s]|^(?:---|\.\.\.|%|\? |[{\[])|'
+                              br'(?:^|[\s\[{,:])(?:"(?:[^"\\\n]|\\.)*|\'(?:[^\'\n]|\'\')*)$|'
+                              br'[\s:\-][\[{][^\]}\n]*$', re.M),
+                   re.compile(br'^(?:"([^"\n]*)"|\'([^\'\n]*)\'|([^\s#\'"\-][^:\n]*?))[ \t]*:(?:[ \t]|\r?$)', re.M))
+    _regexes[kind] = regexes
+    return regexes
+
+
+def _json():
+    try:
+        import simplejson as json
+    except ImportError:
+        import json
+    return json
+
+
+def _yaml_load(stream):
+    import yaml
+
+    # the default loader of yaml.load, which is mandatory since PyYAML 6
+    return yaml.load(stream, Loader=getattr(yaml, 'FullLoader', yaml.Loader))
+
+
+def _json_string_end(buf, i):
+    """ Returns the end index of the json string starting at index i of buf
+    """
+    m = _get_regexes('json')[1].match(buf, i)
+    if m is None:
+        raise ValueError("Expecting a json string at %d" % i)
+    return m.end()
+
+
+def _skip_json_value(buf, i):
+    """ Returns the end index of the json value starting at index i of buf, without decoding it.
+        Raises ValueError if the value is missing, unterminated or has unbalanced brackets.
+    """
+    special, _, scalar, _ = _get_regexes('json')
+    c = buf[i:i + 1]
+    if c == b'"':
+        return _json_string_end(buf, i)
+    if c not in (b'{', b'['):
+        end = scalar.match(buf, i).end()
+        if end == i:
+            raise ValueError("Expecting a json value at %d" % i)
+        return end
+    closing = []
+    while True:
+        m = special.search(buf, i)
+        if m is None:
+            raise ValueError("Unterminated json value at %d" % i)
+        c = m.group()
+        if c == b'"':
+            i = _json_string_end(buf, m.start())
+            continue
+        i = m.end()
+        if c in (b'{', b'['):
+            closing.append(b'}' if c == b'{' else b']')
+        elif closing.pop() != c:
+            raise ValueError("Unbalanced json brackets at %d" % m.start())
+        if not closing:
+            return i
+
+
+def _select_json(buf, keys):
+    """ Decodes only the values of the given top level keys of the json object in buf.
+        The whole object is scanned, so that the last of duplicated keys is used, as json.load does.
+        Malformed objects are decoded whole, so that errors are reported as by json.load.
+    """
+    json, keys, result = _json(), set(keys), {}
+    blank = _get_regexes('json')[3]
+    i = blank.match(buf, 0).end()
+    if buf[i:i + 1] != b'{':
+        return json.loads(buf[:].decode('utf-8'))
+    try:
+        i = blank.match(buf, i + 1).end()
+        while buf[i:i + 1] != b'}':
+            end = _json_string_end(buf, i)
+            key = json.loads(buf[i:end].decode('utf-8'))
+            i = blank.match(buf, end).end()
+            if buf[i:i + 1] != b':':
+                raise ValueError("Expecting ':' at %d" % i)
+            i = blank.match(buf, i + 1).end()
+            end = _skip_json_value(buf, i)
+            if key in keys:
+                result[key] = json.loads(buf[i:end].decode('utf-8'))
+            i = blank.match(buf, end).end()
+            if buf[i:i + 1] != b',':
+                break
+            i = blank.match(buf, i + 1).end()
+            if buf[i:i + 1] != b'"':
+                raise ValueError("Expecting a json string at %d" % i)
+        if buf[i:i + 1] != b'}' or blank.match(buf, i + 1).end() != len(buf):
+            raise ValueError("Unexpected json data at %d" % i)
+    except ValueError:
+        return json.loads(buf[:].decode('utf-8'))
+    return result
+
+
+def _select_yaml(buf, keys):
+    """ Loads only the blocks of the given top level keys of the yaml mapping in buf,
+        or the whole document if it cannot be split
+    """
+    import yaml
+
+    unsplittable, top_key = _get_regexes('yaml')
+    if unsplittable.search(buf):
+        return _yaml_load(buf[:].decode('utf-8'))
+    keys, result = set(keys), {}
+    matches = list(top_key.finditer(buf))
+    try:
+        for m, next_m in zip(matches, matches[1:] + [None]):
+            key = (m.group(1) or m.group(2) or m.group(3)).decode('utf-8')
+            if key in keys:
+                block = buf[m.start():next_m.start() if next_m else len(buf)]
+                result.update(_yaml_load(block.decode('utf-8')) or {})
+    except yaml.YAMLError:
+        # the document was split where it should not
+        return _yaml_load(buf[:].decode('utf-8'))
+    return result
+
+
+def _parse_configuration(file, ext, keys=None):
+    """ Returns the code object of a python configuration file, or the content of a yaml or json one.
+        If keys is given, only these top level keys of yaml and json files are decoded, the file being
+        scanned through mmap, so that memory and time depend on the size of these keys' values.
+    """
     if ext == '.py':
-        options = {}
         with open(file, "rb") as f:
-            exec(compile(f.read(), file, 'exec'), {}, options)
-    elif ext in ('.yml', '.yaml'):
-        import yaml
+            return compile(f.read(), file, 'exec')
+    if keys is not None and os.path.getsize(file):
+        import mmap
+        with open(file, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return (_select_json if ext == '.json' else _select_yaml)(buf, keys)
+            finally:
+                buf.close()
+    if ext in ('.yml', '.yaml'):
         with open(file, 'r') as f:
-            options = yaml.load(f)
-    elif ext == '.json':
-        import simplejson as json
-        with open(file, 'r') as f:
-            options = json.load(f)
+            return _yaml_load(f)
+    with open(file, 'r') as f:
+        return _json().load(f)
+
+
+def load_configuration(file, ext, keys=None):
+    """ Returns _parse_configuration(file, ext, keys), from cache if file did not change.
+        Code objects are cached marshalled, as they are not picklable.
+    """
+    if ext == '.py' or keys is None:
+        keys = None
     else:
+        keys = tuple(sorted(keys))
+    if not CONFIG_CACHE:
+        return _parse_configuration(file, ext, keys)
+    from clingon import cache
+
+    key = ('parse', sys.version, os.path.abspath(file), keys, cache.file_stamp(file))
+    path = cache.cache_path('config', key[:4])
+    cached = cache.load(path, key)
+    if cached is not None:
+        return marshal.loads(cached) if ext == '.py' else cached
+    parsed = _parse_configuration(file, ext, keys)
+    cache.save(path, key, marshal.dumps(parsed) if ext == '.py' else parsed)
+    return parsed
+
+
+def read_configuration(file, path=None, keys=None):
+    """ Returns the resolved file and the dict of its options.
+        If keys is given, the returned dict may be restricted to these keys.
+    """
+    if path:
+        file = os.path.join(path, file)
+    resolved = resolve_configuration(file)
+    if resolved is None:
+        raise RuntimeError("File %s not found" % file)
+    file = resolved
+    _, ext = os.path.splitext(file)
+    if ext not in ('.py', '.yml', '.yaml', '.json'):
         raise TypeError("Unknown file format %s" % file)
+    options = load_configuration(file, ext, keys)
+    if ext == '.py':
+        code, options = options, {}
+        exec(code, {}, options)
     return file, options
+
+
+def _decode_argument(token):
+    if sys.version_info[0] < 3:
+        return token
+    return token.decode(sys.getfilesystemencoding(), 'surrogateescape')
+
+
+def _iter_tokens(chunks, separator):
+    """ Splits the byte chunks on separator, chunks are not joined beyond the last separator found
+    """
+    rest = b''
+    for chunk in chunks:
+        tokens = (rest + chunk).split(separator)
+        rest = tokens.pop()
+        for token in tokens:
+            yield token
+    if rest:
+        yield rest
+
+
+def _iter_mmap(file, separator):
+    import mmap
+
+    with open(file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            start, size = 0, len(buf)
+            while start < size:
+                end = buf.find(separator, start)
+                if end < 0:
+                    end = size
+                yield buf[start:end]
+                start = end + 1
+        finally:
+            buf.close()
+
+
+RESPONSE_CHUNK_SIZE = 1 << 20
+
+
+def _iter_chunks(file):
+    if file == '-':
+        stream = getattr(sys.stdin, 'buffer', sys.stdin)
+        for chunk in iter(lambda: stream.read(RESPONSE_CHUNK_SIZE), b''):
+            yield chunk
+        return
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(RESPONSE_CHUNK_SIZE), b''):
+            yield chunk
+
+
+def iter_response_file(file, nul=False):
+    """ Iterates lazily over the arguments of a response file, '-' being stdin.
+        Arguments are one per line, empty lines being skipped, or NUL separated if nul (like find -print0).
+        Regular files are read through mmap, stdin and other files by chunks.
+    """
+    separator = b'\0' if nul else b'\n'
+    if file != '-' and os.path.isfile(file):
+        tokens = _iter_mmap(file, separator)
+    else:
+        tokens = _iter_tokens(_iter_chunks(file), separator)
+    for token in tokens:
+        if not nul:
+            token = token.rstrip(b'\r')
+            if not token:
+                continue
+        yield _decode_argument(token)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Watch mode of clized scripts: --clingon-watch PATH... runs the decorated function, then
+runs it again in the same process whenever a watched file changes.
+Changes are detected by polling the stat of watched files (directories are watched
+recursively), which needs neither a platform specific API nor reading files.
+This module is only imported in watch mode.
+"""
+
+from __future__ import absolute_import
+
+import os
+import sys
+import time
+
+# seconds between two checks of the watched paths
+INTERVAL = 0.5
+# seconds without changes awaited before running again, so that a burst of changes runs once
+DEBOUNCE = 0.2
+
+
+def stamps(paths):
+    """ Returns a dict of file path to a stamp that changes whenever the file is modified,
+        for files of paths and, recursively, of directories of paths
+    """
+    from clingon import cache
+
+    result = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in files:
+                    file = os.path.join(root, name)
+                    try:
+                        result[file] = cache.file_stamp(file)
+                    except OSError:
+                        pass
+        else:
+            try:
+                result[path] = cache.file_stamp(path)
+            except OSError:
+                result[path] = None
+    return result
+
+
+def _changed(before, after):
+    return sorted(k for k in set(before) | set(after) if before.get(k) != after.get(k))
+
+
+def run(clizer, argv, paths, interval=INTERVAL, debounce=DEBOUNCE, max_runs=None):
+    """ Runs clizer with argv, then again each time paths or the options file found by the first run change,
+        until interrupted (or max_runs runs). Options from environment and options file are only read again
+        when the options file changes. An exit, from the function or from an error, only ends the current run.
+    :return: the exit code of the last run
+    """
+    paths = [os.path.abspath(p) for p in paths]
+    options_file, options_stamp = None, {}
+    runs, code = 0, 0
+    try:
+        while True:
+            try:
+                if clizer._external_options is None:
+                    clizer._external_options = clizer.get_external_options()
+                    options_file = clizer._variables.get('options_file_path') or options_file
+                    options_stamp = stamps([options_file]) if options_file else {}
+            except SystemExit as e:
+                code = clizer._exit_code(e)
+            # files are stamped before running, so that changes made during the run are not missed
+            watched = paths + ([options_file] if options_file else [])
+            before = stamps(watched)
+            if clizer._external_options is not None:
+                try:
+                    code = clizer._execute(argv)
+                except SystemExit as e:
+                    code = clizer._exit_code(e)
+            sys.stdout.flush()
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                return code
+            after = stamps(watched)
+            while after == before:
+                time.sleep(interval)
+                after = stamps(watched)
+            # debounce: wait for the end of a burst of changes
+            while True:
+                time.sleep(debounce)
+                latest = stamps(watched)
+                if latest == after:
+                    break
+                after = latest
+            if options_file and stamps([options_file]) != options_stamp:
+                clizer._external_options = None
+            changed = _changed(before, after)
+            sys.stderr.write('clingon: %s changed, running again\n' %
+                             (', '.join(changed) if len(changed) <= 3 else ', '.join(changed[:3]) + ', ...'))
+    except KeyboardInterrupt:
+        return code
+    finally:
+        clizer._external_options = None
@@ -1,12 +1,22 @@
 # -*- coding: utf-8 -*-
 
+import atexit
 from contextlib import contextmanager
+import os
+import shutil
 import sys
+import tempfile
 try:
     from StringIO import StringIO
 except ImportError:
     from io import StringIO
 
+from clingon import cache
+
+# tests, and the scripts they start, must not write into the cache of the user
+cache.CACHE_DIR = os.environ['CLINGON_CACHE_DIR'] = tempfile.mkdtemp(prefix='clingon-tests-')
+atexit.register(shutil.rmtree, cache.CACHE_DIR, True)
+
 
 @contextmanager
 def captured_output():
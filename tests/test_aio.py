@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+import mock
+import sys
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+# async syntax is kept in a string so that this module can be imported by python 2
+SOURCE = '''
+import asyncio
+
+running = [0, 0]
+
+
+async def clized_coroutine(p1, fail=False):
+    await asyncio.sleep(0)
+    if fail:
+        raise RuntimeError('coroutine failed')
+    print('coroutine', p1)
+    return 7
+
+
+async def clized_agen(count=3):
+    for x in range(count):
+        await asyncio.sleep(0)
+        yield x
+
+
+async def clized_fanout(delay=0.0, *items):
+    running[0] += 1
+    running[1] = max(running)
+    await asyncio.sleep(delay)
+    running[0] -= 1
+    return int(items[0])
+'''
+
+
+@unittest.skipIf(sys.version_info < (3, 6), "needs async generators")
+class TestAsync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.namespace = {}
+        exec(compile(SOURCE, __file__, 'exec'), cls.namespace)
+
+    @mock.patch('sys.exit')
+    def test_coroutine(self, sys_exit):
+        clized = clingon.clize(self.namespace['clized_coroutine'])
+        with captured_output() as (out, err):
+            clized('p1')
+        self.assertEqual(out.getvalue(), 'coroutine p1\n')
+        sys_exit.assert_called_with(7)
+        with captured_output() as (out, err):
+            clized('p1 -f')
+        self.assertEqual(err.getvalue(), 'coroutine failed\n')
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_async_generator(self):
+        clized = clingon.clize(self.namespace['clized_agen'])
+        self.assertEqual(list(clized.start('-c 4')), [0, 1, 2, 3])
+
+    def test_loop_factory(self):
+        import asyncio
+        loop_factory = mock.Mock(side_effect=asyncio.new_event_loop)
+        clized = clingon.clize(loop_factory=loop_factory)(self.namespace['clized_coroutine'])
+        with captured_output():
+            self.assertEqual(clized.start('p1'), 7)
+        loop_factory.assert_called_once_with()
+
+    @mock.patch('sys.exit')
+    def test_bounded_fanout(self, sys_exit):
+        clized = clingon.clize(parallel='varargs')(self.namespace['clized_fanout'])
+        results = clized._iter_varargs_results([0.01], [str(x) for x in range(10)], 3)
+        self.assertEqual([(item, result) for item, result in results], [(str(x), x) for x in range(10)])
+        self.assertEqual(self.namespace['running'][1], 3)
+        clized('-j 5 4 9 1')
+        sys_exit.assert_called_with(9)
+
+    def test_settings(self):
+        with self.assertRaises(ValueError) as cm:
+            clingon.clize(parallel='varargs')(self.namespace['clized_agen'])
+        self.assertEqual(cm.exception.args[0],
+                         "Decorator's keyword 'parallel' does not apply to async generator functions")
+        with self.assertRaises(ValueError):
+            clingon.clize(loop_factory='uvloop')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from clingon import cache
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_save_load(self):
+        path = cache.cache_path('section', ('key', 1), self.cache_dir)
+        self.assertEqual(os.path.dirname(path), os.path.join(self.cache_dir, 'section'))
+        self.assertIsNone(cache.load(path, ('key', 1)))
+        self.assertTrue(cache.save(path, ('key', 1), {'value': [1, 2]}))
+        self.assertEqual(cache.load(path, ('key', 1)), {'value': [1, 2]})
+        self.assertIsNone(cache.load(path, ('key', 2)))
+
+    def test_save_unpicklable(self):
+        path = cache.cache_path('section', 'key', self.cache_dir)
+        self.assertFalse(cache.save(path, 'key', lambda: None))
+        self.assertFalse(os.path.exists(path))
+
+    def test_file_stamp(self):
+        path = os.path.join(self.cache_dir, 'file')
+        with open(path, 'w') as f:
+            f.write('1')
+        stamp = cache.file_stamp(path)
+        with open(path, 'w') as f:
+            f.write('12')
+        self.assertNotEqual(cache.file_stamp(path), stamp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import print_function
+import array
+import io
 import mock
+import os
+import shutil
+import subprocess
+import tempfile
 
 try:
     import unittest
@@ -20,6 +26,8 @@ from clingon import clingon
 
 # this is to force decorator to delay execution of decorated function
 clingon.DELAY_EXECUTION = True
+# and not to cache schemas of functions under test
+clingon.SCHEMA_CACHE = False
 
 clingon.DEBUG = False
 
@@ -39,6 +47,15 @@ def clized_default_shorts(p1, p2,
     print('%s %s %s %s %s %s' % (p1, p2, first_option, second_option, third_option, last_option))
 
 
+@clingon.clize
+def clized_exits(value):
+    if value == 'bad':
+        raise SystemExit(3)
+    if value == 'message':
+        raise SystemExit('exit message')
+    print(value)
+
+
 @clingon.clize(first_option='1', second_option=('2', 's', 'so'))
 def clized_spec_shorts(p1, p2,
                        first_option='default_value',
@@ -83,6 +100,42 @@ def clized_variables_one_short(p1, p2, option='default_value'):
     """
     pass
 
+
+@clingon.clize(parallel='varargs', parallel_pool='thread')
+def clized_parallel(p1, option=0, *items):
+    if items[0] == 'bad':
+        raise ValueError('bad item')
+    return option + int(items[0])
+
+
+@clingon.clize(parallel='varargs')
+def clized_parallel_process(*items):
+    return len(items[0])
+
+
+@clingon.clize
+@clingon.set_converters(size='bytesize', timeouts='duration', name=str.upper)
+@clingon.set_variables(CLINGON_PREFIX='CONVERTED')
+def clized_converters(size='1k', timeouts=['1m', '2s'], name='x'):
+    print(size, timeouts, name)
+
+
+@clingon.clize(arrays=True)
+@clingon.set_variables(CLINGON_PREFIX='ARRAYS')
+def clized_arrays(ids=[0, 0, 0], weights=[1., 2.], names=['a'], values=array.array('d')):
+    print(ids.tolist(), weights.tolist(), names, values.tolist())
+
+
+@clingon.clize(response_files=True)
+def clized_response_files(p1, ids=[0, 0], *paths):
+    print(p1, ids, paths)
+
+
+@clingon.clize(response_files=True, stream_varargs=True)
+def clized_stream_varargs(p1, name='', *paths):
+    paths, = paths
+    print(p1, name, type(paths).__name__, list(paths))
+
 # ---------- end of decorated functions under test --------------
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -207,6 +260,117 @@ class TestDecoratorBasic(unittest.TestCase):
             '--option-2': 'option_2',
         })
 
+    def test_generated_parser(self):
+        def clized(p1, option='default_value', number=1.5, values=[], flag=False, *varargs):
+            pass
+
+        ret = clingon.clize(clized)
+        self.assertIn('def parse(argv, check_version):', ret._parser_source)
+        self.assertEqual(ret._parser(['a', 'b', '-n', '2', '-v', 'x', 'y', '-f'], False),
+                         (['a'], {'number': 2.0, 'values': ['x', 'y'], 'flag': True}, ['b']))
+        self.assertEqual(ret._parser(['a', '-V'], True), 'version')
+        self.assertEqual(ret._parser(['-?'], False), 'help')
+        with self.assertRaises(clingon.RunnerErrorWithUsage) as cm:
+            ret._parser(['a', '--values', '-f'], False)
+        self.assertEqual(cm.exception.args[0], "Option '--values' should be followed by a list of values")
+        with self.assertRaises(clingon.RunnerErrorWithUsage) as cm:
+            ret._parser(['a', '-n', 'x'], False)
+        self.assertEqual(cm.exception.args[0], "Argument of option -n has wrong type (<float> expected)")
+
+
+class TestSchemaCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        clingon.SCHEMA_CACHE = True
+
+    def tearDown(self):
+        clingon.SCHEMA_CACHE = False
+        shutil.rmtree(self.cache_dir)
+
+    def test_schema_cache(self):
+        def clized(p1, first_option='default_value', second_option=[4, 3], *varargs):
+            pass
+
+        with mock.patch('clingon.cache.CACHE_DIR', self.cache_dir):
+            ret = clingon.clize(second_option='x')(clized)
+            self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'schema'))), 1)
+            with mock.patch.object(clingon.Clizer, '_make_schema') as make_schema:
+                cached = clingon.clize(second_option='x')(clized)
+            make_schema.assert_not_called()
+            with mock.patch.object(clingon.Clizer, '_make_schema', side_effect=RuntimeError) as make_schema:
+                self.assertRaises(RuntimeError, clingon.clize(second_option='y'), clized)
+        for attr in clingon.Clizer._schema_attributes:
+            self.assertEqual(getattr(cached, attr), getattr(ret, attr))
+        self.assertEqual(cached._parser(['a', '-x', '1', '2'], False),
+                         (['a'], {'second_option': [1, 2]}, []))
+
+    def test_schema_cache_defaults(self):
+        def clized(p1, count=1):
+            pass
+
+        with mock.patch('clingon.cache.CACHE_DIR', self.cache_dir):
+            clingon.clize(clized)
+            # defaults computed at import time may change without the script changing
+            clized.__defaults__ = (5,)
+            with mock.patch.object(clingon.Clizer, '_make_schema', side_effect=RuntimeError):
+                self.assertRaises(RuntimeError, clingon.clize, clized)
+            self.assertEqual(clingon.clize(clized).python_options, {'count': 5})
+            with mock.patch.object(clingon.Clizer, '_make_schema') as make_schema:
+                self.assertEqual(clingon.clize(clized).python_options, {'count': 5})
+            make_schema.assert_not_called()
+
+
+class TestParallel(unittest.TestCase):
+    def test_settings(self):
+        with self.assertRaises(ValueError) as cm:
+            clingon.clize(parallel='all')
+        self.assertEqual(cm.exception.args[0], "Decorator's keyword 'parallel' value must be 'varargs', found: all")
+
+        def clized(option=0):
+            pass
+
+        with self.assertRaises(ValueError) as cm:
+            clingon.clize(parallel='varargs')(clized)
+        self.assertEqual(cm.exception.args[0], "Decorator's keyword 'parallel' requires a *varargs parameter")
+
+    @mock.patch('sys.exit')
+    def test_injected_jobs(self, sys_exit):
+        self.assertEqual(clized_parallel.python_options, OrderedDict([('option', 0)]))
+        self.assertEqual(clized_parallel.options_equ['-j'], 'jobs')
+        with captured_output() as (out, err):
+            clized_parallel('-?')
+        self.assertIn("--jobs   | -j <int> (default=0)\n", out.getvalue())
+
+    def test_ordered(self):
+        results = clized_parallel._iter_varargs_results(['p1', 10], [str(x) for x in range(20)], 4)
+        self.assertEqual(list(results), [(str(x), x + 10) for x in range(20)])
+
+    def test_unordered(self):
+        clized_parallel.parallel_ordered = False
+        try:
+            results = clized_parallel._iter_varargs_results(['p1', 10], [str(x) for x in range(20)], 4)
+            self.assertEqual(sorted(results), sorted((str(x), x + 10) for x in range(20)))
+        finally:
+            del clized_parallel.parallel_ordered
+
+    @mock.patch('sys.exit')
+    def test_exit_code(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_parallel('p1 -o 1 3 7 5 -j 2')
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_with(8)
+        with captured_output() as (out, err):
+            clized_parallel('p1 3 bad 5 --jobs 1')
+        self.assertEqual(err.getvalue(), 'bad item\n')
+        sys_exit.assert_called_with(5)
+
+    @mock.patch('sys.exit')
+    def test_process_pool(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_parallel_process('a abc ab -j 2')
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_with(3)
+
 
 @mock.patch('sys.exit')
 class TestDecorator(unittest.TestCase):
@@ -427,6 +591,23 @@ class TestDecorator(unittest.TestCase):
                                          "(default='default_value')] [--help | -?]\nUnrecognized option '-x'\n")
         sys_exit.assert_called_with(1)
 
+    def test_varargs_end_of_options(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_varargs('p1 p2 -- p3')
+        self.assertIn("Unrecognized option '--'\n", err.getvalue())
+        sys_exit.assert_called_with(1)
+
+        @clingon.clize(end_of_options=True)
+        def clized_end_of_options(p1, p2, option=['a', 'b'], *varargs):
+            print('%s %s %s %s' % (p1, p2, option, varargs))
+
+        with captured_output() as (out, err):
+            clized_end_of_options('p1 -o 1 2 -- -p2 --help -o')
+        self.assertEqual(out.getvalue(), "p1 -p2 ['1', '2'] ('--help', '-o')\n")
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_with(0)
+        self.assertRaises(ValueError, clingon.clize, end_of_options='yes')
+
     def test_varargs_too_few_parameters(self, sys_exit):
         with captured_output() as (out, err):
             clized_varargs('p1')
@@ -470,6 +651,50 @@ class TestDecorator(unittest.TestCase):
         self.assertEqual(out.getvalue(), '')
         sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
 
+    def test_batch(self, sys_exit):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+            f.write('p1 p2\n\np3 p4 -1 "specific value"\n')
+            f.flush()
+            with captured_output() as (out, err):
+                clized_spec_shorts('--clingon-batch %s' % f.name)
+        self.assertEqual(out.getvalue(), "p1 p2 default_value 5 [4, 3] False\n"
+                                         "p3 p4 specific value 5 [4, 3] False\n")
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_once_with(0)
+
+    def test_batch_report(self, sys_exit):
+        import json
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+            f.write('p2\np2 -l\np2 -s x\n')
+            f.flush()
+            with captured_output() as (out, err):
+                clized_spec_shorts('p1 --clingon-batch %s --clingon-batch-report -' % f.name)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records, [
+            dict(record=0, exit_code=0, stdout="p1 p2 default_value 5 [4, 3] False\n", stderr=''),
+            dict(record=1, exit_code=12, stdout='', stderr=''),
+            dict(record=2, exit_code=1, stdout='', stderr="usage: test_clingon.py p1 p2 [options] [--help | -?]\n"
+                                                          "Argument of option -s has wrong type (<int> expected)\n"),
+        ])
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_once_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_batch_exit(self, sys_exit):
+        import json
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+            f.write('a\nbad\nmessage\nc\n')
+            f.flush()
+            with captured_output() as (out, err):
+                clized_exits('--clingon-batch %s' % f.name)
+            self.assertEqual(out.getvalue(), 'a\nc\n')
+            self.assertEqual(err.getvalue(), 'exit message\n')
+            sys_exit.assert_called_once_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+            with captured_output() as (out, err):
+                clized_exits('--clingon-batch %s --clingon-batch-report -' % f.name)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['exit_code'], r['stdout'], r['stderr']) for r in records],
+                         [(0, 'a\n', ''), (3, '', ''), (1, '', 'exit message\n'), (0, 'c\n', '')])
+
     def test_version_parameter(self, sys_exit):
         with captured_output() as (out, err):
             clized_variables('-V')
@@ -479,6 +704,233 @@ class TestDecorator(unittest.TestCase):
         sys_exit.assert_called_with(0)
 
 
+@mock.patch('sys.exit')
+class TestConverters(unittest.TestCase):
+    def test_defaults(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_converters('')
+        self.assertEqual(out.getvalue(), "1024 [60.0, 2.0] X\n")
+
+    def test_command_line(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_converters('-s 2M -t 1h 500ms -n abc')
+        self.assertEqual(out.getvalue(), "2097152 [3600.0, 0.5] ABC\n")
+        with captured_output() as (out, err):
+            clized_converters('-s 2X')
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py  [options] [--help | -?]\n"
+                                         "Argument of option -s has wrong type (<bytesize> expected)\n")
+        with captured_output() as (out, err):
+            clized_converters('-t 1h')
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py  [options] [--help | -?]\n"
+                                         "Option '-t' should be followed by a list of 2 <duration>, found 1\n")
+
+    def test_environ(self, sys_exit):
+        with mock.patch.dict(os.environ, CONVERTED_SIZE='3k', CONVERTED_NAME='env'):
+            with captured_output() as (out, err):
+                clized_converters('')
+        self.assertEqual(out.getvalue(), "3072 [60.0, 2.0] ENV\n")
+        with mock.patch.dict(os.environ, CONVERTED_TIMEOUTS="['5m', '3s']"):
+            with captured_output() as (out, err):
+                clized_converters('')
+        self.assertEqual(out.getvalue(), "1024 [300.0, 3.0] X\n")
+        with mock.patch.dict(os.environ, CONVERTED_SIZE='3x'):
+            with captured_output() as (out, err):
+                clized_converters('')
+        self.assertEqual(err.getvalue(), "Value of option size: Invalid size '3x'\n")
+        sys_exit.assert_any_call(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_help(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_converters('-?')
+        self.assertIn("--size     | -s <bytesize> (default='1k')\n"
+                      "--timeouts | -t <list of duration> (default=['1m', '2s'])\n"
+                      "--name     | -n <upper> (default='x')\n", out.getvalue())
+
+    def test_errors(self, sys_exit):
+        def clized(option=False, other=''):
+            pass
+
+        self.assertRaises(ValueError, clingon.clize, clingon.set_converters(option='path')(clized))
+        self.assertRaises(ValueError, clingon.clize, clingon.set_converters(missing='path')(clized))
+        self.assertRaises(ValueError, clingon.clize, clingon.set_converters(other='unknown')(clized))
+
+
+@mock.patch('sys.exit')
+class TestArrays(unittest.TestCase):
+    def test_defaults(self, sys_exit):
+        self.assertEqual(clized_arrays.python_options['ids'], array.array(clingon.ARRAY_TYPECODES[int], [0, 0, 0]))
+        with captured_output() as (out, err):
+            clized_arrays('')
+        self.assertEqual(out.getvalue(), "[0, 0, 0] [1.0, 2.0] ['a'] []\n")
+
+    def test_command_line(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_arrays('-i 1 2 3 -w 3 4.5 -v 1 2 3 4 5')
+        self.assertEqual(out.getvalue(), "[1, 2, 3] [3.0, 4.5] ['a'] [1.0, 2.0, 3.0, 4.0, 5.0]\n")
+        with captured_output() as (out, err):
+            clized_arrays('-i 1 2.5 3')
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py  [options] [--help | -?]\n"
+                                         "Argument 2 of option -i has wrong type (<int> expected)\n")
+        with captured_output() as (out, err):
+            clized_arrays('-i 1 2')
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py  [options] [--help | -?]\n"
+                                         "Option '-i' should be followed by a list of 3 <int>, found 2\n")
+        with captured_output() as (out, err):
+            clized_arrays('-v')
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py  [options] [--help | -?]\n"
+                                         "Option '-v' should be followed by a list of values\n")
+
+    def test_environ(self, sys_exit):
+        with mock.patch.dict(os.environ, ARRAYS_IDS='[4, 5, 6]', ARRAYS_VALUES='[7]'):
+            with captured_output() as (out, err):
+                clized_arrays('')
+        self.assertEqual(out.getvalue(), "[4, 5, 6] [1.0, 2.0] ['a'] [7.0]\n")
+
+    def test_help(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_arrays('-?')
+        self.assertIn("--ids     | -i <list of int> (default=[0, 0, 0])\n"
+                      "--weights | -w <list of float> (default=[1.0, 2.0])\n"
+                      "--names   | -n <list of str> (default=['a'])\n"
+                      "--values  | -v <list of float> (default=array('d'))\n", out.getvalue())
+
+    def test_errors(self, sys_exit):
+        def clized(values=array.array('u')):
+            pass
+
+        self.assertRaises(ValueError, clingon.clize, arrays='yes')
+        self.assertRaises(ValueError, clingon.clize, clized)
+
+
+@mock.patch('sys.exit')
+class TestResponseFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_expand(self, sys_exit):
+        args = self.write('args', 'p1\na b\nc\n')
+        ids = self.write('ids', '1\n2\n')
+        with captured_output() as (out, err):
+            clized_response_files(['@' + args, '@@d', '-i', '@' + ids])
+        self.assertEqual(out.getvalue(), "p1 [1, 2] ('a b', 'c', '@d')\n")
+        with captured_output() as (out, err):
+            clized_response_files(['p1', '-i', '@' + self.write('ids', '1\nx\n')])
+        self.assertTrue(err.getvalue().endswith("\nArgument 2 of option -i has wrong type (<int> expected)\n"))
+
+    def test_missing(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_response_files(['@' + os.path.join(self.tmpdir, 'missing')])
+        self.assertEqual(err.getvalue(), "Could not read response file '%s': No such file or directory\n" %
+                         os.path.join(self.tmpdir, 'missing'))
+
+    def test_disabled(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_converters(['-n', '@name'])
+        self.assertEqual(out.getvalue(), "1024 [60.0, 2.0] @NAME\n")
+        self.assertRaises(ValueError, clingon.clize, response_files='yes')
+
+
+@mock.patch('sys.exit')
+class TestStreamVarargs(unittest.TestCase):
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write('b\nc\n')
+
+    def tearDown(self):
+        os.unlink(self.file)
+
+    def test_stream(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_stream_varargs(['p1', 'a', '@' + self.file, '-n', 'x', 'd'])
+        self.assertEqual(out.getvalue(), "p1 x generator ['a', 'b', 'c', 'd']\n")
+        # response files are only read when iteration reaches them
+        with mock.patch('clingon.utils.iter_response_file', return_value=iter(['b'])) as read:
+            varargs = clized_stream_varargs._stream_varargs(['p1'], {}, ['a', clingon._ResponseFile('@' + self.file)])
+            self.assertEqual(next(varargs), 'a')
+            self.assertEqual(read.call_count, 0)
+            self.assertEqual(list(varargs), ['b'])
+            read.assert_called_once_with(self.file, False)
+
+    def test_stdin(self, sys_exit):
+        with mock.patch('sys.stdin', io.TextIOWrapper(io.BytesIO(b'a\nb\n'))):
+            with captured_output() as (out, err):
+                clized_stream_varargs(['p1', '@-'])
+        self.assertEqual(out.getvalue(), "p1  generator ['a', 'b']\n")
+
+    def test_errors(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_stream_varargs(['@' + self.file])
+        self.assertEqual(err.getvalue(), "usage: test_clingon.py p1 [varargs] [--name | -n <str> (default='')] "
+                                         "[--help | -?]\nResponse file '%s' can only give varargs\n" % self.file)
+        with captured_output() as (out, err):
+            clized_stream_varargs(['p1', '@' + self.file + '.missing'])
+        self.assertEqual(err.getvalue(), "Could not read response file '%s.missing': No such file or directory\n" %
+                         self.file)
+
+        def clized(p1):
+            pass
+
+        self.assertRaises(ValueError, clingon.clize(stream_varargs=True), clized)
+
+
+@mock.patch('sys.exit')
+class TestOptionsSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'script.py')
+        with open(self.script, 'w') as f:
+            f.write("from __future__ import print_function\nfrom clingon import clingon\n\n"
+                    "@clingon.clize\n@clingon.set_variables(OPTIONS_FILE='options.json', OPTIONS_PATH=%r,\n"
+                    "                         CLINGON_PREFIX='SNAPSHOT')\n"
+                    "def clized(p1, first='default', second=1, third=[1]):\n"
+                    "    print(p1, first, second, third)\n" % self.tmpdir)
+        self.write_options('{"first": "from file", "second": "2"}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_options(self, content):
+        with open(os.path.join(self.tmpdir, 'options.json'), 'w') as f:
+            f.write(content)
+
+    def run_script(self):
+        from clingon.registry import load_clizer
+
+        with mock.patch('clingon.clingon.read_configuration', side_effect=clingon.read_configuration) as read:
+            with captured_output() as (out, err):
+                load_clizer(self.script)('x')
+        return out.getvalue(), read.call_count
+
+    def test_snapshot(self, sys_exit):
+        self.assertEqual(self.run_script(), ("x from file 2 [1]\n", 1))
+        with captured_output() as (out, err):
+            clingon.clingon_script()('compile-config ' + self.script)
+        self.assertEqual(out.getvalue(), 'Options of %s have been compiled to %s.clingon-config\n' %
+                         (self.script, self.script))
+        self.assertEqual(self.run_script(), ("x from file 2 [1]\n", 0))
+        with mock.patch.dict(os.environ, SNAPSHOT_THIRD='[2, 3]'):
+            self.assertEqual(self.run_script(), ("x from file 2 [2, 3]\n", 0))
+        self.write_options('{"first": "modified"}')
+        self.assertEqual(self.run_script(), ("x modified 1 [1]\n", 1))
+
+    def test_no_snapshot(self, sys_exit):
+        with captured_output() as (out, err):
+            clingon.clingon_script()(['compile-config', os.path.join(self.tmpdir, 'missing.py')])
+        self.assertIn("Could not find source", err.getvalue())
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+        self.assertEqual(self.run_script(), ("x from file 2 [1]\n", 1))
+
+
 @mock.patch('sys.exit')
 class TestMakeScript(unittest.TestCase):
 
@@ -486,7 +938,7 @@ class TestMakeScript(unittest.TestCase):
         with captured_output() as (out, err):
             clingon.clingon_script()('')
         self.assertEqual(out.getvalue(), "")
-        self.assertEqual(err.getvalue(), "usage: clingon.py python_script [options] [--help | -?]\n"
+        self.assertEqual(err.getvalue(), "usage: clingon.py python_script [varargs] [options] [--help | -?]\n"
                                          "Too few parameters (1 required)\n")
         sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
 
@@ -494,7 +946,7 @@ class TestMakeScript(unittest.TestCase):
         with captured_output() as (out, err):
             clingon.clingon_script()('clingon.py -u -p /usr/local/bin')
         self.assertEqual(out.getvalue(), '')
-        self.assertEqual(err.getvalue(), 'usage: clingon.py python_script [options] [--help | -?]\n'
+        self.assertEqual(err.getvalue(), 'usage: clingon.py python_script [varargs] [options] [--help | -?]\n'
                                          'You cannot specify --path and --user at the same time\n')
         sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
 
@@ -588,6 +1040,53 @@ class TestMakeScript(unittest.TestCase):
         os_chmod.assert_called_with('/usr/local/bin/clingon', 72)
         sys_exit.assert_called_with(0)
 
+    def test_multi_call_needs_launcher(self, sys_exit):
+        with captured_output() as (out, err):
+            clingon.clingon_script()('a.py b.py -p /usr/local/bin')
+        self.assertEqual(err.getvalue(), 'usage: clingon.py python_script [varargs] [options] [--help | -?]\n'
+                                         'You must specify --multi-call to install several scripts\n')
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_multi_call(self, sys_exit):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for name, body in (('hello', "print('hello', p1)"), ('bye', "print('bye', p1)\n    return 3"),
+                               ('time', "print('time', p1)")):
+                with open(os.path.join(tmpdir, name + '.py'), 'w') as f:
+                    f.write("from __future__ import print_function\nfrom clingon import clingon\n\n"
+                            "@clingon.clize\ndef %s(p1):\n    \"\"\"Says %s\"\"\"\n    %s\n" % (name, name, body))
+            bin_dir = os.path.join(tmpdir, 'bin')
+            args = '%s/hello.py %s/bye.py %s/time.py -p %s -c tools --no-check-path' % (tmpdir, tmpdir, tmpdir, bin_dir)
+            with captured_output() as (out, err):
+                clingon.clingon_script()(args)
+            self.assertEqual(err.getvalue(), '')
+            self.assertEqual(sorted(os.listdir(bin_dir)), ['bye', 'hello', 'time', 'tools'])
+            self.assertEqual(os.readlink(os.path.join(bin_dir, 'hello')), 'tools')
+
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(x for x in (root, os.environ.get('PYTHONPATH')) if x))
+
+            def run(*argv):
+                proc = subprocess.Popen(argv, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                return proc.communicate()[0].decode(), proc.returncode
+
+            self.assertEqual(run(os.path.join(bin_dir, 'hello'), 'joe'), ('hello joe\n', 0))
+            self.assertEqual(run(os.path.join(bin_dir, 'bye'), 'joe'), ('bye joe\n', 3))
+            self.assertEqual(run(os.path.join(bin_dir, 'tools'), 'bye', 'joe'), ('bye joe\n', 3))
+            self.assertEqual(run(os.path.join(bin_dir, 'time'), 'joe'), ('time joe\n', 0))
+            self.assertEqual(run(os.path.join(bin_dir, 'tools'), '-?'),
+                             ('\n  tools <command> [args] [--help | -?]\n\nCommands:\n'
+                              'hello Says hello\nbye   Says bye\ntime  Says time\n\n', 0))
+
+            with captured_output() as (out, err):
+                clingon.clingon_script()(args)
+            self.assertEqual(err.getvalue(), "Target '%s/tools' already exists, aborting\n" % bin_dir)
+            with captured_output() as (out, err):
+                clingon.clingon_script()(args + ' -r')
+            self.assertEqual(os.listdir(bin_dir), [])
+        finally:
+            shutil.rmtree(tmpdir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+import mock
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, completion
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+SCRIPT = '''\
+import module_that_does_not_exist
+from clingon import clingon
+
+
+@clingon.clize(polite=('p', 'P'))
+@clingon.set_variables(VERSION='1.0')
+def hello(name, polite=False, greeting=%r, friends=['a'], x=1):
+    """Says hello
+    """
+'''
+
+
+def bash_available():
+    try:
+        return subprocess.call(['bash', '-c', 'true']) == 0
+    except OSError:
+        return False
+
+
+class TestCompletion(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'hello.py')
+        self.write_script('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_script(self, greeting):
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT % greeting)
+
+    def test_get_options(self):
+        self.assertEqual(completion.get_options(completion.load_clizer(self.script)), [
+            ('--polite', ['-p', '-P'], 0, 'default=False'),
+            ('--greeting', ['-g'], 1, "default='hello'"),
+            ('--friends', ['-f'], '*', "default=['a']"),
+            ('-x', [], 1, 'default=1'),
+            ('--version', ['-V'], 0, 'print version'),
+            ('--help', ['-?'], 0, 'print help'),
+        ])
+
+    def test_bash(self):
+        with captured_output() as (out, err):
+            completion.generate('bash', self.script, 'hi')
+        script = out.getvalue()
+        self.assertIn("compgen -W '--polite -p -P --greeting -g --friends -f -x --version -V --help -?'", script)
+        self.assertIn("'--greeting'|'-g'|'--friends'|'-f'|'-x')", script)
+        self.assertIn("complete -o filenames -F _clingon_hi 'hi'", script)
+        self.assertNotIn("-nt", script)
+
+    def test_zsh(self):
+        with captured_output() as (out, err):
+            completion.generate('zsh', self.script)
+        script = out.getvalue()
+        self.assertTrue(script.startswith('#compdef hello\n'))
+        self.assertIn("'(--polite -p -P)'{--polite,-p,-P}'[default=False]'", script)
+        self.assertIn("'(--friends -f)'{--friends,-f}'[default=\\['\\''a'\\''\\]]:value:_files'", script)
+        self.assertIn("'-x[default=1]:value:_files'", script)
+
+    def test_fish(self):
+        with captured_output() as (out, err):
+            completion.generate('fish', self.script)
+        script = out.getvalue()
+        self.assertIn("complete -c 'hello' -l 'polite' -s 'p' -s 'P' -d 'default=False'\n", script)
+        self.assertIn("complete -c 'hello' -s 'x' -r -F -d 'default=1'\n", script)
+        self.assertNotIn("stat", script)
+
+    @mock.patch('sys.exit')
+    def test_unknown_shell(self, sys_exit):
+        with captured_output() as (out, err):
+            completion.completion_script()('tcsh ' + self.script)
+        self.assertIn("Unknown shell 'tcsh', choose from bash, zsh, fish\n", err.getvalue())
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_install(self):
+        with mock.patch.dict(os.environ, XDG_CONFIG_HOME=self.tmpdir):
+            with captured_output() as (out, err):
+                completion.install('fish', self.script, 'hello')
+            output = os.path.join(self.tmpdir, 'fish', 'completions', 'hello.fish')
+            self.assertEqual(out.getvalue(), 'Completion of hello has been written to %s\n' % output)
+            with open(output) as f:
+                self.assertIn("command stat -c %%Y '%s'" % self.script, f.read())
+            with captured_output() as (out, err):
+                completion.install('fish', self.script, 'hello', remove=True)
+            self.assertFalse(os.path.exists(output))
+
+    def test_registered_converter(self):
+        with open(self.script, 'w') as f:
+            f.write("from clingon import clingon, converters\n\nconverters.register_converter('upper', str.upper)\n\n\n"
+                    "@clingon.clize\n@clingon.set_converters(name='upper')\ndef hello(name='x'):\n    pass\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        env = dict(os.environ, CLINGON_CACHE_DIR=cache_dir,
+                   PYTHONPATH=os.pathsep.join(x for x in (root, os.environ.get('PYTHONPATH')) if x))
+        proc = subprocess.Popen([sys.executable, '-m', 'clingon.completion', 'fish', self.script], env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        self.assertEqual((proc.returncode, err.decode()), (0, ''))
+        self.assertIn("complete -c 'hello' -l 'name' -s 'n' -r -F", out.decode())
+
+    @unittest.skipUnless(bash_available(), "needs bash")
+    def test_bash_regeneration(self):
+        output = os.path.join(self.tmpdir, 'hello.bash')
+        completion.generate('bash', self.script, output=output)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(x for x in (root, os.environ.get('PYTHONPATH')) if x))
+
+        def complete(*words):
+            command = '. %s; COMP_WORDS=(%s); COMP_CWORD=%d; _clingon_hello; echo "${COMPREPLY[@]}"' % (
+                output, ' '.join(words), len(words) - 1)
+            proc = subprocess.Popen(['bash', '-c', command], env=env, cwd=self.tmpdir, stdout=subprocess.PIPE)
+            return proc.communicate()[0].decode()
+
+        self.assertEqual(complete('hello', '--'), '--polite --greeting --friends --version --help\n')
+        self.assertEqual(complete('hello', '--greeting', 'hello.'), 'hello.bash hello.py\n')
+        with open(self.script, 'w') as f:
+            f.write((SCRIPT % 'hello').replace('greeting=', 'salutation='))
+        stamp = os.stat(self.script).st_mtime - 10
+        os.utime(output, (stamp, stamp))
+        self.assertEqual(complete('hello', '--'), '--polite --salutation --friends --version --help\n')
+        with open(output) as f:
+            self.assertIn('--salutation', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
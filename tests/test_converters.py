@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from clingon import converters
+
+
+class TestParseLiteral(unittest.TestCase):
+    def test_scalars(self):
+        for value, expected in (('1', 1), ('-12', -12), ('1.5', 1.5), ('-.5e2', -50.), ('1e3', 1000.),
+                                ('True', True), ('False', False), ("'x y'", 'x y'), ('"x\\ty"', 'x\ty'),
+                                (' 3 ', 3), (u'0x10', 16)):
+            self.assertEqual(converters.parse_literal(value), expected)
+            self.assertIs(type(converters.parse_literal(value)), type(expected))
+
+    def test_not_literals(self):
+        for value in ('hello', 'None', '1+2', '__import__("os")', '012', '', '[1', 'os.sep', 'b"x"'):
+            self.assertEqual(converters.parse_literal(value), value)
+        self.assertEqual(converters.parse_literal(20), 20)
+        self.assertEqual(converters.parse_literal([1, 'a']), [1, 'a'])
+
+    def test_sequences(self):
+        self.assertEqual(converters.parse_literal("[1, 2.5, 'a']"), [1, 2.5, 'a'])
+        self.assertEqual(converters.parse_literal("(1, 2)"), (1, 2))
+        self.assertRaises(ValueError, converters.parse_literal, "[1, [2]]")
+
+    def test_cache(self):
+        first = converters.parse_literal('[1, 2]')
+        first.append(3)
+        self.assertEqual(converters.parse_literal('[1, 2]'), [1, 2])
+        self.assertEqual(converters._literals['[1, 2]'], [1, 2])
+
+
+class TestConverters(unittest.TestCase):
+    def test_bytesize(self):
+        for value, expected in (('512', 512), ('10k', 10240), ('1.5M', 1572864), ('2GiB', 2 << 30),
+                                ('2GB', 2000000000), (' 3 kb', 3000), (100, 100), ('1B', 1)):
+            self.assertEqual(converters.bytesize(value), expected)
+        for value in ('', 'k', '10 x', '1.2.3'):
+            self.assertRaises(ValueError, converters.bytesize, value)
+
+    def test_duration(self):
+        for value, expected in (('30', 30.), ('1.5', 1.5), ('500ms', .5), ('5m', 300.), ('1h30m', 5400.),
+                                ('1d 2h', 93600.), ('1w', 604800.), (2, 2.)):
+            self.assertEqual(converters.duration(value), expected)
+        for value in ('', 'm', '5x', '1h 30', 'h1'):
+            self.assertRaises(ValueError, converters.duration, value)
+
+    def test_path(self):
+        self.assertEqual(converters.path('~/x'), os.path.join(os.path.expanduser('~'), 'x'))
+        self.assertEqual(converters.path('x/../y'), os.path.join(os.getcwd(), 'y'))
+
+    def test_registry(self):
+        self.assertIs(converters.get_converter('duration'), converters.duration)
+        self.assertIs(converters.get_converter(len), len)
+        self.assertRaises(ValueError, converters.get_converter, 'unknown')
+        converters.register_converter('upper', str.upper)
+        try:
+            self.assertIs(converters.get_converter('upper'), str.upper)
+        finally:
+            del converters.CONVERTERS['upper']
+
+
+if __name__ == '__main__':
+    unittest.main()
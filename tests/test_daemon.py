@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from clingon import daemon
+
+SCRIPT = '''\
+from __future__ import print_function
+from clingon import clingon
+
+@clingon.clize
+def clized(p1, option=%r, fail=False):
+    if fail:
+        raise RuntimeError('failed')
+    print(p1, option)
+    return 3
+'''
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX') and hasattr(socket.socket, 'sendmsg'), "needs unix sockets")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'script.py')
+        self.write_script('first')
+        self.env = dict(os.environ, CLINGON_RUNTIME_DIR=self.tmpdir, CLINGON_CACHE_DIR=self.tmpdir)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.env['PYTHONPATH'] = os.pathsep.join(x for x in (root, os.environ.get('PYTHONPATH')) if x)
+
+    def tearDown(self):
+        self.client('--stop', self.script)
+        shutil.rmtree(self.tmpdir)
+
+    def write_script(self, option):
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT % option)
+
+    def client(self, *args):
+        proc = subprocess.Popen([sys.executable, '-m', 'clingon.daemon'] + list(args), env=self.env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.tmpdir)
+        out, err = proc.communicate()
+        return proc.returncode, out.decode(), err.decode()
+
+    def test_socket_path(self):
+        os.environ['CLINGON_RUNTIME_DIR'] = self.tmpdir
+        try:
+            path = daemon.socket_path(self.script)
+        finally:
+            del os.environ['CLINGON_RUNTIME_DIR']
+        self.assertEqual(os.path.dirname(path), self.tmpdir)
+        self.assertTrue(path.endswith('.sock'))
+
+    def test_call(self):
+        self.assertEqual(self.client(self.script, 'p1'), (3, 'p1 first\n', ''))
+        self.assertEqual(self.client(self.script, 'p2', '-o', 'x'), (3, 'p2 x\n', ''))
+
+    def test_runtime_dir(self):
+        environ = dict((k, os.environ.pop(k)) for k in ('CLINGON_RUNTIME_DIR', 'XDG_RUNTIME_DIR') if k in os.environ)
+        tempdir, tempfile.tempdir = tempfile.tempdir, self.tmpdir
+        try:
+            directory = daemon.runtime_dir()
+            self.assertEqual(directory, os.path.join(self.tmpdir, 'clingon-%d' % os.getuid()))
+            self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+            self.assertEqual(os.path.dirname(daemon.socket_path(self.script)), directory)
+            # a directory others can write to may hold a socket of another user
+            os.chmod(directory, 0o777)
+            self.assertIsNone(daemon.runtime_dir())
+            self.assertIsNone(daemon.socket_path(self.script))
+            self.assertIsNone(daemon.connect(self.script))
+        finally:
+            tempfile.tempdir = tempdir
+            os.environ.update(environ)
+
+    def test_foreign_daemon(self):
+        self.assertEqual(self.client(self.script, 'p1'), (3, 'p1 first\n', ''))
+        left, right = socket.socketpair()
+        try:
+            self.assertIn(daemon.peer_uid(left), (None, os.getuid()))
+        finally:
+            left.close()
+            right.close()
+        os.environ['CLINGON_RUNTIME_DIR'] = self.tmpdir
+        try:
+            with mock.patch('clingon.daemon.peer_uid', return_value=os.getuid() + 1):
+                self.assertIsNone(daemon.connect(self.script, spawn=False))
+                self.assertIsNone(daemon.call(self.script, ['p1']))
+        finally:
+            del os.environ['CLINGON_RUNTIME_DIR']
+
+    def test_errors(self):
+        code, out, err = self.client(self.script)
+        self.assertEqual(code, 1)
+        self.assertEqual(out, '')
+        self.assertEqual(err, "usage: script.py p1 [options] [--help | -?]\nToo few parameters (1 required)\n")
+        self.assertEqual(self.client(self.script, 'p1', '-f'), (1, '', 'failed\n'))
+
+    def test_restart_on_change(self):
+        self.assertEqual(self.client(self.script, 'p1'), (3, 'p1 first\n', ''))
+        time.sleep(0.01)
+        self.write_script('second')
+        os.utime(self.script, (time.time() + 10, time.time() + 10))
+        self.assertEqual(self.client(self.script, 'p1'), (3, 'p1 second\n', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, journal
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+calls = []
+
+
+@clingon.clize(parallel='varargs', parallel_pool='thread', journal=True)
+def clized_journal(fail='', *items):
+    calls.append(items[0])
+    if items[0] == fail:
+        raise ValueError('bad item ' + fail)
+
+
+@mock.patch('sys.exit')
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        del calls[:]
+        self.tmpdir = tempfile.mkdtemp()
+        self.patcher = mock.patch('clingon.cache.CACHE_DIR', self.tmpdir)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def run_journal(self, *parameters):
+        with captured_output() as (out, err):
+            clized_journal(list(parameters))
+        return err.getvalue()
+
+    def test_resume(self, sys_exit):
+        self.assertEqual(self.run_journal('-f', 'c', 'a', 'b', 'c', 'd'), 'bad item c\n')
+        self.assertEqual(sorted(calls), ['a', 'b', 'c', 'd'])
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+        path = journal.journal_path(clized_journal, ['c'])
+        with open(path) as f:
+            self.assertEqual(sorted(f.read().splitlines()), ["'a'", "'b'", "'d'"])
+        del calls[:]
+        err = self.run_journal('-f', 'c', '--resume', '-j', '1', 'a', 'b', 'c', 'd', 'e')
+        self.assertEqual(err, 'bad item c\n3 items already done according to %s\n' % path)
+        self.assertEqual(calls, ['c', 'e'])
+        # the journal is removed once all items succeeded
+        del calls[:]
+        self.run_journal('--resume', '-f', 'z', 'a', 'b', 'c', 'd', 'e')
+        self.assertEqual(len(calls), 5)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(journal.journal_path(clized_journal, ['z'])))
+
+    def test_no_resume(self, sys_exit):
+        self.run_journal('-f', 'b', 'a', 'b')
+        self.run_journal('-f', 'b', 'a', 'b')
+        self.assertEqual(calls.count('a'), 2)
+
+    def test_journal(self, sys_exit):
+        path = os.path.join(self.tmpdir, 'explicit.journal')
+        with open(path, 'w') as f:
+            f.write("'a'\n'b")
+        with journal.Journal(path, resume=True, sync_items=2, sync_interval=60) as record:
+            self.assertEqual(list(record.skip_done(['a', 'b', 'c'])), ['b', 'c'])
+            with mock.patch('os.fsync') as fsync:
+                record.add('b')
+                self.assertEqual(fsync.call_count, 0)
+                record.add('c')
+                self.assertEqual(fsync.call_count, 1)
+        with open(path) as f:
+            self.assertEqual(f.read(), "'a'\n'b\n'b'\n'c'\n")
+
+    def test_errors(self, sys_exit):
+        self.assertRaises(ValueError, clingon.clize, journal=True)
+        self.assertRaises(ValueError, clingon.clize, parallel='varargs', journal=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
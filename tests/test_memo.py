@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, memo
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+calls = []
+
+
+@clingon.clize(cache=dict(inputs=['data'], max_age=60))
+def clized_cached(data, count=1, *items):
+    calls.append(data)
+    with open(data) as f:
+        content = f.read()
+    print(content * count, *items)
+    sys.stderr.write('warning\n')
+    return 3
+
+
+@mock.patch('sys.exit')
+class TestCachedRun(unittest.TestCase):
+    def setUp(self):
+        del calls[:]
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = os.path.join(self.tmpdir, 'data.txt')
+        self.write('x')
+        self.patcher = mock.patch('clingon.cache.CACHE_DIR', os.path.join(self.tmpdir, 'cache'))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content):
+        with open(self.data, 'w') as f:
+            f.write(content)
+
+    def run_cached(self, *parameters):
+        with captured_output() as (out, err):
+            clized_cached([self.data] + list(parameters))
+        return out.getvalue(), err.getvalue()
+
+    def test_replay(self, sys_exit):
+        self.assertEqual(self.run_cached('-c', '2', 'a'), ('xx a\n', 'warning\n'))
+        self.assertEqual(self.run_cached('-c', '2', 'a'), ('xx a\n', 'warning\n'))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sys_exit.call_args_list, [mock.call(3)] * 2)
+        self.run_cached('-c', '2', 'b')
+        self.assertEqual(len(calls), 2)
+
+    def test_inputs(self, sys_exit):
+        self.run_cached()
+        self.write('yy')
+        self.assertEqual(self.run_cached()[0], 'yy\n')
+        self.assertEqual(len(calls), 2)
+
+    def test_flags(self, sys_exit):
+        self.run_cached()
+        self.run_cached('--no-cache')
+        self.run_cached('--refresh-cache')
+        self.run_cached()
+        self.assertEqual(len(calls), 3)
+
+    def test_max_age(self, sys_exit):
+        self.run_cached()
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.run_cached()
+        self.assertEqual(len(calls), 2)
+
+    def test_prune(self, sys_exit):
+        for size in (10, 20, 30):
+            with open(os.path.join(self.tmpdir, str(size)), 'w') as f:
+                f.write('x' * size)
+            os.utime(os.path.join(self.tmpdir, str(size)), (size, size))
+        memo.prune(self.tmpdir, max_age=time.time() - 15, max_size=40)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['30', 'data.txt'])
+
+    def test_fingerprint(self, sys_exit):
+        self.assertEqual(memo.fingerprint(self.data, True)[1], '11f6ad8ec52a2984abaafd7c3b516503785c2072')
+        self.assertEqual(memo.fingerprint(self.data + '.missing'), (self.data + '.missing', None))
+
+    def test_errors(self, sys_exit):
+        def clized(p1, *items):
+            pass
+
+        self.assertRaises(ValueError, clingon.clize, cache=dict(size=1))
+        self.assertRaises(ValueError, clingon.clize, cache=True, stream_varargs=True)
+        self.assertRaises(ValueError, clingon.clize, cache=True, parallel='varargs')
+        clingon.clize(cache=True, parallel='varargs', parallel_pool='thread')(clized)
+        self.assertRaises(ValueError, clingon.clize(cache=dict(inputs=['missing'])), clized)
+
+
+if __name__ == '__main__':
+    unittest.main()
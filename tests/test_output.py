@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import mock
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, output
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+
+class BrokenPipe(object):
+    """ A stream whose reader goes away after the first write
+    """
+    def __init__(self):
+        self.writes = []
+
+    def write(self, s):
+        if self.writes:
+            raise IOError(errno.EPIPE, 'Broken pipe')
+        self.writes.append(s)
+
+    def flush(self):
+        pass
+
+
+class TestWriteRecords(unittest.TestCase):
+    def test_formats(self):
+        items = [1, 'a', (2, 'b')]
+        with captured_output() as (out, err):
+            self.assertEqual(output.write_records(iter(items)), 0)
+        self.assertEqual(out.getvalue(), "1\na\n2\tb\n")
+        with captured_output() as (out, err):
+            output.write_records(iter(items), 'jsonl')
+        self.assertEqual(out.getvalue(), '1\n"a"\n[2, "b"]\n')
+        with captured_output() as (out, err):
+            output.write_records(iter(items), 'nul')
+        self.assertEqual(out.getvalue(), "1\0a\0(2, 'b')\0")
+
+    def test_batches(self):
+        with captured_output() as (out, err):
+            with mock.patch.object(out, 'write', wraps=out.write) as write:
+                output.write_records(iter(range(2500)))
+        self.assertEqual(write.call_count, 3)
+        with captured_output() as (out, err):
+            with mock.patch.object(out, 'flush') as flush:
+                output.write_records(iter(range(5)), flush='record')
+        self.assertEqual(flush.call_count, 6)
+
+    def test_broken_pipe(self):
+        generated = []
+
+        def items():
+            try:
+                for i in range(10 * output.BATCH_RECORDS):
+                    generated.append(i)
+                    yield i
+            finally:
+                generated.append('closed')
+
+        stream = BrokenPipe()
+        self.assertEqual(output.write_records(items(), stream=stream), output.BROKEN_PIPE_EXIT_CODE)
+        self.assertEqual(len(stream.writes), 1)
+        self.assertEqual(generated[-1], 'closed')
+        self.assertEqual(len(generated), 2 * output.BATCH_RECORDS + 1)
+
+
+@mock.patch('sys.exit')
+class TestOutputSetting(unittest.TestCase):
+    def test_generator(self, sys_exit):
+        @clingon.clize(output='jsonl')
+        def clized(count=2):
+            return (dict(index=i) for i in range(count))
+
+        with captured_output() as (out, err):
+            clized('-c 3')
+        self.assertEqual(out.getvalue(), '{"index": 0}\n{"index": 1}\n{"index": 2}\n')
+        sys_exit.assert_called_once_with(0)
+
+    def test_not_iterator(self, sys_exit):
+        @clingon.clize(output='lines')
+        def clized():
+            return [1, 2]
+
+        with captured_output() as (out, err):
+            clized('')
+        self.assertEqual(out.getvalue(), '')
+
+    def test_errors(self, sys_exit):
+        self.assertRaises(ValueError, clingon.clize, output='csv')
+        self.assertRaises(ValueError, clingon.clize, output='lines', output_flush='always')
+
+
+if __name__ == '__main__':
+    unittest.main()
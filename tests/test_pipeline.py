@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, pipeline
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+
+@clingon.clize
+def generate(count=3):
+    for i in range(count):
+        yield i
+
+
+@clingon.clize(stream_varargs=True)
+def square(offset=0, *items):
+    items, = items
+    for i in items:
+        yield i * i + offset
+
+
+@clingon.clize
+def total(*items):
+    return sum(items)
+
+
+@clingon.clize
+def failing(*items):
+    for item in items:
+        yield 1 // (item - 2)
+
+
+class TestRun(unittest.TestCase):
+    def test_run(self):
+        result = pipeline.run([(generate, ['-c', '4']), (square, ['-o', '1'])])
+        self.assertEqual(list(result), [1, 2, 5, 10])
+        self.assertEqual(pipeline.run([(generate, []), (square, []), (total, [])]), 5)
+
+    def test_queued(self):
+        for processes in (False, True):
+            result = pipeline.run([(generate, ['-c', '250']), (square, []), (total, [])], 2, processes)
+            self.assertEqual(result, sum(i * i for i in range(250)))
+
+    def test_errors(self):
+        with captured_output() as (out, err):
+            self.assertRaises(clingon.RunnerError, pipeline.run, [(generate, ['-c', 'x']), (square, [])])
+        self.assertEqual(err.getvalue(), "usage: test_pipeline.py  [--count | -c <int> (default=3)] "
+                                         "[--help | -?]\n")
+        self.assertRaises(clingon.RunnerError, pipeline.run, [(total, []), (square, [])])
+        self.assertRaises(clingon.RunnerError, pipeline.run, [(square, []), (generate, [])])
+        for queue_size in (0, 2):
+            items = pipeline.run([(generate, []), (failing, []), (total, [])][:2], queue_size)
+            self.assertRaises(Exception, list, items)
+
+    def test_parse_stages(self):
+        self.assertEqual(pipeline.parse_stages(['a.py x', '|', 'module:function', '-f', "'y z'"]),
+                         [('a.py', None, ['x']), ('module', 'function', ['-f', 'y z'])])
+        self.assertRaises(clingon.RunnerErrorWithUsage, pipeline.parse_stages, ['a.py', '|', '|', 'b.py'])
+
+
+@mock.patch('sys.exit')
+class TestPipe(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'script.py')
+        with open(self.script, 'w') as f:
+            f.write("from clingon import clingon\n\n"
+                    "@clingon.clize\ndef lines(prefix='', *items):\n"
+                    "    return ('%s%s' % (prefix, item) for item in items)\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_pipe(self, sys_exit):
+        command = clingon.clize(pipeline.pipe)
+        with captured_output() as (out, err):
+            command(['%s a b' % self.script, '|', self.script + ':lines -p x'])
+        self.assertEqual(out.getvalue(), "xa\nxb\n")
+        sys_exit.assert_called_once_with(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+import json
+import mock
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, profiling
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       200 |        200 |   _io
+import time:       300 |        500 | _frozen_importlib_external
+import time:      1000 |       1000 | site
+import time:       100 |        100 |       _json
+import time:       400 |        500 |     json.scanner
+import time:       700 |       1200 |   json.decoder
+import time:       800 |        800 |   json.encoder
+import time:       400 |       2400 | json
+import time:      3000 |       3000 | decimal
+""".splitlines()
+
+SOURCE = """\
+from __future__ import print_function
+import json
+import os.path
+try:
+    import decimal
+except ImportError:
+    decimal = None
+from collections import OrderedDict as Dict
+from . import sibling
+
+
+class Config(Dict):
+    pass
+
+
+@clingon.clize
+def main(path=os.path.join('a', 'b')):
+    print(json.dumps(path), decimal.Decimal(1))
+"""
+
+
+@clingon.clize
+def clized_profiled(count=1000):
+    return len([str(i) for i in range(count)]) // count
+
+
+@clingon.clize
+def clized_profile_option(clingon_profile='', count=1):
+    print(clingon_profile)
+
+
+SCRIPT = """\
+import json
+from clingon import clingon
+
+
+@clingon.clize
+def main(path, verbose=False):
+    print(json.dumps(path))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    def test_parse(self):
+        startup, roots = profiling.split_startup(profiling.parse_importtime(IMPORTTIME))
+        self.assertEqual([m.name for m in startup], ['_frozen_importlib_external', 'site'])
+        self.assertEqual([m.name for m in startup[0].children], ['_io'])
+        self.assertEqual([m.name for m in roots], ['json', 'decimal'])
+        self.assertEqual([m.name for m in roots[0].walk()],
+                         ['json', 'json.decoder', 'json.scanner', '_json', 'json.encoder'])
+        self.assertAlmostEqual(roots[0].cumulative, .0024)
+        self.assertAlmostEqual(roots[0].self_time, .0004)
+        self.assertEqual([m.name for m in roots[0].heaviest_chain()], ['json', 'json.decoder', 'json.scanner', '_json'])
+
+    def test_no_startup(self):
+        startup, roots = profiling.split_startup(profiling.parse_importtime(IMPORTTIME[4:]))
+        self.assertEqual(startup, [])
+        self.assertEqual([m.name for m in roots], ['json', 'decimal'])
+
+    def test_deferrable_imports(self):
+        self.assertEqual(profiling.deferrable_imports(SOURCE), [(2, 'json', ['json']), (5, 'decimal', ['decimal'])])
+
+
+@mock.patch('sys.exit')
+class TestProfilerFlags(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'run.prof')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_profile(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_profiled('-c 10 --clingon-profile %s --clingon-profile-top 5' % self.path)
+        sys_exit.assert_called_once_with(1)
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertIn('clingon: profile written to %s\n' % self.path, err.getvalue())
+        self.assertIn('clized_profiled', err.getvalue())
+        self.assertIsNone(clized_profiled._profiler)
+
+    def test_trace_malloc(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_profiled('--clingon-trace-malloc')
+        sys_exit.assert_called_once_with(1)
+        self.assertIn('clingon: peak traced memory ', err.getvalue())
+        self.assertIn('clingon: top allocation sites, with ', err.getvalue())
+
+    def test_environ(self, sys_exit):
+        with mock.patch.dict(os.environ, CLINGON_FLAGS='--clingon-profile %s' % self.path):
+            with captured_output() as (out, err):
+                clized_profiled('-c 10')
+        sys_exit.assert_called_once_with(1)
+        self.assertTrue(os.path.isfile(self.path))
+        with mock.patch.dict(os.environ, CLINGON_FLAGS='--clingon-watch .'):
+            with captured_output() as (out, err):
+                clized_profiled('-c 10')
+        self.assertEqual(err.getvalue(), "Environment variable CLINGON_FLAGS can only give --clingon-profile, "
+                                         "--clingon-trace-malloc, --clingon-profile-top, found: --clingon-watch\n")
+        sys_exit.assert_called_with(1)
+
+    def test_errors(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_profiled('--clingon-profile %s --clingon-trace-malloc' % self.path)
+        self.assertIn("Options '--clingon-profile' and '--clingon-trace-malloc' are exclusive", err.getvalue())
+        with captured_output() as (out, err):
+            clized_profiled('--clingon-trace-malloc --clingon-profile-top x')
+        self.assertIn("Argument of option --clingon-profile-top has wrong type (<int> expected)", err.getvalue())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_user_option(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_profile_option('--clingon-profile %s' % self.path)
+        self.assertEqual(out.getvalue(), self.path + '\n')
+        self.assertFalse(os.path.exists(self.path))
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "needs python -X importtime")
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'script.py')
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.environ = dict(PYTHONPATH=os.pathsep.join(x for x in (root, os.environ.get('PYTHONPATH')) if x))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_report(self):
+        with mock.patch.dict(os.environ, self.environ):
+            report = profiling.make_report(self.script, ['-v', 'x'], top=3)
+        self.assertEqual(report['exit_code'], 0)
+        self.assertEqual(sorted(report['phases']),
+                         ['call', 'environ', 'eval_variables', 'options_file', 'parse', 'setup'])
+        self.assertEqual(len(report['modules']), 3)
+        self.assertEqual(report['modules'][0]['name'], 'clingon')
+        self.assertEqual(report['chains'][0]['chain'][:2], ['clingon', 'clingon.clingon'])
+        self.assertEqual([(d['line'], d['module']) for d in report['deferrable']], [(1, 'json')])
+        self.assertGreater(report['wall'], report['script_imports'])
+
+    def test_command(self):
+        with mock.patch.dict(os.environ, self.environ):
+            with captured_output() as (out, err):
+                profiling.profile(self.script, 10, True, 'x')
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['script'], self.script)
+        self.assertIn('json', [d['module'] for d in report['deferrable']])
+        text = profiling.format_report(report)
+        self.assertIn('function body', text)
+        self.assertIn('Imports not used at import time', text)
+
+    def test_script_parameters(self):
+        with mock.patch.dict(os.environ, self.environ), mock.patch('sys.exit') as sys_exit:
+            with captured_output() as (out, err):
+                clingon.clingon_script()(['profile', self.script, '-j', '--', '-v', 'x'])
+        self.assertEqual(json.loads(out.getvalue())['exit_code'], 0)
+        sys_exit.assert_called_with(0)
+
+    def test_not_clized(self):
+        with open(self.script, 'w') as f:
+            f.write('import sys\nsys.exit(3)\n')
+        report = profiling.make_report(self.script)
+        self.assertEqual(report['exit_code'], 3)
+        self.assertIsNone(report['phases'])
+        self.assertIn('no clingon timings', profiling.format_report(report))
+
+    def test_missing_script(self):
+        self.assertRaises(clingon.RunnerError, profiling.make_report, os.path.join(self.tmpdir, 'missing.py'))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+import mock
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon
+from clingon.registry import Registry
+
+clingon.SCHEMA_CACHE = False
+
+HEAVY = '''\
+import module_that_does_not_exist
+from clingon import clingon
+
+
+@clingon.clize
+def heavy(p1):
+    """Heavy command, never imported by help
+    """
+'''
+
+LIGHT = '''\
+from __future__ import print_function
+from clingon import clingon
+
+
+@clingon.clize
+def light(p1, option='default'):
+    """Light command
+       more details
+    """
+    print('light', p1, option)
+    return 2
+
+
+def plain(p1):
+    print('plain', p1)
+'''
+
+
+@mock.patch('sys.exit')
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for name, source in (('heavy', HEAVY), ('light', LIGHT)):
+            with open(os.path.join(self.tmpdir, name + '.py'), 'w') as f:
+                f.write(source)
+        self.registry = Registry('tool', "Tool description")
+        self.registry.add('heavy', os.path.join(self.tmpdir, 'heavy.py'))
+        self.registry.add('light', os.path.join(self.tmpdir, 'light.py'))
+        self.registry.add('plain', os.path.join(self.tmpdir, 'light.py'), 'plain', 'plain function')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_help(self, sys_exit):
+        with captured_output() as (out, err):
+            self.registry('-?')
+        self.assertEqual(out.getvalue(), "\n  tool <command> [args] [--help | -?]\n\n"
+                                         "  Tool description\n\n"
+                                         "Commands:\n"
+                                         "heavy Heavy command, never imported by help\n"
+                                         "light Light command\n"
+                                         "plain plain function\n\n")
+        self.assertEqual(err.getvalue(), '')
+        sys_exit.assert_called_with(0)
+
+    def test_command(self, sys_exit):
+        with captured_output() as (out, err):
+            self.registry('light p1 -o value')
+        self.assertEqual(out.getvalue(), 'light p1 value\n')
+        sys_exit.assert_called_with(2)
+        with captured_output() as (out, err):
+            self.registry(['plain', 'p1'])
+        self.assertEqual(out.getvalue(), 'plain p1\n')
+        sys_exit.assert_called_with(0)
+
+    def test_command_usage(self, sys_exit):
+        with captured_output() as (out, err):
+            self.registry('light')
+        self.assertEqual(err.getvalue(), "usage: tool light p1 [--option | -o <str> (default='default')] "
+                                         "[--help | -?]\nToo few parameters (1 required)\n")
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_unknown_command(self, sys_exit):
+        with captured_output() as (out, err):
+            self.registry('unknown')
+        self.assertEqual(err.getvalue(), "usage: tool <command> [args] [--help | -?]\nUnknown command 'unknown'\n")
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+        with captured_output() as (out, err):
+            self.registry('')
+        self.assertEqual(err.getvalue(), "usage: tool <command> [args] [--help | -?]\nMissing command\n")
+
+    def test_default_command(self, sys_exit):
+        self.registry.default = 'light'
+        with captured_output() as (out, err):
+            self.registry('p1 -o value')
+        self.assertEqual(out.getvalue(), 'light p1 value\n')
+        sys_exit.assert_called_with(2)
+        with captured_output() as (out, err):
+            self.registry('plain p1')
+        self.assertEqual(out.getvalue(), 'plain p1\n')
+        with captured_output() as (out, err):
+            self.registry('-?')
+        self.assertIn('Light command (default)\n', out.getvalue())
+        self.assertIn('\nplain', out.getvalue())
+        with captured_output() as (out, err):
+            self.registry('light -?')
+        self.assertIn('--option', out.getvalue())
+
+    def test_multi_call_error(self, sys_exit):
+        self.registry.add('tool', 'os')
+        with mock.patch('sys.argv', ['/usr/bin/tool']):
+            with captured_output() as (out, err):
+                self.registry.multi_call()
+        self.assertEqual(err.getvalue(), "No clized function found in 'os'\n")
+        sys_exit.assert_called_with(clingon.SYSTEM_EXIT_ERROR_CODE)
+
+    def test_lazy_import(self, sys_exit):
+        delay = clingon.DELAY_EXECUTION
+        with captured_output() as (out, err):
+            self.registry('light p1')
+        self.assertNotIn('module_that_does_not_exist', sys.modules)
+        self.assertEqual(clingon.DELAY_EXECUTION, delay)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, registry, static
+
+# do not cache schemas of scripts under test
+clingon.SCHEMA_CACHE = False
+
+SCRIPT = '''\
+#!/usr/bin/env python
+import module_that_does_not_exist
+from clingon import clingon
+
+
+@clingon.clize(first_option=('first', 'f'))
+@clingon.set_variables(VERSION=%s, message='static message')
+def clized(p1, first_option='default_value', second_option=5, third_option=[4, 3], last_option=False, *varargs):
+    """Help docstring v{VERSION}
+       {message}
+    """
+    pass
+'''
+
+EXAMPLE5 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'example5.py')
+
+
+class TestStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.script = os.path.join(self.tmpdir, 'script.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_script(self, version):
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT % version)
+
+    def test_definition(self):
+        self.write_script("'1.2.3'")
+        definition = static.find_clized(self.script)
+        self.assertEqual(definition.name, 'clized')
+        self.assertEqual(definition.lineno, 6)
+        self.assertEqual(definition.aliases, {'first_option': ('first', 'f')})
+        self.assertEqual(definition.variables, {'VERSION': '1.2.3', 'message': 'static message'})
+        self.assertEqual(definition.defaults, ['default_value', 5, [4, 3], False])
+        self.assertEqual(definition.varargs, 'varargs')
+        self.assertTrue(definition.is_static())
+        clizer = definition.make_clizer()
+        self.assertEqual(clizer.file, self.script)
+        self.assertEqual(clizer.func.__code__.co_firstlineno, 6)
+        self.assertEqual(clizer.options_aliases['first_option'], ['first', 'f'])
+
+    def test_help(self):
+        self.write_script("'1.2.3'")
+        with captured_output() as (out, err):
+            self.assertTrue(static.handle(self.script, ['p1', '-?']))
+        self.assertIn("  Help docstring v1.2.3\n  static message\n", out.getvalue())
+        self.assertIn("--first-option  | -first | -f <str> (default='default_value')\n", out.getvalue())
+        self.assertIn("--version       | -V print version (1.2.3)\n", out.getvalue())
+        self.assertEqual(err.getvalue(), '')
+
+    def test_version(self):
+        self.write_script("'1.2.3'")
+        with captured_output() as (out, err):
+            self.assertTrue(static.handle(self.script, ['-V']))
+        self.assertIn('version 1.2.3 from %s' % self.tmpdir, err.getvalue())
+
+    def test_not_handled(self):
+        self.write_script("'1.2.3'")
+        self.assertFalse(static.handle(self.script, ['p1']))
+        self.assertFalse(static.handle(self.script, ['p1', '-s', '-?']))
+
+    def test_dynamic_version(self):
+        self.write_script("version")
+        self.assertFalse(static.find_clized(self.script).is_static())
+        self.assertIsNone(static.load_clizer(self.script))
+        self.assertFalse(static.handle(self.script, ['-?']))
+
+    def test_converters(self):
+        with open(self.script, 'w') as f:
+            f.write("from clingon import clingon\n\n@clingon.clize\n@clingon.set_converters(size='bytesize')\n"
+                    "def clized(size='1k'):\n    pass\n")
+        with captured_output() as (out, err):
+            self.assertTrue(static.handle(self.script, ['-?']))
+        self.assertIn("--size | -s <bytesize> (default='1k')", out.getvalue())
+        with open(self.script, 'w') as f:
+            f.write("from clingon import clingon\n\n@clingon.clize\n@clingon.set_converters(size='custom')\n"
+                    "def clized(size='1k'):\n    pass\n")
+        self.assertFalse(static.find_clized(self.script).is_static())
+
+    @mock.patch('sys.exit')
+    def real_help(self, script, sys_exit):
+        with captured_output() as (out, err):
+            registry.load_clizer(script)(['-?'])
+        return out.getvalue()
+
+    def test_runtime_fields(self):
+        self.assertFalse(static.find_clized(EXAMPLE5).is_static())
+        self.assertFalse(static.handle(EXAMPLE5, ['p1', 'p2', '-?']))
+        self.assertNotIn('{options_file_path}', self.real_help(EXAMPLE5))
+        with open(self.script, 'w') as f:
+            f.write("from clingon import clingon\n\n@clingon.clize\n@clingon.set_variables(VERSION='1.0', "
+                    "message='literal')\ndef clized(p1, option=[1, 2]):\n"
+                    "    \"\"\"Help {message} {{braces}}\n    v{VERSION}\n    \"\"\"\n")
+        with captured_output() as (out, err):
+            self.assertTrue(static.handle(self.script, ['-?']))
+        self.assertEqual(out.getvalue(), self.real_help(self.script))
+        self.assertIn('Help literal {braces}', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import json
+import mock
+import os
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, timings
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+
+@clingon.clize
+def clized_timed(count=1):
+    return count
+
+
+class TestRunStats(unittest.TestCase):
+    def setUp(self):
+        self.stats = timings.RunStats()
+        self.stats.phases = [('setup', 1., .5), ('parse', 10., .001), ('call', 10.001, .003)]
+
+    def test_total(self):
+        self.assertAlmostEqual(self.stats.total, .004)
+        self.assertEqual(self.stats.get('call'), .003)
+        self.assertEqual(self.stats.get('missing'), 0)
+
+    def test_formats(self):
+        self.assertEqual(self.stats.format(), "parse      1.000 ms  25.0%\n"
+                                              "call       3.000 ms  75.0%\n"
+                                              "total      4.000 ms\n"
+                                              "setup    500.000 ms (once, at decoration)\n")
+        self.assertEqual(self.stats.as_dict()['phases'][1], dict(name='parse', start=10., duration=.001))
+        event = self.stats.as_trace()['traceEvents'][2]
+        self.assertEqual((event['name'], event['ph'], event['ts'], round(event['dur'])), ('call', 'X', 10001000, 3000))
+
+
+@mock.patch('sys.exit')
+class TestTimingsFlag(unittest.TestCase):
+    def test_last_run_stats(self, sys_exit):
+        self.assertEqual(clized_timed.start('-c 2'), 2)
+        self.assertEqual([name for name, _, _ in clized_timed.last_run_stats.phases],
+                         ['setup', 'environ', 'options_file', 'eval_variables', 'parse', 'call'])
+
+    def test_flag(self, sys_exit):
+        with captured_output() as (out, err):
+            clized_timed('-c 3 --clingon-timings text')
+        self.assertIn('\ncall ', err.getvalue())
+        sys_exit.assert_called_once_with(3)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            clized_timed('--clingon-timings trace --clingon-timings-output %s' % path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)['traceEvents'][-1]['name'], 'call')
+        finally:
+            os.unlink(path)
+        with captured_output() as (out, err):
+            clized_timed('--clingon-timings xml')
+        self.assertIn("Option '--clingon-timings' value must be one of text, json, trace, found: xml", err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,15 @@ try:
 except ImportError:
     import unittest
 
+import io
+import mock
+import os
+import shutil
+import tempfile
+
 from . import captured_output
 
+from clingon import utils
 from clingon.utils import AreYouSure
 
 
@@ -81,5 +88,138 @@ class TestAreYouSure(unittest.TestCase):
             self.assertFalse(ays(input='whatever'))
 
 
+class TestReadConfiguration(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.write('options.py', "first_option = 'python'\nsecond_option = [1, 2]\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.cache_dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmpdir, name), 'w') as f:
+            f.write(content)
+
+    def read(self, file, keys=None):
+        with mock.patch('clingon.cache.CACHE_DIR', self.cache_dir):
+            with mock.patch('clingon.utils._parse_configuration', side_effect=utils._parse_configuration) as parse:
+                result = utils.read_configuration(file, self.tmpdir, keys)
+        return result, parse.call_count
+
+    def test_python_cache(self):
+        expected = (os.path.join(self.tmpdir, 'options.py'), {'first_option': 'python', 'second_option': [1, 2]})
+        self.assertEqual(self.read('options.py'), (expected, 1))
+        self.assertEqual(self.read('options.py'), (expected, 0))
+        self.write('options.py', "first_option = 'changed'\n")
+        self.assertEqual(self.read('options.py'), ((expected[0], {'first_option': 'changed'}), 1))
+        # the entry of the changed file is overwritten
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'config'))), 1)
+
+    def test_no_cache(self):
+        with mock.patch('clingon.utils.CONFIG_CACHE', False):
+            self.assertEqual(self.read('options.py')[1], 1)
+            self.assertEqual(self.read('options.py')[1], 1)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_glob_cache(self):
+        with mock.patch('glob.glob', side_effect=utils.glob.glob) as glob:
+            self.assertEqual(self.read('opt*.py')[0][0], os.path.join(self.tmpdir, 'options.py'))
+            self.assertEqual(self.read('opt*.py')[0][0], os.path.join(self.tmpdir, 'options.py'))
+            self.assertEqual(glob.call_count, 1)
+            os.unlink(os.path.join(self.tmpdir, 'options.py'))
+            self.assertRaises(RuntimeError, self.read, 'opt*.py')
+            self.assertEqual(glob.call_count, 2)
+        # one entry for the glob and one for the parsed file, whatever the changes of the directory
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'config'))), 2)
+
+    def test_select_json(self):
+        self.write('options.json', '{"skipped": {"a": [1, "}]\\"", {}]}, "first_option": "json",\n'
+                                   ' "other": [null, true], "second_option": [1, 2.5]}')
+        self.assertEqual(self.read('options.json', ['second_option', 'first_option', 'missing'])[0][1],
+                         {'first_option': 'json', 'second_option': [1, 2.5]})
+        self.assertEqual(self.read('options.json', ['first_option']), ((os.path.join(self.tmpdir, 'options.json'),
+                                                                        {'first_option': 'json'}), 1))
+        self.assertEqual(self.read('options.json', ['first_option'])[1], 0)
+        self.assertEqual(len(self.read('options.json')[0][1]), 4)
+        # the last of duplicated keys is used, as by json.load
+        self.write('options.json', '{"first_option": 1, "other": 2, "first_option": 3}')
+        self.assertEqual(self.read('options.json', ['first_option'])[0][1], {'first_option': 3})
+
+    def test_select_json_malformed(self):
+        # malformed objects are decoded whole, so that errors match those of json.load
+        json = utils._json()
+        for source in (b'{"a": [1, 2, "b": 2}', b'{"b": 1} trailing', b'{"b": 1,}', b'{"a" 1, "b": 2}',
+                       b'{"b": [1, 2}', b'{"b": "unterminated}'):
+            with self.assertRaises(ValueError) as expected:
+                json.loads(source.decode('utf-8'))
+            with self.assertRaises(ValueError) as selected:
+                utils._select_json(source, ['b'])
+            self.assertEqual(str(selected.exception), str(expected.exception))
+        self.assertEqual(utils._select_json(b' {} ', ['b']), {})
+
+    def test_select_yaml(self):
+        self.write('options.yml', '# options\nskipped:\n  a: [1, 2]\nfirst_option: "yaml: 1"\n'
+                                  'second_option:\n- 1\n- 2\n"third": |\n  text\n  x: 1\n')
+        self.assertEqual(self.read('options.yml', ['first_option', 'second_option', 'third'])[0][1],
+                         {'first_option': 'yaml: 1', 'second_option': [1, 2], 'third': 'text\nx: 1\n'})
+        # aliases cannot be resolved block by block: full loading
+        self.write('options.yml', 'skipped: &value 1\nfirst_option: *value\n')
+        self.assertEqual(self.read('options.yml', ['first_option'])[0][1], {'skipped': 1, 'first_option': 1})
+        # quoted scalars and flow collections may go on with lines looking like top level keys
+        self.write('options.yml', 'first_option: "multi\nsecond_option: line"\nsecond_option: 2\n')
+        self.assertEqual(self.read('options.yml', ['first_option'])[0][1],
+                         {'first_option': 'multi second_option: line', 'second_option': 2})
+        self.write('options.yml', 'first_option: [1,\nsecond_option: 2]\n')
+        self.assertEqual(self.read('options.yml', ['second_option'])[0][1],
+                         {'first_option': [1, {'second_option': 2}]})
+
+    def test_select_yaml_crlf(self):
+        self.write('options.yml', 'skipped: 1\r\nfirst_option:\r\n  - a\r\n  - b\r\nsecond_option: 2\r\n')
+        self.assertEqual(self.read('options.yml', ['first_option', 'second_option'])[0][1],
+                         {'first_option': ['a', 'b'], 'second_option': 2})
+
+    def test_select_yaml_error(self):
+        import re
+        never = re.compile(b'(?!)')
+        with mock.patch.dict(utils._regexes, yaml=(never, utils._get_regexes('yaml')[1])):
+            self.assertEqual(utils._select_yaml(b'first: "multi\nsecond: line"\nsecond: 2\n', ['first']),
+                             {'first': 'multi second: line', 'second': 2})
+
+    def test_not_found(self):
+        self.assertRaises(RuntimeError, self.read, 'missing.py')
+        self.write('options.txt', '')
+        self.assertRaises(TypeError, self.read, 'options.txt')
+
+
+class TestResponseFile(unittest.TestCase):
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.file)
+
+    def write(self, content):
+        with open(self.file, 'wb') as f:
+            f.write(content)
+
+    def test_lines(self):
+        self.write(b'first\n\nsecond arg\r\n-o\nlast')
+        self.assertEqual(list(utils.iter_response_file(self.file)), ['first', 'second arg', '-o', 'last'])
+        self.write(b'')
+        self.assertEqual(list(utils.iter_response_file(self.file)), [])
+
+    def test_nul(self):
+        self.write(b'first\0second\nline\0\0last\0')
+        self.assertEqual(list(utils.iter_response_file(self.file, nul=True)), ['first', 'second\nline', '', 'last'])
+
+    def test_stdin(self):
+        with mock.patch('clingon.utils.RESPONSE_CHUNK_SIZE', 3):
+            with mock.patch('sys.stdin', io.TextIOWrapper(io.BytesIO(b'first\nsecond\nthird'))):
+                self.assertEqual(list(utils.iter_response_file('-')), ['first', 'second', 'third'])
+
+
 if __name__ == '__main__':
     unittest.main()
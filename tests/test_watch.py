@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+import mock
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest
+except ImportError:
+    # for py26
+    import unittest2 as unittest
+
+from . import captured_output
+
+from clingon import clingon, utils, watch
+
+clingon.DELAY_EXECUTION = True
+clingon.SCHEMA_CACHE = False
+
+
+@mock.patch('sys.exit')
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = os.path.join(self.tmpdir, 'data.txt')
+        self.write('data.txt', 'a')
+        self.write('options.json', '{"option": "first"}')
+
+        @clingon.clize
+        @clingon.set_variables(OPTIONS_FILE='options.json', OPTIONS_PATH=self.tmpdir)
+        def clized(data, option=''):
+            with open(data) as f:
+                print(f.read(), option)
+            if option == 'exit':
+                raise SystemExit(2)
+
+        self.clized = clized
+        self.changes = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        # make the change visible whatever the resolution of modification times
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10 * len(content)))
+
+    def sleep(self, seconds):
+        # each change is applied on a check of the watched paths
+        if seconds == watch.INTERVAL and self.changes:
+            self.write(*self.changes.pop(0))
+
+    def watch(self, runs):
+        with mock.patch('time.sleep', side_effect=self.sleep):
+            with mock.patch('clingon.clingon.read_configuration', side_effect=utils.read_configuration) as read:
+                with captured_output() as (out, err):
+                    code = watch.run(self.clized, [self.data], [self.data], max_runs=runs)
+        return code, out.getvalue(), err.getvalue(), read.call_count
+
+    def test_watch(self, sys_exit):
+        self.changes = [('data.txt', 'bb'), ('options.json', '{"option": "second"}')]
+        code, out, err, reads = self.watch(3)
+        self.assertEqual((code, out), (0, "a first\nbb first\nbb second\n"))
+        self.assertEqual(err, "clingon: %s changed, running again\nclingon: %s changed, running again\n" %
+                         (self.data, os.path.join(self.tmpdir, 'options.json')))
+        # the options file is only read again when it changed
+        self.assertEqual(reads, 2)
+        self.assertIsNone(self.clized._external_options)
+
+    def test_exit(self, sys_exit):
+        self.write('options.json', '{"option": "exit"}')
+        self.changes = [('data.txt', 'bb')]
+        code, out, err, reads = self.watch(2)
+        self.assertEqual((code, out), (2, "a exit\nbb exit\n"))
+
+    def test_flag(self, sys_exit):
+        with mock.patch('clingon.watch.run', return_value=0) as run:
+            self.clized([self.data, '--clingon-watch', self.data, self.tmpdir, '-o', 'x'])
+        run.assert_called_once_with(self.clized, [self.data, '-o', 'x'], [self.data, self.tmpdir])
+        with captured_output() as (out, err):
+            self.clized([self.data, '--clingon-watch'])
+        self.assertIn("Option '--clingon-watch' should be followed by a list of values", err.getvalue())
+
+    def test_stamps(self, sys_exit):
+        os.mkdir(os.path.join(self.tmpdir, '.hidden'))
+        self.write('.hidden/x', 'x')
+        self.assertEqual(sorted(watch.stamps([self.tmpdir, self.data + '.missing'])),
+                         [self.data, self.data + '.missing', os.path.join(self.tmpdir, 'options.json')])
+
+
+if __name__ == '__main__':
+    unittest.main()